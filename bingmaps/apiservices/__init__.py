@@ -7,3 +7,33 @@ from .locations import (
 from .elevations import ElevationsApi
 
 from .trafficincidents import TrafficIncidentsApi
+
+from .trafficcorridor import TrafficCorridorApi
+
+from .trafficfeed import (
+    IncidentEvent,
+    TrafficFeed
+)
+
+from .trafficheatmap import IncidentHeatmap
+
+from .trafficindex import IncidentIndex
+
+from .trafficstore import IncidentStore
+
+from .trafficlog import (
+    LogEvent,
+    TrafficLog,
+    log_state,
+    replay_log
+)
+
+from .trafficpoller import (
+    TrafficChanges,
+    TrafficPoller
+)
+
+from .warming import (
+    WarmResult,
+    warm_cache
+)
@@ -1,15 +1,21 @@
 from bingmaps.urls import (
+    MAX_POINTS,
+    RequestPlanner,
     ElevationsUrl,
     Coordinates,
     Offset,
     Polyline,
-    BoundingBox
+    BoundingBox,
+    distance
 )
+from bingmaps.cache import CachedResponse
 from collections import namedtuple
-import requests
+from concurrent.futures import ThreadPoolExecutor
 import json
+import math
 import os
 import xmltodict
+from . import transport
 
 
 class ElevationsApi(object):
@@ -45,53 +51,364 @@ class ElevationsApi(object):
         to.
           - file_name - 'elevations'
     :ivar elevationdata: Response from the URL
+    :ivar tiles: Tiles of the grid when a Bounds request was split into
+        multiple requests
+    :ivar overlap: Number of values shared by consecutive chunks (1 for the
+        segments of a Polyline request with a ``spacing``)
+    :ivar max_workers: Maximum number of requests running at the same time
+        when the data has to be split into multiple requests.
+    :ivar planner: The :class:`RequestPlanner` which keeps the URLs within
+        the URL length limit of the service.
+    :ivar precision: Number of decimal places the latitudes and longitudes
+        are rounded to in the URLs (full precision if None). Rounding makes
+        the URLs shorter and lets nearly identical points share the same URL
+        (and so the same cache entry).
+    :ivar cache: Cache of the responses (see :class:`ResponseCache`). When
+        given, the responses are looked up in the cache before sending the
+        requests.
+    :ivar tile_cache: Cache of the elevation grids (see
+        :class:`ElevationTileCache` and :class:`ElevationGridStore`). When
+        given, the grids of the Bounds requests are cached and the List,
+        Polyline and Bounds requests whose points are all inside cached grids
+        are answered locally by bilinear interpolation.
+    :ivar conditional_cache: Last responses of the URLs with their
+        ``ETag``/``Last-Modified`` validators (see :class:`ConditionalCache`).
+        When given, the requests are sent as conditional requests and a
+        ``304 Not Modified`` answer reuses the last response.
+
+    The List and SeaLevel methods accept any number of points. When there
+    are more than 1024 points (the maximum number of points for the service),
+    the points are split into chunks of 1024 points, the chunks are fetched
+    concurrently and the elevations/offsets of all the chunks are stitched
+    back in the same order as the given points. The chunks are also kept
+    within the URL length limit of the :class:`RequestPlanner`, sending the
+    points compressed when the planner allows it (``compress=True``) and that
+    needs fewer requests.
 
     Some of the examples are illustrated in Examples page
     """
-    def __init__(self, data, http_protocol='http'):
+    def __init__(self, data, http_protocol='http', max_workers=8,
+                 planner=None, precision=None, cache=None, tile_cache=None,
+                 conditional_cache=None):
         self.http_protocol = http_protocol
+        self.cache = cache
+        self.tile_cache = tile_cache
+        self.conditional_cache = conditional_cache
         if not bool(data):
             raise TypeError('No data given')
+        self.precision = precision
+        context = {'precision': precision}
         if data['method'] == 'List':
-            schema = Coordinates()
+            schema = Coordinates(context=context)
         elif data['method'] == 'Polyline':
-            schema = Polyline()
+            schema = Polyline(context=context)
         elif data['method'] == 'SeaLevel':
-            schema = Offset()
+            schema = Offset(context=context)
         elif data['method'] == 'Bounds':
-            schema = BoundingBox()
+            schema = BoundingBox(context=context)
         else:
             raise KeyError('method should be either of '
                            'List/Polyline/SeaLevel/Bounds')
 
-        self.schema = ElevationsUrl(data, http_protocol, schema)
+        self.query_schema = schema
+        self.planner = planner or RequestPlanner()
+        self.tiles = []
+        self.overlap = 0
+        self.schemas = [ElevationsUrl(chunk, http_protocol, schema)
+                        for chunk in self.split_data(data)]
+        self.schema = self.schemas[0]
+        for url in self.build_urls():
+            self.planner.check_url(url, 'Elevation')
+        self.data = data
+        self.max_workers = max_workers
         self.file_name = 'elevations'
         self.elevationdata = None
+        self.chunksdata = []
+        self.stitched = None
         self.get_data()
 
-    def build_url(self):
+    def split_data(self, data):
+        """Splits the data into chunks which can be sent in a single request
+        to the elevations API service.
+
+        Args:
+            data (dict): Data given by the user
+
+        Returns:
+            chunks (list): List of data dictionaries, one for each request
+        """
+        if data['method'] == 'Bounds':
+            return self.split_bounds(data)
+        if data['method'] == 'Polyline' and 'spacing' in data:
+            return self.split_polyline(data)
+        points = data.get('points')
+        if data['method'] not in ['List', 'SeaLevel'] or \
+                not isinstance(points, list) or len(points) < 2 or \
+                len(points) % 2:
+            if not self.fits(data):
+                self.compress_points()
+            return [data]
+        point = dict(data)
+        point['points'] = points[:2]
+        base_length = len(self.build_url(self.url_schema(point))) - \
+            len(self.query_schema.points_string(points[:2]))
+        chunks = self.planner.split_points(points, base_length,
+                                           fmt=self.query_schema.coordinate)
+        if len(chunks) > 1 and self.planner.compress:
+            compressed = self.planner.split_points(points, base_length,
+                                                   compress=True)
+            if len(compressed) < len(chunks):
+                self.compress_points()
+                chunks = compressed
+        return [dict(data, points=chunk) for chunk in chunks]
+
+    def url_schema(self, data):
+        """Returns the ElevationsUrl for the given data"""
+        return ElevationsUrl(data, self.http_protocol, self.query_schema)
+
+    def fits(self, data):
+        """Returns whether the URL for the given data fits in the URL length
+        limit of the planner"""
+        return self.planner.fits(self.build_url(self.url_schema(data)),
+                                 'Elevation')
+
+    def compress_points(self):
+        """Sends the points compressed (rounded to 5 decimal places) from now
+        on, if the planner allows it"""
+        if self.planner.compress:
+            self.query_schema.context['compress_points'] = True
+
+    def split_bounds(self, data):
+        """Splits the grid of a Bounds request into tiles which define at most
+        1024 locations each. The tiles are stored in ``tiles`` as tuples of
+        (first row, first column, rows, columns) of the requested grid.
+
+        Args:
+            data (dict): Data given by the user
+
+        Returns:
+            chunks (list): List of data dictionaries, one for each tile
+        """
+        rows, cols = data.get('rows'), data.get('cols')
+        if not isinstance(rows, int) or not isinstance(cols, int) or \
+                rows * cols <= MAX_POINTS or rows < 2 or cols < 2 or \
+                len(data.get('bounds', [])) != 4:
+            return [data]
+        tile_rows, tile_cols = tile_shape(rows, cols)
+        south, west, north, east = data['bounds']
+        chunks = []
+        for row, num_rows in split_range(rows, tile_rows):
+            for col, num_cols in split_range(cols, tile_cols):
+                chunk = dict(data)
+                chunk['bounds'] = [
+                    grid_line(south, north, rows, row),
+                    grid_line(west, east, cols, col),
+                    grid_line(south, north, rows, row + num_rows - 1),
+                    grid_line(west, east, cols, col + num_cols - 1)
+                ]
+                chunk['rows'] = num_rows
+                chunk['cols'] = num_cols
+                chunks.append(chunk)
+                self.tiles.append((row, col, num_rows, num_cols))
+        return chunks
+
+    def split_polyline(self, data):
+        """Splits a Polyline request with a ``spacing`` in metres into
+        segments of at most 1024 samples each whose URLs fit in the URL length
+        limit. Consecutive segments share the sample at their joint.
+
+        Args:
+            data (dict): Data given by the user
+
+        Returns:
+            chunks (list): List of data dictionaries, one for each segment
+        """
+        data = dict(data)
+        spacing = data.pop('spacing')
+        points = data.get('points', [])
+        if not spacing > 0:
+            raise ValueError('spacing should be a positive number of metres')
+        if len(points) < 4:
+            return [data]
+        vertices = list(zip(points[::2], points[1::2]))
+        distances = cumulative_distances(vertices)
+        num_samples = max(int(math.ceil(distances[-1] / spacing)) + 1, 2)
+        step = distances[-1] / (num_samples - 1)
+        chunks = []
+        first = 0
+        while first < num_samples - 1:
+            last = min(first + MAX_POINTS - 1, num_samples - 1)
+            chunk = self.segment(data, vertices, distances, step, first, last)
+            if not self.fits(chunk):
+                self.compress_points()
+            while not self.fits(chunk) and last - first > 1:
+                last = first + (last - first) // 2
+                chunk = self.segment(data, vertices, distances, step, first,
+                                     last)
+            chunks.append(chunk)
+            first = last
+        self.overlap = 1
+        return chunks
+
+    @staticmethod
+    def segment(data, vertices, distances, step, first, last):
+        """Returns the data for the segment of the polyline from the sample
+        ``first`` to the sample ``last``"""
+        chunk = dict(data)
+        chunk['points'] = sub_polyline(vertices, distances,
+                                       first * step, last * step)
+        chunk['samples'] = last - first + 1
+        return chunk
+
+    def stitch(self, values):
+        """Stitches the elevations/offsets of all the chunks back into a
+        single ordered list.
+
+        Args:
+            values (list): List of elevations/offsets lists, one for each
+                chunk
+
+        Returns:
+            values (list): Elevations/offsets in the order of the given data
+        """
+        if not self.tiles:
+            return values[0] + [value for chunk in values[1:]
+                                for value in chunk[self.overlap:]]
+        cols = self.data['cols']
+        stitched = [None] * (self.data['rows'] * cols)
+        for (row, col, num_rows, num_cols), tile in zip(self.tiles, values):
+            for tile_row in range(num_rows):
+                start = (row + tile_row) * cols + col
+                stitched[start:start + num_cols] = \
+                    tile[tile_row * num_cols:(tile_row + 1) * num_cols]
+        return stitched
+
+    def build_url(self, schema=None):
         """Builds the URL for elevations API services based on the data given
         by the user.
 
         Returns:
             url (str): URL for the elevations API services
         """
+        if schema is None:
+            schema = self.schema
         url = '{protocol}/{url}/{rest}/{version}/{restapi}/{rscpath}/' \
-              '{query}'.format(protocol=self.schema.protocol,
-                               url=self.schema.main_url,
-                               rest=self.schema.rest,
-                               version=self.schema.version,
-                               restapi=self.schema.restApi,
-                               rscpath=self.schema.resourcePath,
-                               query=self.schema.query)
+              '{query}'.format(protocol=schema.protocol,
+                               url=schema.main_url,
+                               rest=schema.rest,
+                               version=schema.version,
+                               restapi=schema.restApi,
+                               rscpath=schema.resourcePath,
+                               query=schema.query)
         return url.replace('/None/', '/')
 
+    def build_urls(self):
+        """Builds the URLs for all the chunks of the data given by the user.
+
+        Returns:
+            urls (list): URLs for the elevations API services
+        """
+        return [self.build_url(schema) for schema in self.schemas]
+
     def get_data(self):
-        """Gets data from the given url"""
-        url = self.build_url()
-        self.elevationdata = requests.get(url)
-        if not self.elevationdata.status_code == 200:
-            raise self.elevationdata.raise_for_status()
+        """Gets data from the given url/urls. With a tile cache, List requests
+        are answered from the cached grids when possible and the grids of
+        Bounds requests are cached."""
+        if self.tile_cache is not None and self.interpolate_points():
+            return
+        self.chunksdata = transport.get_many(self.build_urls(),
+                                             self.max_workers, self.cache,
+                                             self.conditional_cache)
+        self.stitched = None
+        self.elevationdata = self.chunksdata[0]
+        if self.tile_cache is not None and self.data['method'] == 'Bounds':
+            resources = self.get_resource()
+            zoom_level = resources[0].get('zoomLevel') \
+                if isinstance(resources, list) else None
+            self.tile_cache.add(self.data['bounds'], self.data['rows'],
+                                self.data['cols'],
+                                get_values(self.response_to_dict()),
+                                self.data.get('heights'), zoom_level)
+
+    def interpolate_points(self):
+        """Answers a List, Polyline or Bounds request (with JSON output)
+        locally by bilinear interpolation of the grids of the tile cache.
+        When the tile cache fetches missing tiles, the tiles containing the
+        points of a List or Polyline request outside the cached grids are
+        fetched concurrently first.
+
+        Returns:
+            answered (bool): Whether the request was answered locally
+        """
+        points = self.sample_points()
+        if points is None or not self.data.get('o', 'json') == 'json':
+            return False
+        heights = self.data.get('heights')
+        if self.tile_cache.fetch and not self.data['method'] == 'Bounds':
+            tiles = self.tile_cache.missing_tiles(points, heights)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(self.fetch_tile, tiles))
+        grids = self.tile_cache.find_all(points, heights)
+        if grids is None:
+            return False
+        elevations = [grid.interpolate(latitude, longitude)
+                      for grid, (latitude, longitude) in zip(grids, points)]
+        zoom_levels = [grid.zoom_level for grid in grids
+                       if grid.zoom_level is not None]
+        resource = {'elevations': elevations,
+                    'zoomLevel': min(zoom_levels) if zoom_levels else None}
+        text = json.dumps({'resourceSets': [{'estimatedTotal': 1,
+                                             'resources': [resource]}],
+                           'statusCode': 200})
+        self.chunksdata = [CachedResponse(text, 200, {})]
+        self.stitched = None
+        self.elevationdata = self.chunksdata[0]
+        return True
+
+    def sample_points(self):
+        """Returns the (latitude, longitude) points whose elevations are
+        requested: the points of a List request, the equally-spaced samples
+        along the path of a Polyline request or the vertices of the grid of a
+        Bounds request (None for the other requests)"""
+        data = self.data
+        points = data.get('points')
+        if data['method'] == 'List' and isinstance(points, list):
+            return list(zip(points[::2], points[1::2]))
+        if data['method'] == 'Polyline' and isinstance(points, list) and \
+                len(points) >= 4:
+            vertices = list(zip(points[::2], points[1::2]))
+            distances = cumulative_distances(vertices)
+            if 'spacing' in data:
+                num_samples = max(int(math.ceil(distances[-1] /
+                                                data['spacing'])) + 1, 2)
+            else:
+                num_samples = data.get('samples', 0)
+            if num_samples < 2:
+                return None
+            step = distances[-1] / (num_samples - 1)
+            return [interpolate(vertices, distances, sample * step)
+                    for sample in range(num_samples)]
+        if data['method'] == 'Bounds' and len(data.get('bounds', [])) == 4:
+            south, west, north, east = data['bounds']
+            rows, cols = data['rows'], data['cols']
+            return [(grid_line(south, north, rows, row),
+                     grid_line(west, east, cols, col))
+                    for row in range(rows) for col in range(cols)]
+        return None
+
+    def fetch_tile(self, bounds):
+        """Fetches the elevations of a tile of the tile cache as a Bounds
+        request and caches them"""
+        data = {'method': 'Bounds', 'bounds': bounds,
+                'rows': self.tile_cache.samples,
+                'cols': self.tile_cache.samples,
+                'key': self.data['key']}
+        if self.data.get('heights'):
+            data['heights'] = self.data['heights']
+        return ElevationsApi(data, self.http_protocol, planner=self.planner,
+                             precision=self.precision, cache=self.cache,
+                             tile_cache=self.tile_cache,
+                             conditional_cache=self.conditional_cache)
 
     def get_resource(self):
         resourceSets = self.response_to_dict()
@@ -112,6 +429,8 @@ class ElevationsApi(object):
     @property
     def response(self):
         """Response from the built URL"""
+        if len(self.chunksdata) > 1:
+            return json.dumps(self.response_to_dict())
         return self.elevationdata.text
 
     @property
@@ -122,16 +441,29 @@ class ElevationsApi(object):
     def response_to_dict(self):
         """This method helps in returning the output JSON data from the URL
         and also it helps in converting the XML output/response (string) to a
-        JSON object
+        JSON object. When the data was split into multiple requests, the
+        elevations/offsets of all the responses are stitched into the first
+        response.
 
         Returns:
             data (dict): JSON data from the output/response
         """
+        if len(self.chunksdata) > 1:
+            if self.stitched is None:
+                data = self.text_to_dict(self.elevationdata.text)
+                values = [get_values(self.text_to_dict(chunk.text))
+                          for chunk in self.chunksdata]
+                set_values(data, self.stitch(values))
+                self.stitched = data
+            return self.stitched
+        return self.text_to_dict(self.elevationdata.text)
+
+    @staticmethod
+    def text_to_dict(text):
         try:
-            return json.loads(self.elevationdata.text)
+            return json.loads(text)
         except Exception:
-            return json.loads(json.dumps(xmltodict.parse(
-                self.elevationdata.text)))
+            return json.loads(json.dumps(xmltodict.parse(text)))
 
     @property
     def elevations(self):
@@ -161,6 +493,22 @@ class ElevationsApi(object):
                 except KeyError:
                     print(KeyError)
 
+    @property
+    def grid(self):
+        """Retrieves the elevations of a Bounds request as a 2-D grid
+
+        Returns:
+            grid (list): List of rows of elevations, starting with the
+            southern most row. Every row starts with the western most
+            elevation.
+        """
+        if not self.data['method'] == 'Bounds':
+            return None
+        values = get_values(self.response_to_dict())
+        cols = self.data['cols']
+        return [values[start:start + cols]
+                for start in range(0, len(values), cols)]
+
     @property
     def zoomlevel(self):
         """Retrieves zoomlevel from the output response
@@ -200,3 +548,106 @@ class ElevationsApi(object):
                                '{0}.{1}'.format(file_name,
                                                 'json')), 'w') as fp:
             json.dump(self.response, fp)
+
+
+def tile_shape(rows, cols):
+    """Returns the number of rows and columns of the tiles a grid of the given
+    rows and columns is split into. Every tile defines at most 1024
+    locations."""
+    side = int(MAX_POINTS ** 0.5)
+    if cols <= side:
+        return MAX_POINTS // cols, cols
+    if rows <= side:
+        return rows, MAX_POINTS // rows
+    return side, side
+
+
+def split_range(count, size):
+    """Splits ``count`` consecutive grid lines into blocks of nearly equal
+    length of at most ``size`` grid lines.
+
+    Returns:
+        blocks (list): List of tuples of (first grid line, number of grid
+        lines)
+    """
+    num_blocks = -(-count // size)
+    base, extra = divmod(count, num_blocks)
+    blocks = []
+    start = 0
+    for block in range(num_blocks):
+        length = base + 1 if block < extra else base
+        blocks.append((start, length))
+        start += length
+    return blocks
+
+
+def grid_line(start, end, count, index):
+    """Returns the latitude/longitude of the grid line at the given index of
+    ``count`` grid lines spread evenly from start to end"""
+    if index == count - 1:
+        return end
+    return start + (end - start) * index / (count - 1)
+
+
+def cumulative_distances(vertices):
+    """Returns the distance in metres from the first vertex of the polyline
+    to every vertex of the polyline"""
+    distances = [0.0]
+    for start, end in zip(vertices, vertices[1:]):
+        distances.append(distances[-1] + distance(start, end))
+    return distances
+
+
+def interpolate(vertices, distances, at):
+    """Returns the (latitude, longitude) point of the polyline at the given
+    distance in metres from the first vertex"""
+    for index in range(1, len(vertices)):
+        if at <= distances[index] or index == len(vertices) - 1:
+            length = distances[index] - distances[index - 1]
+            fraction = (at - distances[index - 1]) / length if length else 0
+            fraction = min(max(fraction, 0.0), 1.0)
+            start, end = vertices[index - 1], vertices[index]
+            return (start[0] + (end[0] - start[0]) * fraction,
+                    start[1] + (end[1] - start[1]) * fraction)
+
+
+def sub_polyline(vertices, distances, start, end):
+    """Returns the flattened points of the part of the polyline between the
+    given distances in metres from the first vertex"""
+    points = [interpolate(vertices, distances, start)]
+    points.extend(vertex for vertex, at in zip(vertices, distances)
+                  if start < at < end)
+    points.append(interpolate(vertices, distances, end))
+    return [value for point in points for value in point]
+
+
+def _values_holder(data):
+    """Returns the dictionary holding the elevations/offsets of the response
+    and the key of the elevations/offsets in that dictionary."""
+    try:
+        resource = data['resourceSets'][0]['resources'][0]
+        if 'elevations' in resource:
+            return resource, 'elevations'
+        return resource, 'offsets'
+    except KeyError:
+        resource = data['Response']['ResourceSets']['ResourceSet']['Resources']
+        if 'ElevationData' in resource:
+            return resource['ElevationData']['Elevations'], 'int'
+        return resource['SeaLevelData']['Offsets'], 'int'
+
+
+def get_values(data):
+    """Retrieves the list of elevations/offsets from a JSON/XML response
+    converted to a dictionary"""
+    holder, key = _values_holder(data)
+    values = holder[key]
+    if not isinstance(values, list):
+        values = [values]
+    return values
+
+
+def set_values(data, values):
+    """Replaces the elevations/offsets of a JSON/XML response converted to a
+    dictionary"""
+    holder, key = _values_holder(data)
+    holder[key] = values
@@ -1,22 +1,30 @@
 import json
 import os
-import requests
 from collections import namedtuple
+import requests
 import xmltodict
+from bingmaps.cache import CachedResponse, address_key, canonical_url
 from bingmaps.urls import (
     LocationByAddressUrl,
     LocationByQueryUrl,
-    LocationByPointUrl
+    LocationByPointUrl,
+    RequestPlanner
 )
+from . import transport
 
 
 class LocationApi(object):
     """Parent class for LocationByAddress and LocationByPoint api classes"""
-    def __init__(self, schema, filename, http_protocol='http'):
+    def __init__(self, schema, filename, http_protocol='http', planner=None,
+                 cache=None, geocode_cache=None, negative_cache=None):
         self.http_protocol = http_protocol
+        self.cache = cache
+        self.geocode_cache = geocode_cache
+        self.negative_cache = negative_cache
         self.file_name = filename
         self.locationApiData = None
         self.schema = schema
+        self.planner = planner or RequestPlanner()
 
     def build_url(self):
         """Builds the URL for location API services based on the data given
@@ -35,6 +43,73 @@ class LocationApi(object):
                                query=self.schema.query)
         return url
 
+    def get_data(self):
+        """Gets data from the built url. A ValueError is raised, without
+        sending the request, when the URL is longer than the URL length limit
+        of the planner.
+
+        When a geocode cache is given, the resources are looked up in the
+        geocode cache first and the resources of the response are stored in
+        it after the request. Both caches use :meth:`cache_key`. Responses
+        without resources aren't stored in the geocode cache; they are left
+        to the negative cache, which expires them.
+
+        When a negative cache is given, the requests known to give no result
+        are skipped: an empty response is served for the requests which had
+        no resources and the hard client errors are raised again as
+        ``requests.HTTPError``. The empty responses and the hard client
+        errors are recorded in the negative cache."""
+        url = self.build_url()
+        self.planner.check_url(url, 'Locations')
+        key = self.cache_key()
+        if self.negative_cache is not None:
+            entry = self.negative_cache.get(key)
+            if entry is not None and entry.reason == 'http':
+                raise requests.HTTPError(
+                    '{0} Client Error (negative cache) for url: {1}'.format(
+                        entry.detail, url))
+            if entry is not None and entry.reason == 'empty':
+                self.locationApiData = resources_response([])
+                return
+        if self.geocode_cache is not None:
+            resources = self.geocode_cache.get(key)
+            if resources is not None:
+                self.locationApiData = resources_response(resources)
+                return
+        try:
+            self.locationApiData = transport.get(url, self.cache, key)
+        except requests.HTTPError as exc:
+            if self.negative_cache is not None and exc.response is not None:
+                self.negative_cache.set_failure(key, exc.response.status_code)
+            raise
+        resources = self.resource_list()
+        if self.negative_cache is not None and not resources:
+            self.negative_cache.set(key, 'empty')
+        if self.geocode_cache is not None and resources:
+            self.geocode_cache.set(key, resources)
+
+    def cache_key(self):
+        """Returns the key of the results in the response cache and in the
+        geocode cache
+
+        Returns:
+            key (str): Canonical form of the built url
+        """
+        return canonical_url(self.build_url())
+
+    def resource_list(self):
+        """Returns the resources of the response as a list (empty when the
+        response has no resources)"""
+        try:
+            resources = self.get_resource()
+        except TypeError:
+            return []
+        if resources is None:
+            return []
+        if isinstance(resources, dict):
+            return [resources]
+        return list(resources)
+
     def get_resource(self):
         try:
             resourceSets = self.response_to_dict()['resourceSets']
@@ -44,8 +119,10 @@ class LocationApi(object):
             try:
                 response = self.response_to_dict()['Response']
                 resourceSets = response['ResourceSets']
-                location = resourceSets['ResourceSet']['Resources']['Location']
-                return location
+                resources = resourceSets['ResourceSet']['Resources']
+                if not resources:
+                    return []
+                return resources['Location']
             except KeyError:
                 print(KeyError)
 
@@ -187,24 +264,34 @@ class LocationByAddress(LocationApi):
         to.
           - file_name - 'locationByAddress'
     :ivar locationApiData: Response from the URL
+    :ivar planner: The :class:`RequestPlanner` which checks the URL against
+        the URL length limit of the service before sending the request.
+    :ivar cache: Cache of the responses (see :class:`ResponseCache`). When
+        given, the response is looked up in the cache before sending the
+        request.
+    :ivar geocode_cache: Persistent cache of the resources (see
+        :class:`GeocodeCache`). When given, the resources are looked up in
+        the geocode cache before sending the request.
+    :ivar negative_cache: Cache of the requests known to give no result (see
+        :class:`NegativeCache`). When given, those requests are skipped.
+
+    The results are cached by the normalized address (see
+    :func:`address_key`), so that the same address written in different ways
+    (such as '123 Main St.' and '123 main street') is requested only once.
 
     Some of the examples are illustrated in Examples page
     """
-    def __init__(self, data, http_protocol='http'):
+    def __init__(self, data, http_protocol='http', planner=None,
+                 cache=None, geocode_cache=None, negative_cache=None):
         if not bool(data):
             raise TypeError('No data given')
-        schema = LocationByAddressUrl(data, httpprotocol=http_protocol)
+        self.data = data
+        schema = self.url_schema(data, http_protocol, negative_cache)
         filename = 'locationByAddress'
-        super().__init__(schema, filename, http_protocol)
+        super().__init__(schema, filename, http_protocol, planner, cache,
+                         geocode_cache, negative_cache)
         self.get_data()
 
-    def get_data(self):
-        """Gets data from the built url"""
-        url = self.build_url()
-        self.locationApiData = requests.get(url)
-        if not self.locationApiData.status_code == 200:
-            raise self.locationApiData.raise_for_status()
-
     def build_url(self):
         """Build the url and replaces /None/ with empty string"""
         url = super().build_url()
@@ -213,6 +300,29 @@ class LocationByAddress(LocationApi):
         else:
             return url
 
+    def cache_key(self):
+        """Returns the key of the results in the caches
+
+        Returns:
+            key (str): Key of the normalized address (see
+            :func:`address_key`)
+        """
+        return address_key(self.data)
+
+    def url_schema(self, data, http_protocol, negative_cache=None):
+        """Builds the LocationByAddressUrl for the data. A KeyError is raised
+        when the data fails the validation. When a negative cache is given,
+        the failures of the validation of the address fields are recorded in
+        it (a missing key is not a problem of the address), so that the
+        callers can skip the known-bad addresses."""
+        try:
+            return LocationByAddressUrl(data, httpprotocol=http_protocol)
+        except KeyError as exc:
+            errors = exc.args[0]
+            if negative_cache is not None and set(errors) - {'key'}:
+                negative_cache.set(self.cache_key(), 'invalid', errors)
+            raise
+
 
 class LocationByPoint(LocationApi):
     """Location by point API class
@@ -244,27 +354,58 @@ class LocationByPoint(LocationApi):
           - https
     :ivar schema: The schema that gets used to build the URL and the schema
         is LocationByPointUrl for location by point API service.
+    :ivar precision: Number of decimal places the point is rounded to in the
+        URL (full precision if None).
     :ivar file_name: The filename that the class can write the JSON response
         to.
           - file_name - 'locationByPoint'
     :ivar locationApiData: Response from the URL
+    :ivar planner: The :class:`RequestPlanner` which checks the URL against
+        the URL length limit of the service before sending the request.
+    :ivar cache: Cache of the responses (see :class:`ResponseCache`). When
+        given, the response is looked up in the cache before sending the
+        request.
+    :ivar geocode_cache: Persistent cache of the resources (see
+        :class:`GeocodeCache`). When given, the resources are looked up in
+        the geocode cache before sending the request.
+    :ivar negative_cache: Cache of the requests known to give no result (see
+        :class:`NegativeCache`). When given, those requests are skipped.
+    :ivar reverse_cache: Cache of the resources keyed on the cell of the
+        point (see :class:`ReverseGeocodeCache`). When given, the resources
+        cached for the cell of the point are served before looking up the
+        other caches.
 
     Some of the examples are illustrated in Examples page
     """
-    def __init__(self, data, http_protocol='http'):
+    def __init__(self, data, http_protocol='http', planner=None,
+                 precision=None, cache=None, geocode_cache=None,
+                 reverse_cache=None, negative_cache=None):
         if not bool(data):
             raise TypeError('No data given')
-        schema = LocationByPointUrl(data, httpprotocol=http_protocol)
+        self.data = data
+        self.reverse_cache = reverse_cache
+        schema = LocationByPointUrl(data, httpprotocol=http_protocol,
+                                    precision=precision)
         filename = 'locationByPoint'
-        super().__init__(schema, filename, http_protocol)
+        super().__init__(schema, filename, http_protocol, planner, cache,
+                         geocode_cache, negative_cache)
         self.get_data()
 
     def get_data(self):
-        """Gets data from the built url"""
-        url = self.build_url()
-        self.locationApiData = requests.get(url)
-        if not self.locationApiData.status_code == 200:
-            raise self.locationApiData.raise_for_status()
+        """Gets data from the built url. When a reverse geocode cache is
+        given, the resources cached for the cell of the point are served
+        without sending the request and the resources of the response are
+        cached for the cell after the request."""
+        if self.reverse_cache is None:
+            return super().get_data()
+        point = self.data['point']
+        params = canonical_url(self.build_url()).partition('?')[2]
+        resources = self.reverse_cache.get(point, params)
+        if resources is not None:
+            self.locationApiData = resources_response(resources)
+            return
+        super().get_data()
+        self.reverse_cache.set(point, self.resource_list(), params)
 
     def build_url(self):
         """Build the url and replaces /None/ with '/'"""
@@ -309,24 +450,29 @@ class LocationByQuery(LocationApi):
         to.
           - file_name - 'locationByQuery'
     :ivar locationApiData: Response from the URL
+    :ivar planner: The :class:`RequestPlanner` which checks the URL against
+        the URL length limit of the service before sending the request.
+    :ivar cache: Cache of the responses (see :class:`ResponseCache`). When
+        given, the response is looked up in the cache before sending the
+        request.
+    :ivar geocode_cache: Persistent cache of the resources (see
+        :class:`GeocodeCache`). When given, the resources are looked up in
+        the geocode cache before sending the request.
+    :ivar negative_cache: Cache of the requests known to give no result (see
+        :class:`NegativeCache`). When given, those requests are skipped.
 
     Some of the examples are illustrated in Examples page
     """
-    def __init__(self, data, http_protocol='http'):
+    def __init__(self, data, http_protocol='http', planner=None,
+                 cache=None, geocode_cache=None, negative_cache=None):
         if not bool(data):
             raise TypeError('No data given')
         schema = LocationByQueryUrl(data, httpprotocol=http_protocol)
         filename = 'locationByQuery'
-        super().__init__(schema, filename, http_protocol)
+        super().__init__(schema, filename, http_protocol, planner, cache,
+                         geocode_cache, negative_cache)
         self.get_data()
 
-    def get_data(self):
-        """Gets data from the built url"""
-        url = self.build_url()
-        self.locationApiData = requests.get(url)
-        if not self.locationApiData.status_code == 200:
-            raise self.locationApiData.raise_for_status()
-
     def build_url(self):
         """Build the url and replaces /None/ with empty string"""
         url = super().build_url()
@@ -334,3 +480,11 @@ class LocationByQuery(LocationApi):
             return url.replace('/None/', '')
         else:
             return url
+
+
+def resources_response(resources):
+    """Builds a response (with a JSON body) from cached resources"""
+    text = json.dumps({'resourceSets': [{'estimatedTotal': len(resources),
+                                         'resources': resources}],
+                       'statusCode': 200})
+    return CachedResponse(text, 200, {})
@@ -0,0 +1,102 @@
+from bingmaps.urls import polyline_distance
+import json
+from .trafficincidents import (
+    TrafficIncidentsApi,
+    get_incidents,
+    incident_points,
+    set_incidents
+)
+
+
+class TrafficCorridorApi(TrafficIncidentsApi):
+    """Traffic incidents along a route: the incidents within a corridor
+    around a polyline instead of inside a rectangle.
+
+    The corridor is covered by a few mapArea boxes following the route (see
+    :meth:`RequestPlanner.split_corridor`), which are fetched concurrently.
+    The incidents of all the boxes are merged without duplicates and only
+    the incidents starting or ending inside the corridor are kept, so a long
+    diagonal route doesn't pull in the incidents of the whole bounding box
+    around it.
+
+    :ivar points: (latitude, longitude) points of the route
+    :ivar width: Width of the corridor in metres (the route is in the middle
+        of the corridor)
+    :ivar boxes: mapArea boxes covering the corridor
+
+    The data is the data of :class:`TrafficIncidentsApi` with ``points`` (the
+    latitudes and longitudes of the route, as for the Polyline method of the
+    :class:`ElevationsApi`) and ``width`` instead of ``mapArea``. The other
+    arguments are the arguments of :class:`TrafficIncidentsApi`.
+
+    Example:
+
+        ::
+
+            >>> data = {'points': [45.5, -122.7, 47.6, -122.3, 49.3, -123.1],
+            ...         'width': 2000,
+            ...         'severity': [3, 4],
+            ...         'key': 'abs'}
+            >>> incidents = TrafficCorridorApi(data)  # doctest: +SKIP
+            >>> incidents.get_resource()  # doctest: +SKIP
+    """
+    def __init__(self, data, *args, **kwargs):
+        points = data['points']
+        self.points = list(zip(points[::2], points[1::2]))
+        if not self.points:
+            raise ValueError('The route should have at least one point')
+        self.width = data['width']
+        self.filtered = None
+        super().__init__(data, *args, **kwargs)
+
+    def split_data(self, data):
+        """Splits the data into one request for each box covering the
+        corridor (and more when the ``severity``/``type`` lists have to be
+        split)
+
+        Args:
+            data (dict): Data given by the user
+
+        Returns:
+            chunks (list): List of data dictionaries, one for each request
+        """
+        self.boxes = self.planner.split_corridor(self.points, self.width)
+        other = dict((key, value) for key, value in data.items()
+                     if key not in ('points', 'width'))
+        chunks = []
+        for box in self.boxes:
+            chunks.extend(super().split_data(dict(other, mapArea=box)))
+        return chunks
+
+    def get_data(self):
+        """Gets data from the urls of the boxes"""
+        super().get_data()
+        self.filtered = None
+
+    @property
+    def response(self):
+        """Response of the incidents inside the corridor, as JSON (even for
+        a single box)"""
+        return json.dumps(self.response_to_dict())
+
+    def response_to_dict(self):
+        """Returns the merged response of all the boxes, keeping only the
+        incidents inside the corridor
+
+        Returns:
+            data (dict): JSON data from the output/response
+        """
+        if self.filtered is None:
+            data = super().response_to_dict()
+            set_incidents(data, [incident for incident in get_incidents(data)
+                                 if self.in_corridor(incident)])
+            self.filtered = data
+        return self.filtered
+
+    def in_corridor(self, incident):
+        """Returns whether the incident starts or ends inside the corridor
+        (incidents without location are kept)"""
+        points = incident_points(incident)
+        return not points or any(
+            polyline_distance(point, self.points) <= self.width / 2.0
+            for point in points)
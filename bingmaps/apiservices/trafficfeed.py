@@ -0,0 +1,125 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .trafficpoller import TrafficPoller, incident_key
+
+IncidentEvent = namedtuple('IncidentEvent', ['kind', 'incident', 'sequence'])
+
+EVENT_KINDS = ('created', 'updated', 'cleared')
+
+
+class TrafficFeed(TrafficPoller):
+    """Long-running feed of the changes of the traffic incidents of an area,
+    as a generator (:meth:`events`) or as an async iterator (``async for``).
+
+    Every change is an :class:`IncidentEvent`:
+      - ``created``: an incident which wasn't known
+      - ``updated``: an incident whose last modified time stamp changed
+      - ``cleared``: a known incident which is gone (its last known version)
+
+    The feed is pulled by the consumer: the next poll is only sent once the
+    consumer took all the events of the previous poll, so a slow consumer
+    slows the polling down instead of piling events up. The feed only holds
+    the known incidents and the events of the current poll.
+
+    The known incidents are updated event by event, as the events are handed
+    to the consumer. A consumer saving the :meth:`checkpoint` after handling
+    an event can restart the feed from it, and gets the events it didn't
+    handle yet (the changes since the checkpoint).
+
+    :ivar sequence: Number of the last event handed to the consumer
+    :ivar data: Data of the traffic incidents request
+    :ivar interval: Time in seconds between two polls
+    :ivar jitter: Fraction of the interval by which the polls are randomly
+        moved earlier or later
+    :ivar options: Arguments given to :class:`TrafficIncidentsApi` at every
+        poll
+
+    The async iterator runs the polls in a worker thread, so the event loop
+    isn't blocked by the requests.
+
+    Example:
+
+        ::
+
+            >>> feed = TrafficFeed({'mapArea': [37, -99, 41, -94],
+            ...                     'key': 'abs'}, interval=30)
+            >>> for event in feed.events():  # doctest: +SKIP
+            ...     queue.put(event)
+            ...     store.save(feed.checkpoint())
+            >>> async for event in feed:  # doctest: +SKIP
+            ...     await queue.put(event)
+    """
+    def __init__(self, data, interval=60, jitter=0.1, checkpoint=None,
+                 **options):
+        super().__init__(data, interval, jitter, **options)
+        self.sequence = 0
+        if checkpoint is not None:
+            self.sequence = checkpoint['sequence']
+            self.state = dict((incident_key(incident), incident)
+                              for incident in checkpoint['incidents'])
+        self._events = None
+        self._executor = None
+
+    def events(self, max_polls=None):
+        """Polls until :meth:`stop` is called (or ``max_polls`` polls were
+        made) and yields the changes of the incidents. A failed poll is
+        counted in ``errors`` and the feed keeps polling with the known
+        incidents.
+
+        Args:
+            max_polls (int): Maximum number of polls (no maximum if None)
+
+        Yields:
+            event (IncidentEvent): Kind of the change, incident and sequence
+            number of the event
+        """
+        self._stop.clear()
+        count = 0
+        while not self._stop.is_set():
+            try:
+                changes, _ = self.diff(self.fetch())
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = exc
+            else:
+                self.polls += 1
+                for kind, incidents in zip(EVENT_KINDS, changes):
+                    for incident in incidents:
+                        if kind == 'cleared':
+                            self.state.pop(incident_key(incident), None)
+                        else:
+                            self.state[incident_key(incident)] = incident
+                        self.sequence += 1
+                        yield IncidentEvent(kind, incident, self.sequence)
+            count += 1
+            if max_polls is not None and count >= max_polls:
+                break
+            self._stop.wait(self.next_delay())
+
+    def checkpoint(self):
+        """Returns the state of the feed, from which a new feed resumes
+
+        Returns:
+            checkpoint (dict): Sequence number of the last event and known
+            incidents (JSON serializable when the incidents are)
+        """
+        return {'sequence': self.sequence,
+                'incidents': list(self.state.values())}
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        import asyncio
+        if self._events is None:
+            self._events = self.events()
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return asyncio.get_event_loop().run_in_executor(self._executor,
+                                                        self._next_event)
+
+    def _next_event(self):
+        try:
+            return next(self._events)
+        except StopIteration:
+            self._executor.shutdown(wait=False)
+            raise StopAsyncIteration
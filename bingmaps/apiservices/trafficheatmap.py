@@ -0,0 +1,145 @@
+from array import array
+import math
+import threading
+from .trafficincidents import get_incidents, incident_point, incident_severity
+from .trafficpoller import diff_incidents, incident_key
+
+
+class IncidentHeatmap(object):
+    """Raster of the traffic incidents of an area: the number of incidents
+    (or the sum of their weights, such as their severities) in every cell of
+    a ``rows`` x ``cols`` grid over a bounding box.
+
+    The raster is updated incrementally: every incident remembers the cell
+    and the weight it added, so a new poll only touches the cells of the
+    incidents which appeared, changed (by their last modified time stamp) or
+    cleared, instead of binning all the incidents again.
+
+    :ivar bounds: (south, west, north, east) of the raster
+    :ivar rows: Number of rows of the raster (south to north)
+    :ivar cols: Number of columns of the raster (west to east)
+    :ivar weight: None to count the incidents, ``'severity'`` to sum their
+        severities, or a function returning the weight of an incident
+    :ivar values: Values of the cells, row major starting with the southern
+        most row (as the elevations of a Bounds request)
+
+    The incidents outside the bounding box or without location aren't
+    counted.
+
+    Example:
+
+        ::
+
+            >>> heatmap = IncidentHeatmap([47, -123, 48, -122], 2, 2,
+            ...                           weight='severity')
+            >>> heatmap.update([
+            ...     {'incidentId': 1, 'severity': 3,
+            ...      'point': {'coordinates': [47.2, -122.8]}},
+            ...     {'incidentId': 2, 'severity': 4,
+            ...      'point': {'coordinates': [47.7, -122.2]}}])
+            >>> heatmap.raster()
+            [[3.0, 0.0], [0.0, 4.0]]
+            >>> heatmap.update([{'incidentId': 2, 'severity': 1,
+            ...                  'lastModified': '/Date(1458870690000)/',
+            ...                  'point': {'coordinates': [47.7, -122.2]}}])
+            >>> heatmap.raster()
+            [[0.0, 0.0], [0.0, 1.0]]
+    """
+    def __init__(self, bounds, rows, cols, weight=None):
+        self.bounds = tuple(float(value) for value in bounds)
+        self.rows = rows
+        self.cols = cols
+        self.weight = weight
+        self.values = array('d', [0.0]) * (rows * cols)
+        self._contributions = {}
+        self._incidents = {}
+        self._lock = threading.Lock()
+        south, west, north, east = self.bounds
+        if not (north > south and east > west and rows > 0 and cols > 0):
+            raise ValueError('The raster should have a non-empty bounding '
+                             'box and at least one row and one column')
+
+    def cell(self, latitude, longitude):
+        """Returns the index in ``values`` of the cell containing the point
+        (None if the point is outside the bounding box)"""
+        south, west, north, east = self.bounds
+        if not (south <= latitude <= north and west <= longitude <= east):
+            return None
+        row = min(int((latitude - south) / (north - south) * self.rows),
+                  self.rows - 1)
+        col = min(int((longitude - west) / (east - west) * self.cols),
+                  self.cols - 1)
+        return row * self.cols + col
+
+    def contribution(self, incident):
+        """Returns the (cell, weight) an incident adds to the raster (None if
+        it is outside the raster)"""
+        point = incident_point(incident)
+        if point is None:
+            return None
+        cell = self.cell(*point)
+        if cell is None:
+            return None
+        if self.weight is None:
+            return cell, 1.0
+        if self.weight == 'severity':
+            severity = incident_severity(incident)
+            return cell, float(severity or 0)
+        return cell, float(self.weight(incident))
+
+    def update(self, incidents):
+        """Replaces the incidents of the raster with the incidents of a new
+        poll, applying only the changes since the previous update (see
+        :func:`diff_incidents`)
+
+        Args:
+            incidents (list/TrafficIncidentsApi): Incidents of a JSON/XML
+                response, or a fetched :class:`TrafficIncidentsApi`
+        """
+        if hasattr(incidents, 'response_to_dict'):
+            incidents = get_incidents(incidents.response_to_dict())
+        changes, _ = diff_incidents(self._incidents, incidents)
+        self.apply(changes)
+
+    def apply(self, changes):
+        """Applies the changes of a poll (see :class:`TrafficChanges`) to the
+        raster
+
+        Args:
+            changes (TrafficChanges): Added, changed and cleared incidents
+        """
+        added, changed, cleared = changes
+        with self._lock:
+            for incident in cleared:
+                key = incident_key(incident)
+                self._incidents.pop(key, None)
+                self._set(key, None)
+            for incident in list(added) + list(changed):
+                key = incident_key(incident)
+                self._incidents[key] = incident
+                self._set(key, self.contribution(incident))
+
+    def _set(self, key, contribution):
+        previous = self._contributions.pop(key, None)
+        if previous is not None:
+            value = self.values[previous[0]] - previous[1]
+            # Rounding errors of the floats would otherwise leave emptied
+            # cells slightly off zero
+            self.values[previous[0]] = 0.0 if abs(value) < 1e-9 else value
+        if contribution is not None:
+            self.values[contribution[0]] += contribution[1]
+            self._contributions[key] = contribution
+
+    def raster(self):
+        """Returns the values as a list of rows, starting with the southern
+        most row"""
+        with self._lock:
+            return [list(self.values[row * self.cols:(row + 1) * self.cols])
+                    for row in range(self.rows)]
+
+    def total(self):
+        """Returns the sum of the values of all the cells"""
+        return math.fsum(self.values)
+
+    def __len__(self):
+        return len(self._contributions)
@@ -1,8 +1,18 @@
-from bingmaps.urls import TrafficIncidentsUrl, TrafficIncidentsSchema
+from bingmaps.urls import (
+    RequestPlanner,
+    TrafficIncidentsUrl,
+    TrafficIncidentsSchema
+)
+from bingmaps.cache import CachedResponse, canonical_url
 from collections import namedtuple
-import requests
+import calendar
+import copy
 import json
+import os
+import re
+import time
 import xmltodict
+from . import transport
 
 
 class TrafficIncidentsApi(object):
@@ -48,37 +58,127 @@ class TrafficIncidentsApi(object):
         to TrafficIncidentsSchema.
           - file_name - 'traffic_incidents'
     :ivar incidents_data: Response from the URL
+    :ivar responses: Responses from all the URLs when the data was split
+        into multiple requests
+    :ivar planner: The :class:`RequestPlanner` which keeps the URLs within
+        the URL length limit of the service.
+    :ivar max_workers: Maximum number of requests running at the same time
+        when the data has to be split into multiple requests.
+    :ivar precision: Number of decimal places the coordinates of the mapArea
+        are rounded to in the URL (full precision if None).
+    :ivar cache: Cache of the responses (see :class:`ResponseCache`). When
+        given, the responses are looked up in the cache before sending the
+        requests.
+    :ivar traffic_cache: Short-lived cache of the responses which serves
+        stale responses while refreshing them in the background (see
+        :class:`TrafficCache`).
+    :ivar coverage_cache: Cache of the responses which also answers the
+        requests covered by a cached broader request (a mapArea inside the
+        cached mapArea and narrower ``severity``/``type`` filters) by
+        filtering the cached incidents locally (see
+        :class:`TrafficCoverageCache`).
+    :ivar conditional_cache: Last responses of the URLs with their
+        ``ETag``/``Last-Modified`` validators (see :class:`ConditionalCache`).
+        When given, the requests are sent as conditional requests and a
+        ``304 Not Modified`` answer reuses the last response.
+
+    The mapArea may be arbitrarily large: a mapArea larger than the 500 km x
+    500 km limit of the service is split into a grid of tiles, one request
+    for each tile. When the URL is longer than the URL length limit of the
+    planner, the ``severity``/``type`` lists are split into multiple requests
+    too. The requests are fetched concurrently and the incidents of all the
+    responses are merged, dropping the duplicated incidents (by incident id),
+    such as the incidents straddling the edges of the tiles.
 
     Some of the examples are illustrated in Examples page
     """
-    def __init__(self, data, http_protocol='http'):
+    def __init__(self, data, http_protocol='http', planner=None,
+                 max_workers=8, precision=None, cache=None,
+                 traffic_cache=None, coverage_cache=None,
+                 conditional_cache=None):
         self.http_protocol = http_protocol
-        self.schema = TrafficIncidentsUrl(data,
-                                          TrafficIncidentsSchema(),
-                                          http_protocol)
+        self.cache = cache
+        self.traffic_cache = traffic_cache
+        self.coverage_cache = coverage_cache
+        self.conditional_cache = conditional_cache
+        self.data = data
+        self.precision = precision
+        self.planner = planner or RequestPlanner()
+        self.max_workers = max_workers
+        self.file_name = 'traffic_incidents'
+        self.schemas = [self.url_schema(chunk)
+                        for chunk in self.split_data(data)]
+        self.schema = self.schemas[0]
         self.incidents_data = None
+        self.responses = []
+        self.merged = None
         self.get_data()
 
-    def build_url(self):
-        """Builds the URL for elevations API services based on the data given
-        by the user.
+    def url_schema(self, data):
+        """Returns the TrafficIncidentsUrl for the given data"""
+        schema = TrafficIncidentsSchema(
+            context={'precision': self.precision})
+        return TrafficIncidentsUrl(data, schema, self.http_protocol)
+
+    def split_data(self, data):
+        """Splits the data into the fewest requests which the service
+        accepts: the mapArea is split into tiles of at most 500 km x 500 km
+        and the ``severity``/``type`` lists are split until the URLs fit in
+        the URL length limit of the planner.
+
+        Args:
+            data (dict): Data given by the user
 
         Returns:
-            url (str): URL for the elevations API services
+            chunks (list): List of data dictionaries, one for each request
         """
+        def fits(chunk):
+            return self.planner.fits(self.build_url(self.url_schema(chunk)),
+                                     'Traffic')
+        areas = [None]
+        if isinstance(data.get('mapArea'), list) and \
+                len(data['mapArea']) == 4:
+            areas = self.planner.split_area(data['mapArea'])
+        chunks = []
+        for area in areas:
+            chunk = data if area is None or len(areas) == 1 else \
+                dict(data, mapArea=area)
+            chunks.extend(self.planner.split_lists(chunk, ['severity', 'type'],
+                                                   fits))
+        return chunks
+
+    def build_url(self, schema=None):
+        """Builds the URL for traffic incidents API services based on the data
+        given by the user.
+
+        Returns:
+            url (str): URL for the traffic incidents API services
+        """
+        if schema is None:
+            schema = self.schema
         url = '{protocol}/{url}/{rest}/{version}/{restapi}/{rscpath}/' \
-              '{query}'.format(protocol=self.schema.protocol,
-                               url=self.schema.main_url,
-                               rest=self.schema.rest,
-                               version=self.schema.version,
-                               restapi=self.schema.restApi,
-                               rscpath=self.schema.resourcePath,
-                               query=self.schema.query)
+              '{query}'.format(protocol=schema.protocol,
+                               url=schema.main_url,
+                               rest=schema.rest,
+                               version=schema.version,
+                               restapi=schema.restApi,
+                               rscpath=schema.resourcePath,
+                               query=schema.query)
         return url
 
+    def build_urls(self):
+        """Builds the URLs for all the requests of the data given by the user.
+
+        Returns:
+            urls (list): URLs for the traffic incidents API services
+        """
+        return [self.build_url(schema) for schema in self.schemas]
+
     @property
     def response(self):
         """Response from the built URL"""
+        if len(self.responses) > 1:
+            return json.dumps(self.response_to_dict())
         return self.incidents_data.text
 
     @property
@@ -87,11 +187,49 @@ class TrafficIncidentsApi(object):
         return self.incidents_data.status_code
 
     def get_data(self):
-        """Gets data from the given url"""
-        url = self.build_url()
-        self.incidents_data = requests.get(url)
-        if not self.incidents_data.status_code == 200:
-            raise self.incidents_data.raise_for_status()
+        """Gets data from the given url/urls, or from a covering response of
+        the coverage cache when given"""
+        if self.coverage_cache is not None and self.answer_locally():
+            return
+        self.responses = transport.map_concurrently(
+            self.fetch, self.build_urls(), self.max_workers)
+        self.incidents_data = self.responses[0]
+        self.merged = None
+        if self.coverage_cache is not None and all(
+                response.status_code == 200 for response in self.responses):
+            self.coverage_cache.set(
+                self.data, copy.deepcopy(self.response_to_dict()))
+
+    def answer_locally(self):
+        """Answers the request by filtering the incidents of a cached
+        response covering it
+
+        Returns:
+            answered (bool): Whether the request was answered locally
+        """
+        cached = self.coverage_cache.find(self.data)
+        if cached is None:
+            return False
+        data = copy.deepcopy(cached)
+        set_incidents(data, filter_incidents(get_incidents(data), self.data))
+        if 'resourceSets' in data:
+            text = json.dumps(data)
+        else:
+            text = xmltodict.unparse(data)
+        self.responses = [CachedResponse(text, 200, {})]
+        self.incidents_data = self.responses[0]
+        self.merged = None
+        return True
+
+    def fetch(self, url):
+        """Gets the response for the url, through the traffic cache when
+        given"""
+        def get():
+            return transport.get(url, self.cache,
+                                 conditional_cache=self.conditional_cache)
+        if self.traffic_cache is None:
+            return get()
+        return self.traffic_cache.get(canonical_url(url), get)
 
     def get_resource(self):
         resourceSets = self.response_to_dict()
@@ -112,16 +250,28 @@ class TrafficIncidentsApi(object):
     def response_to_dict(self):
         """This method helps in returning the output JSON data from the URL
         and also it helps in converting the XML output/response (string) to a
-        JSON object
+        JSON object. When the data was split into multiple requests, the
+        incidents of all the responses are merged into the first response.
 
         Returns:
             data (dict): JSON data from the output/response
         """
+        if len(self.responses) > 1:
+            if self.merged is None:
+                data = self.text_to_dict(self.incidents_data.text)
+                set_incidents(data, merge_incidents(
+                    get_incidents(self.text_to_dict(response.text))
+                    for response in self.responses))
+                self.merged = data
+            return self.merged
+        return self.text_to_dict(self.incidents_data.text)
+
+    @staticmethod
+    def text_to_dict(text):
         try:
-            return json.loads(self.incidents_data.text)
+            return json.loads(text)
         except Exception:
-            return json.loads(json.dumps(xmltodict.parse(
-                self.incidents_data.text)))
+            return json.loads(json.dumps(xmltodict.parse(text)))
 
     @property
     def get_coordinates(self):
@@ -424,3 +574,170 @@ class TrafficIncidentsApi(object):
             except (KeyError, TypeError):
                 return [verified(resource['Verified'])
                         for resource in resource_list]
+
+    def to_json_file(self, path, file_name=None):
+        """Writes output to a JSON file with the given file name"""
+        if bool(path) and os.path.isdir(path):
+            self.write_to_json(path, file_name)
+        else:
+            self.write_to_json(os.getcwd(), file_name)
+
+    def write_to_json(self, path, file_name):
+        if file_name is None:
+            file_name = self.file_name
+        with open(os.path.join(path,
+                               '{0}.{1}'.format(file_name,
+                                                'json')), 'w') as fp:
+            json.dump(self.response, fp)
+
+
+def incident_id(incident):
+    """Returns the incident id of an incident from a JSON/XML response"""
+    if 'incidentId' in incident:
+        return incident['incidentId']
+    return incident.get('IncidentId')
+
+
+def last_modified(incident):
+    """Returns the last modified time stamp of an incident from a JSON/XML
+    response"""
+    if 'lastModified' in incident:
+        return incident['lastModified']
+    return incident.get('LastModifiedUTC')
+
+
+def incident_point(incident):
+    """Returns the (latitude, longitude) of the location of an incident from
+    a JSON/XML response (None if the incident has no location)"""
+    try:
+        latitude, longitude = incident['point']['coordinates']
+    except (KeyError, TypeError, ValueError):
+        try:
+            point = incident.get('Point') or incident['ToPoint']
+            latitude, longitude = point['Latitude'], point['Longitude']
+        except (KeyError, TypeError):
+            return None
+    return float(latitude), float(longitude)
+
+
+def parse_time(value):
+    """Returns the POSIX time stamp of a time of a JSON (``/Date(ms)/``) or
+    XML (ISO 8601 in UTC) response (None if the time is missing or invalid)"""
+    if not value:
+        return None
+    match = re.match(r'/Date\((-?\d+)', value)
+    if match:
+        return int(match.group(1)) / 1000.0
+    try:
+        return float(calendar.timegm(time.strptime(
+            value.rstrip('Z').split('.')[0], '%Y-%m-%dT%H:%M:%S')))
+    except ValueError:
+        return None
+
+
+def incident_times(incident):
+    """Returns the (start, end) POSIX time stamps of an incident from a
+    JSON/XML response (None for a missing time)"""
+    return (parse_time(incident.get('start', incident.get('StartTimeUTC'))),
+            parse_time(incident.get('end', incident.get('EndTimeUTC'))))
+
+
+def incident_severity(incident):
+    """Returns the severity of an incident from a JSON/XML response (None if
+    missing)"""
+    severity = incident.get('severity', incident.get('Severity'))
+    return None if severity is None else int(severity)
+
+
+def incident_points(incident):
+    """Returns the (latitude, longitude) points of the start and of the end
+    of an incident from a JSON/XML response"""
+    points = []
+    for name in ('point', 'toPoint'):
+        try:
+            latitude, longitude = incident[name]['coordinates']
+            points.append((float(latitude), float(longitude)))
+        except (KeyError, TypeError, ValueError):
+            continue
+    for name in ('Point', 'ToPoint'):
+        try:
+            point = incident[name]
+            points.append((float(point['Latitude']),
+                           float(point['Longitude'])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return points
+
+
+def filter_incidents(incidents, data):
+    """Returns the incidents matching the mapArea and the ``severity``/
+    ``type`` filters of the data: the incidents starting or ending inside the
+    mapArea (or without location) whose severity and type are in the filters
+
+    Args:
+        incidents (list): Incidents of a JSON/XML response
+        data (dict): Data of a traffic incidents request
+
+    Returns:
+        incidents (list): Matching incidents
+    """
+    south, west, north, east = [float(value) for value in data['mapArea']]
+    filters = [(names, set(int(value) for value in data[names[0]]))
+               for names in (('severity', 'Severity'), ('type', 'Type'))
+               if data.get(names[0]) is not None]
+    matching = []
+    for incident in incidents:
+        points = incident_points(incident)
+        if points and not any(south <= latitude <= north and
+                              west <= longitude <= east
+                              for latitude, longitude in points):
+            continue
+        if all(int(incident.get(names[0], incident.get(names[1], -1))) in
+               values for names, values in filters):
+            matching.append(incident)
+    return matching
+
+
+def get_incidents(data):
+    """Retrieves the list of incidents from a JSON/XML response converted to
+    a dictionary"""
+    try:
+        return list(data['resourceSets'][0]['resources'])
+    except KeyError:
+        resources = data['Response']['ResourceSets']['ResourceSet'][
+            'Resources']
+        if not resources:
+            return []
+        incidents = resources['TrafficIncident']
+        if isinstance(incidents, list):
+            return incidents
+        return [incidents]
+
+
+def set_incidents(data, incidents):
+    """Replaces the incidents of a JSON/XML response converted to a
+    dictionary"""
+    try:
+        resource_set = data['resourceSets'][0]
+        resource_set['resources'] = incidents
+        resource_set['estimatedTotal'] = len(incidents)
+    except KeyError:
+        resource_set = data['Response']['ResourceSets']['ResourceSet']
+        resource_set['Resources'] = \
+            {'TrafficIncident': incidents} if incidents else None
+        resource_set['EstimatedTotal'] = str(len(incidents))
+
+
+def merge_incidents(incident_lists):
+    """Merges lists of incidents into a single list, keeping the first of
+    the incidents with the same incident id"""
+    merged = []
+    seen = set()
+    for incidents in incident_lists:
+        for incident in incidents:
+            key = incident_id(incident)
+            if key is not None and key in seen:
+                continue
+            seen.add(key)
+            merged.append(incident)
+    return merged
@@ -0,0 +1,223 @@
+from bingmaps.urls import EARTH_RADIUS, distance
+from collections import defaultdict
+import heapq
+import math
+from .trafficincidents import get_incidents, incident_point
+
+
+class IncidentIndex(object):
+    """In-memory spatial index of traffic incidents, answering bounding box,
+    radius and k-nearest queries without scanning all the incidents.
+
+    The incidents are put in the cells of a uniform grid of ``cell_size``
+    degrees by the location of the incident (``point`` of the JSON response,
+    ``Point`` of the XML response). The queries only look at the cells which
+    can contain a match.
+
+    The queries return the incidents, or with ``indices=True`` the positions
+    of the incidents in the list the index was built from, which are also
+    the positions in the lists of :class:`TrafficIncidentsApi` such as
+    ``get_coordinates`` and ``severity``.
+
+    :ivar incidents: Incidents of the index, in the order they were given
+    :ivar points: (latitude, longitude) of every incident (None for the
+        incidents without location, which are never returned by the queries)
+    :ivar cell_size: Size in degrees of the cells of the grid (0.05: about
+        5 km)
+
+    The grid doesn't wrap around the antimeridian.
+
+    Example:
+
+        ::
+
+            >>> index = IncidentIndex([
+            ...     {'incidentId': 1,
+            ...      'point': {'coordinates': [47.6, -122.3]}},
+            ...     {'incidentId': 2,
+            ...      'point': {'coordinates': [47.7, -122.2]}},
+            ...     {'incidentId': 3,
+            ...      'point': {'coordinates': [45.5, -122.7]}}])
+            >>> [incident['incidentId']
+            ...  for incident in index.within_radius((47.61, -122.3), 2000)]
+            [1]
+            >>> index.within_bounds([47, -123, 48, -122], indices=True)
+            [0, 1]
+            >>> index.nearest((45, -122), k=2, indices=True)
+            [2, 0]
+    """
+    def __init__(self, incidents, cell_size=0.05):
+        self.incidents = list(incidents)
+        self.cell_size = cell_size
+        self.points = [incident_point(incident)
+                       for incident in self.incidents]
+        self._cells = defaultdict(list)
+        self._max_latitude = 0.0
+        for position, point in enumerate(self.points):
+            if point is None:
+                continue
+            self._cells[self.cell(*point)].append(position)
+            self._max_latitude = max(self._max_latitude, abs(point[0]))
+        if self._cells:
+            rows = [row for row, _ in self._cells]
+            cols = [col for _, col in self._cells]
+            self._extent = (min(rows), min(cols), max(rows), max(cols))
+
+    @classmethod
+    def from_response(cls, response, cell_size=0.05):
+        """Builds the index of the incidents of a :class:`TrafficIncidentsApi`
+
+        Args:
+            response (TrafficIncidentsApi): Fetched traffic incidents
+            cell_size (float): Size in degrees of the cells of the grid
+
+        Returns:
+            index (IncidentIndex): Index of the incidents of the response
+        """
+        return cls(get_incidents(response.response_to_dict()), cell_size)
+
+    def cell(self, latitude, longitude):
+        """Returns the (row, column) of the cell of the grid containing the
+        point"""
+        return (int(math.floor(latitude / self.cell_size)),
+                int(math.floor(longitude / self.cell_size)))
+
+    def within_bounds(self, bounds, indices=False):
+        """Returns the incidents inside a bounding box
+
+        Args:
+            bounds (list): (south, west, north, east) of the bounding box
+            indices (bool): Whether the positions of the incidents are
+                returned instead of the incidents
+
+        Returns:
+            incidents (list): Incidents (or positions) inside the bounding
+            box, in the order of the index
+        """
+        south, west, north, east = [float(value) for value in bounds]
+        positions = [position
+                     for position in self._candidates(south, west, north, east)
+                     if south <= self.points[position][0] <= north and
+                     west <= self.points[position][1] <= east]
+        return self._results(sorted(positions), indices)
+
+    def within_radius(self, point, radius, indices=False):
+        """Returns the incidents within a distance of a point
+
+        Args:
+            point (tuple): (latitude, longitude) of the point
+            radius (float): Distance in metres
+            indices (bool): Whether the positions of the incidents are
+                returned instead of the incidents
+
+        Returns:
+            incidents (list): Incidents (or positions) within the distance,
+            in the order of the index
+        """
+        latitude, longitude = [float(value) for value in point]
+        delta = math.degrees(radius / EARTH_RADIUS)
+        parallel = math.cos(math.radians(min(abs(latitude) + delta, 90.0)))
+        delta_longitude = 180.0 if parallel <= 0 else \
+            min(delta / parallel, 180.0)
+        positions = [position for position in self._candidates(
+            latitude - delta, longitude - delta_longitude,
+            latitude + delta, longitude + delta_longitude)
+            if distance((latitude, longitude),
+                        self.points[position]) <= radius]
+        return self._results(sorted(positions), indices)
+
+    def nearest(self, point, k=1, indices=False):
+        """Returns the k incidents nearest to a point, searching the cells of
+        the grid ring by ring around the point until no closer incident can
+        be found. Only the parts of the rings inside the occupied extent of
+        the grid are searched, starting with the first ring reaching it.
+
+        Args:
+            point (tuple): (latitude, longitude) of the point
+            k (int): Number of incidents
+            indices (bool): Whether the positions of the incidents are
+                returned instead of the incidents
+
+        Returns:
+            incidents (list): Incidents (or positions), nearest first
+        """
+        if not self._cells or k < 1:
+            return []
+        latitude, longitude = [float(value) for value in point]
+        row, col = self.cell(latitude, longitude)
+        first_row, first_col, last_row, last_col = self._extent
+        rings = max(row - first_row, last_row - row, col - first_col,
+                    last_col - col)
+        first_ring = max(first_row - row, row - last_row, first_col - col,
+                         col - last_col, 0)
+        parallel = math.cos(math.radians(max(self._max_latitude,
+                                             min(abs(latitude), 90.0))))
+        found = []
+        for ring in range(first_ring, rings + 1):
+            for cell in ring_cells(row, col, ring, self._extent):
+                for position in self._cells.get(cell, ()):
+                    found.append((distance((latitude, longitude),
+                                           self.points[position]), position))
+            if len(found) >= k:
+                found = heapq.nsmallest(k, found)
+                if found[-1][0] <= self._ring_distance(ring, parallel):
+                    break
+        found = heapq.nsmallest(k, found)
+        return self._results([position for _, position in found], indices)
+
+    def _ring_distance(self, ring, parallel):
+        """Returns a lower bound of the distance from the point to the
+        incidents of the cells beyond the ring"""
+        degrees = math.radians(min(ring * self.cell_size, 180.0))
+        return EARTH_RADIUS * min(
+            degrees, 2 * math.asin(min(parallel * math.sin(degrees / 2), 1.0)))
+
+    def _candidates(self, south, west, north, east):
+        if not self._cells:
+            return []
+        first_row, first_col, last_row, last_col = self._extent
+        south_row, west_col = self.cell(south, west)
+        north_row, east_col = self.cell(north, east)
+        south_row, west_col = max(south_row, first_row), max(west_col,
+                                                             first_col)
+        north_row, east_col = min(north_row, last_row), min(east_col, last_col)
+        if (north_row - south_row + 1) * (east_col - west_col + 1) > \
+                len(self._cells):
+            return [position for (row, col), positions in self._cells.items()
+                    if south_row <= row <= north_row and
+                    west_col <= col <= east_col for position in positions]
+        return [position for row in range(south_row, north_row + 1)
+                for col in range(west_col, east_col + 1)
+                for position in self._cells.get((row, col), ())]
+
+    def _results(self, positions, indices):
+        if indices:
+            return positions
+        return [self.incidents[position] for position in positions]
+
+    def __len__(self):
+        return len(self.incidents)
+
+
+def ring_cells(row, col, ring, extent=None):
+    """Returns the cells of the grid at the given Chebyshev distance of the
+    cell (row, col), only inside the (first row, first column, last row, last
+    column) extent when given"""
+    if extent is None:
+        extent = (row - ring, col - ring, row + ring, col + ring)
+    first_row, first_col, last_row, last_col = extent
+    if ring == 0:
+        if first_row <= row <= last_row and first_col <= col <= last_col:
+            return [(row, col)]
+        return []
+    cols = range(max(col - ring, first_col), min(col + ring, last_col) + 1)
+    rows = range(max(row - ring + 1, first_row),
+                 min(row + ring - 1, last_row) + 1)
+    cells = []
+    for r in (row - ring, row + ring):
+        if first_row <= r <= last_row:
+            cells += [(r, c) for c in cols]
+    for c in (col - ring, col + ring):
+        if first_col <= c <= last_col:
+            cells += [(r, c) for r in rows]
+    return cells
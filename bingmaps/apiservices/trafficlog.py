@@ -0,0 +1,318 @@
+from collections import namedtuple
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from .trafficfeed import EVENT_KINDS
+from .trafficincidents import get_incidents
+from .trafficpoller import diff_incidents, incident_key
+
+LogEvent = namedtuple('LogEvent', ['time', 'kind', 'key', 'incident'])
+
+LOG_MAGIC = b'BMTL'
+
+LOG_VERSION = 2
+
+COLUMNS = ('time', 'kind', 'key', 'incident')
+
+BLOCK_HEADER = struct.Struct('<4sBBddIIIII')
+
+CHANGES_BLOCK = 0
+
+KEYFRAME_BLOCK = 1
+
+
+class TrafficLog(object):
+    """Append-only log of the changes of the traffic incidents between
+    polls, for archiving the polls and replaying them (for instance to
+    backtest alerting rules).
+
+    Only the changes are stored: the incidents which were created or updated
+    since the previous poll, and the keys of the cleared incidents. By
+    default every poll is written as its own block as soon as it is
+    appended, so a crash loses at most the poll being written; with
+    ``chunk_seconds`` the changes are buffered into blocks covering that
+    many seconds. Every block stores its columns (time, kind, key and
+    incident) separately compressed, after a small header with the time
+    range of the block, so a time-range replay skips the blocks outside the
+    range without decompressing them and only decompresses the incidents of
+    the blocks it reads. The log is read through a memory map.
+
+    Every ``keyframe_seconds`` seconds, a keyframe block with all the known
+    incidents is also written, so the incidents known at a time (and the
+    state of a reopened log) are rebuilt from the nearest keyframe instead
+    of from the start of the log.
+
+    :ivar path: Path of the log file
+    :ivar chunk_seconds: Time span in seconds of a block (0: a block for
+        every poll)
+    :ivar max_events: Maximum number of changes buffered before a block is
+        written
+    :ivar keyframe_seconds: Time in seconds between two keyframes (None: no
+        keyframes)
+    :ivar clock: Function returning the current POSIX time (time of the
+        polls appended without time)
+
+    The buffered changes of the current block can be written earlier with
+    :meth:`flush` (or :meth:`close`). A log is reopened for appending by
+    rebuilding its state, and a truncated last block (after a crash) is
+    dropped.
+
+    Example:
+
+        ::
+
+            >>> import os, tempfile
+            >>> path = os.path.join(tempfile.mkdtemp(), 'traffic.log')
+            >>> with TrafficLog(path) as log:
+            ...     changes = log.append([{'incidentId': 1},
+            ...                           {'incidentId': 2}], 100)
+            ...     changes = log.append([{'incidentId': 2}], 160)
+            >>> [(event.time, event.kind, event.key)
+            ...  for event in replay_log(path, start=150)]
+            [(160.0, 'cleared', 1)]
+            >>> sorted(log_state(path, 120))
+            [1, 2]
+    """
+    def __init__(self, path, chunk_seconds=0, max_events=100000,
+                 keyframe_seconds=3600, clock=None):
+        self.path = path
+        self.chunk_seconds = chunk_seconds
+        self.max_events = max_events
+        self.keyframe_seconds = keyframe_seconds
+        self.clock = clock or time.time
+        self._columns = dict((name, []) for name in COLUMNS)
+        self._chunk_start = None
+        self._last_time = None
+        self._keyframe_time = None
+        valid = 0
+        for offset, header, _ in read_blocks(path):
+            valid = offset + block_size(header)
+            self._last_time = header[4]
+            if header[2] == KEYFRAME_BLOCK:
+                self._keyframe_time = header[4]
+            elif self._keyframe_time is None:
+                self._keyframe_time = header[3]
+        if os.path.exists(path) and os.path.getsize(path) > valid:
+            with open(path, 'r+b') as fp:
+                fp.truncate(valid)
+        self._state = log_state(path)
+        self._fp = open(path, 'ab')
+
+    def append(self, incidents, timestamp=None):
+        """Appends the changes between the previous poll and a new poll
+
+        Args:
+            incidents (list/TrafficIncidentsApi): Incidents of a JSON/XML
+                response, or a fetched :class:`TrafficIncidentsApi`
+            timestamp (float): POSIX time of the poll (now if None)
+
+        Returns:
+            changes (TrafficChanges): Added, changed and cleared incidents
+        """
+        if hasattr(incidents, 'response_to_dict'):
+            incidents = get_incidents(incidents.response_to_dict())
+        timestamp = float(self.clock() if timestamp is None else timestamp)
+        if self._last_time is not None and timestamp < self._last_time:
+            raise ValueError('The polls should be appended in time order')
+        if self._chunk_start is not None and \
+                timestamp - self._chunk_start >= self.chunk_seconds:
+            self.flush()
+        changes, self._state = diff_incidents(self._state, incidents)
+        if self._chunk_start is None:
+            self._chunk_start = timestamp
+        if self._keyframe_time is None:
+            self._keyframe_time = timestamp
+        self._last_time = timestamp
+        for kind, changed in zip(EVENT_KINDS, changes):
+            for incident in changed:
+                self._columns['time'].append(timestamp)
+                self._columns['kind'].append(EVENT_KINDS.index(kind))
+                self._columns['key'].append(incident_key(incident))
+                self._columns['incident'].append(
+                    None if kind == 'cleared' else incident)
+        if timestamp - self._chunk_start >= self.chunk_seconds or \
+                len(self._columns['time']) >= self.max_events:
+            self.flush()
+        if self.keyframe_seconds is not None and \
+                timestamp - self._keyframe_time >= self.keyframe_seconds:
+            self.flush()
+            self.write_keyframe(timestamp)
+        return changes
+
+    def flush(self):
+        """Writes the buffered changes as a block"""
+        if self._columns['time']:
+            self._write_block(CHANGES_BLOCK, self._columns)
+        self._columns = dict((name, []) for name in COLUMNS)
+        self._chunk_start = None
+
+    def write_keyframe(self, timestamp=None):
+        """Writes a keyframe block with all the known incidents (the buffered
+        changes should be flushed first)
+
+        Args:
+            timestamp (float): POSIX time of the keyframe (time of the last
+                appended poll if None)
+        """
+        timestamp = self._last_time if timestamp is None else timestamp
+        keys = list(self._state)
+        self._write_block(KEYFRAME_BLOCK, {
+            'time': [timestamp] * len(keys),
+            'kind': [EVENT_KINDS.index('created')] * len(keys),
+            'key': keys,
+            'incident': [self._state[key] for key in keys]}, timestamp)
+        self._keyframe_time = timestamp
+
+    def _write_block(self, kind, columns, timestamp=None):
+        times = columns['time']
+        start = times[0] if times else timestamp
+        end = times[-1] if times else timestamp
+        compressed = [zlib.compress(json.dumps(
+            columns[name], separators=(',', ':')).encode('utf-8'))
+            for name in COLUMNS]
+        self._fp.write(BLOCK_HEADER.pack(
+            LOG_MAGIC, LOG_VERSION, kind, start, end, len(times),
+            *[len(column) for column in compressed]))
+        for column in compressed:
+            self._fp.write(column)
+        self._fp.flush()
+
+    def close(self):
+        """Writes the buffered changes and closes the log"""
+        if not self._fp.closed:
+            self.flush()
+            self._fp.close()
+
+    @property
+    def state(self):
+        """Incidents of the last appended poll by incident id
+
+        :getter: Returns the known incidents
+        :type: dict
+        """
+        return self._state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def block_size(header):
+    """Returns the size in bytes of a block (header included)"""
+    return BLOCK_HEADER.size + sum(header[6:])
+
+
+def read_blocks(path, offset=0):
+    """Iterates over the complete blocks of a log file through a memory map
+
+    Args:
+        path (str): Path of the log file
+        offset (int): Offset of the first block to read (start of the file
+            by default)
+
+    Returns:
+        blocks (generator): Generator of (offset, header, columns) tuples,
+        where columns is a function returning the decompressed column of the
+        block with the given name
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, 'rb') as fp:
+        mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        while offset + BLOCK_HEADER.size <= len(mapped):
+            if not mapped[offset:offset + 4] == LOG_MAGIC:
+                break
+            if not mapped[offset + 4] == LOG_VERSION:
+                raise ValueError('Unsupported traffic log version {0}'.format(
+                    mapped[offset + 4]))
+            header = BLOCK_HEADER.unpack_from(mapped, offset)
+            if offset + block_size(header) > len(mapped):
+                break
+            yield offset, header, column_reader(mapped, offset, header)
+            offset += block_size(header)
+    finally:
+        mapped.close()
+
+
+def column_reader(mapped, offset, header):
+    """Returns a function decompressing a column of a block"""
+    def column(name):
+        start = offset + BLOCK_HEADER.size + sum(
+            header[6:6 + COLUMNS.index(name)])
+        end = start + header[6 + COLUMNS.index(name)]
+        return json.loads(zlib.decompress(mapped[start:end]).decode('utf-8'))
+    return column
+
+
+def replay_log(path, start=None, end=None, offset=0):
+    """Replays the changes of a log between two times
+
+    Args:
+        path (str): Path of the log file
+        start (float): POSIX time of the first changes (from the start of
+            the log if None)
+        end (float): POSIX time of the last changes (to the end of the log if
+            None)
+        offset (int): Offset of the first block to read (start of the file
+            by default)
+
+    Returns:
+        events (generator): Generator of :class:`LogEvent` (time, kind
+        ``created``/``updated``/``cleared``, key and incident, None for the
+        cleared incidents) in the order they were appended
+    """
+    for _, header, column in read_blocks(path, offset):
+        if end is not None and header[3] > end:
+            break
+        if header[2] == KEYFRAME_BLOCK or \
+                start is not None and header[4] < start:
+            continue
+        times = column('time')
+        selected = [index for index, value in enumerate(times)
+                    if (start is None or value >= start) and
+                    (end is None or value <= end)]
+        if not selected:
+            continue
+        kinds, keys, incidents = column('kind'), column('key'), \
+            column('incident')
+        for index in selected:
+            yield LogEvent(times[index], EVENT_KINDS[kinds[index]],
+                           keys[index], incidents[index])
+
+
+def log_state(path, at=None):
+    """Returns the incidents known at a time, starting from the last
+    keyframe before the time and replaying the changes after it
+
+    Args:
+        path (str): Path of the log file
+        at (float): POSIX time (end of the log if None)
+
+    Returns:
+        state (dict): Incidents by incident id
+    """
+    keyframe = None
+    for offset, header, _ in read_blocks(path):
+        if at is not None and header[3] > at:
+            break
+        if header[2] == KEYFRAME_BLOCK:
+            keyframe = offset
+    state = {}
+    offset = 0
+    if keyframe is not None:
+        for offset, header, column in read_blocks(path, keyframe):
+            state = dict(zip(column('key'), column('incident')))
+            offset += block_size(header)
+            break
+    for event in replay_log(path, end=at, offset=offset):
+        if event.kind == 'cleared':
+            state.pop(event.key, None)
+        else:
+            state[event.key] = event.incident
+    return state
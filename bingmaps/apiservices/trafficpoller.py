@@ -0,0 +1,175 @@
+from collections import namedtuple
+import json
+import random
+import threading
+from .trafficincidents import (
+    TrafficIncidentsApi,
+    get_incidents,
+    incident_id,
+    last_modified
+)
+
+TrafficChanges = namedtuple('TrafficChanges', ['added', 'changed', 'cleared'])
+
+
+class TrafficPoller(object):
+    """Polls the traffic incidents API service for the same data and emits
+    only the changes between the polls:
+      - ``added``: incidents which weren't in the previous poll
+      - ``changed``: incidents whose last modified time stamp changed
+      - ``cleared``: incidents of the previous poll which are gone (the last
+        known version of the incident is emitted)
+
+    The incidents are identified by their incident id, so the downstream
+    processing scales with the churn of the incidents instead of with the
+    number of incidents.
+
+    :ivar data: Data of the traffic incidents request
+    :ivar interval: Time in seconds between two polls
+    :ivar jitter: Fraction of the interval by which the polls are randomly
+        moved earlier or later (0.1: +/- 10%), so that many pollers don't
+        hit the service at the same time
+    :ivar options: Arguments given to :class:`TrafficIncidentsApi` at every
+        poll (such as ``cache`` or ``traffic_cache``)
+    :ivar state: Last known version of every incident by incident id
+    :ivar polls: Number of successful polls
+    :ivar errors: Number of failed polls
+    :ivar last_error: Exception of the last failed poll
+
+    Example:
+
+        ::
+
+            >>> poller = TrafficPoller({'mapArea': [37, -105, 45, -94],
+            ...                         'key': 'abs'}, interval=30)
+            >>> changes = poller.poll()  # doctest: +SKIP
+            >>> poller.run(lambda changes: print(changes))  # doctest: +SKIP
+    """
+    def __init__(self, data, interval=60, jitter=0.1, **options):
+        self.data = data
+        self.interval = interval
+        self.jitter = jitter
+        self.options = options
+        self.state = {}
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+
+    def poll(self):
+        """Fetches the incidents and returns the changes since the previous
+        poll
+
+        Returns:
+            changes (TrafficChanges): Added, changed and cleared incidents
+        """
+        changes = self.update(self.fetch())
+        self.polls += 1
+        return changes
+
+    def fetch(self):
+        """Fetches the current incidents
+
+        Returns:
+            incidents (list): Incidents of the JSON/XML response
+        """
+        response = TrafficIncidentsApi(self.data, **self.options)
+        return get_incidents(response.response_to_dict())
+
+    def update(self, incidents):
+        """Replaces the known incidents with the given incidents and returns
+        the changes
+
+        Args:
+            incidents (list): Incidents of a JSON/XML response
+
+        Returns:
+            changes (TrafficChanges): Added, changed and cleared incidents
+        """
+        changes, self.state = self.diff(incidents)
+        return changes
+
+    def diff(self, incidents):
+        """Returns the changes between the known incidents and the given
+        incidents, without replacing the known incidents
+
+        Args:
+            incidents (list): Incidents of a JSON/XML response
+
+        Returns:
+            changes (TrafficChanges): Added, changed and cleared incidents
+            state (dict): Given incidents by incident id
+        """
+        return diff_incidents(self.state, incidents)
+
+    def next_delay(self):
+        """Returns the time in seconds until the next poll"""
+        return max(self.interval * (1 + random.uniform(-self.jitter,
+                                                       self.jitter)), 0)
+
+    def run(self, callback, max_polls=None):
+        """Polls until :meth:`stop` is called (or ``max_polls`` polls were
+        made), calling the callback with the changes of every poll which has
+        changes. A failed poll is counted in ``errors`` and the poller keeps
+        polling with the known incidents.
+
+        Args:
+            callback (function): Function called with the
+                :class:`TrafficChanges`
+            max_polls (int): Maximum number of polls (no maximum if None)
+        """
+        self._stop.clear()
+        count = 0
+        while not self._stop.is_set():
+            try:
+                changes = self.poll()
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = exc
+            else:
+                if any(changes):
+                    callback(changes)
+            count += 1
+            if max_polls is not None and count >= max_polls:
+                break
+            self._stop.wait(self.next_delay())
+
+    def stop(self):
+        """Stops the running :meth:`run` loop"""
+        self._stop.set()
+
+
+def incident_key(incident):
+    """Returns the key of an incident in the state of the poller: its
+    incident id, or its JSON form for an incident without id"""
+    key = incident_id(incident)
+    if key is None:
+        return json.dumps(incident, sort_keys=True)
+    return key
+
+
+def diff_incidents(state, incidents):
+    """Returns the changes between known incidents and the given incidents
+
+    Args:
+        state (dict): Known incidents by incident key (see
+            :func:`incident_key`)
+        incidents (list): Incidents of a JSON/XML response
+
+    Returns:
+        changes (TrafficChanges): Added, changed and cleared incidents
+        state (dict): Given incidents by incident key
+    """
+    added, changed = [], []
+    current = {}
+    for incident in incidents:
+        key = incident_key(incident)
+        previous = state.get(key)
+        if previous is None:
+            added.append(incident)
+        elif not last_modified(previous) == last_modified(incident):
+            changed.append(incident)
+        current[key] = incident
+    cleared = [incident for key, incident in state.items()
+               if key not in current]
+    return TrafficChanges(added, changed, cleared), current
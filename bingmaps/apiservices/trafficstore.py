@@ -0,0 +1,236 @@
+from collections import defaultdict, namedtuple
+import heapq
+import math
+import threading
+import time
+from .trafficincidents import (
+    get_incidents,
+    incident_point,
+    incident_severity,
+    incident_times
+)
+from .trafficpoller import incident_key
+
+StoredIncident = namedtuple('StoredIncident', ['incident', 'point', 'cell',
+                                               'severity', 'start', 'end'])
+
+
+class IncidentStore(object):
+    """In-memory store of the current traffic incidents, fed continuously
+    with the responses of the traffic incidents API service.
+
+      - The incidents are kept by incident id: ingesting a newer version of
+        an incident replaces the previous one.
+      - An incident is dropped as soon as its end time has passed.
+      - The incidents are indexed by grid cell (``cell_size`` degrees) and by
+        severity, so the queries by area, severity and time window only look
+        at the matching incidents.
+      - Every ``compact_interval`` seconds the indexes are rebuilt, giving
+        back the memory of the dropped incidents.
+
+    :ivar cell_size: Size in degrees of the cells of the spatial index
+    :ivar compact_interval: Time in seconds between two compactions
+    :ivar clock: Function returning the current POSIX time
+    :ivar expired: Number of incidents dropped because they ended
+
+    The store is safe to be fed and queried by multiple threads.
+
+    Example:
+
+        ::
+
+            >>> store = IncidentStore(clock=lambda: 1458000000)
+            >>> store.ingest([
+            ...     {'incidentId': 1, 'severity': 3,
+            ...      'point': {'coordinates': [47.6, -122.3]},
+            ...      'end': '/Date(1458870690000)/'},
+            ...     {'incidentId': 2, 'severity': 1,
+            ...      'point': {'coordinates': [47.7, -122.2]},
+            ...      'end': '/Date(1457870690000)/'}])
+            1
+            >>> [incident['incidentId']
+            ...  for incident in store.query([47, -123, 48, -122],
+            ...                              severity=[3, 4])]
+            [1]
+    """
+    def __init__(self, cell_size=0.05, compact_interval=300, clock=None):
+        self.cell_size = cell_size
+        self.compact_interval = compact_interval
+        self.clock = clock or time.time
+        self._lock = threading.Lock()
+        self._incidents = {}
+        self._cells = defaultdict(set)
+        self._severities = defaultdict(set)
+        self._ends = []
+        self._compacted = self.clock()
+        self.expired = 0
+
+    def ingest(self, incidents, replace=False):
+        """Adds or replaces incidents and drops the ended incidents
+
+        Args:
+            incidents (list/TrafficIncidentsApi): Incidents of a JSON/XML
+                response, or a fetched :class:`TrafficIncidentsApi`
+            replace (bool): Whether the incidents are a full snapshot, so the
+                stored incidents which aren't in it are dropped
+
+        Returns:
+            count (int): Number of stored incidents
+        """
+        if hasattr(incidents, 'response_to_dict'):
+            incidents = get_incidents(incidents.response_to_dict())
+        now = self.clock()
+        with self._lock:
+            keys = set()
+            for incident in incidents:
+                key = incident_key(incident)
+                keys.add(key)
+                previous = self._remove(key)
+                start, end = incident_times(incident)
+                if end is not None and end <= now:
+                    continue
+                point = incident_point(incident)
+                cell = None if point is None else self.cell(*point)
+                stored = StoredIncident(incident, point, cell,
+                                        incident_severity(incident), start,
+                                        end)
+                self._incidents[key] = stored
+                self._cells[cell].add(key)
+                self._severities[stored.severity].add(key)
+                if end is not None and (previous is None or
+                                        not previous.end == end):
+                    heapq.heappush(self._ends, (end, str(key), key))
+            if replace:
+                for key in [key for key in self._incidents
+                            if key not in keys]:
+                    self._remove(key)
+            self._expire(now)
+            return len(self._incidents)
+
+    def cell(self, latitude, longitude):
+        """Returns the (row, column) of the cell of the spatial index
+        containing the point"""
+        return (int(math.floor(latitude / self.cell_size)),
+                int(math.floor(longitude / self.cell_size)))
+
+    def get(self, key):
+        """Returns the stored incident with the incident id (None if it isn't
+        stored or has ended)"""
+        with self._lock:
+            self._expire(self.clock())
+            stored = self._incidents.get(key)
+        return None if stored is None else stored.incident
+
+    def query(self, bounds=None, severity=None, start=None, end=None):
+        """Returns the stored incidents matching all the given criteria
+
+        Args:
+            bounds (list): (south, west, north, east) of the area containing
+                the location of the incidents
+            severity (list): Severities of the incidents
+            start (float): Start of the time window (POSIX time): the
+                incidents ending before it are left out
+            end (float): End of the time window (POSIX time): the incidents
+                starting after it are left out
+
+        Returns:
+            incidents (list): Matching incidents
+        """
+        with self._lock:
+            self._expire(self.clock())
+            if bounds is not None:
+                south, west, north, east = [float(value) for value in bounds]
+                keys = self._cell_keys(south, west, north, east)
+            elif severity is not None:
+                keys = [key for value in set(severity)
+                        for key in self._severities.get(value, ())]
+            else:
+                keys = list(self._incidents)
+            severities = None if severity is None else set(severity)
+            matching = []
+            for key in keys:
+                stored = self._incidents[key]
+                if bounds is not None and not (
+                        stored.point is not None and
+                        south <= stored.point[0] <= north and
+                        west <= stored.point[1] <= east):
+                    continue
+                if severities is not None and \
+                        stored.severity not in severities:
+                    continue
+                if start is not None and stored.end is not None and \
+                        stored.end < start:
+                    continue
+                if end is not None and stored.start is not None and \
+                        stored.start > end:
+                    continue
+                matching.append(stored.incident)
+            return matching
+
+    def expire(self):
+        """Drops the ended incidents (and compacts the store when the
+        compaction interval has passed)
+
+        Returns:
+            count (int): Number of stored incidents
+        """
+        with self._lock:
+            self._expire(self.clock())
+            return len(self._incidents)
+
+    def compact(self):
+        """Rebuilds the indexes from the stored incidents, giving back the
+        memory of the dropped incidents"""
+        with self._lock:
+            self._compact(self.clock())
+
+    def _cell_keys(self, south, west, north, east):
+        south_row, west_col = self.cell(south, west)
+        north_row, east_col = self.cell(north, east)
+        if (north_row - south_row + 1) * (east_col - west_col + 1) > \
+                len(self._cells):
+            return [key for cell, keys in self._cells.items()
+                    if cell is not None and
+                    south_row <= cell[0] <= north_row and
+                    west_col <= cell[1] <= east_col for key in keys]
+        return [key for row in range(south_row, north_row + 1)
+                for col in range(west_col, east_col + 1)
+                for key in self._cells.get((row, col), ())]
+
+    def _remove(self, key):
+        stored = self._incidents.pop(key, None)
+        if stored is not None:
+            self._cells[stored.cell].discard(key)
+            self._severities[stored.severity].discard(key)
+        return stored
+
+    def _expire(self, now):
+        while self._ends and self._ends[0][0] <= now:
+            ended, _, key = heapq.heappop(self._ends)
+            stored = self._incidents.get(key)
+            if stored is not None and stored.end == ended:
+                self._remove(key)
+                self.expired += 1
+        if now - self._compacted >= self.compact_interval:
+            self._compact(now)
+
+    def _compact(self, now):
+        self._incidents = dict(self._incidents)
+        self._cells = defaultdict(set)
+        self._severities = defaultdict(set)
+        self._ends = []
+        for key, stored in self._incidents.items():
+            self._cells[stored.cell].add(key)
+            self._severities[stored.severity].add(key)
+            if stored.end is not None:
+                self._ends.append((stored.end, str(key), key))
+        heapq.heapify(self._ends)
+        self._compacted = now
+
+    def __len__(self):
+        with self._lock:
+            self._expire(self.clock())
+            return len(self._incidents)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
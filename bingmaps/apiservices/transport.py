@@ -0,0 +1,99 @@
+from bingmaps.cache import CachedResponse, canonical_url
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+
+def get(url, cache=None, key=None, conditional_cache=None):
+    """Gets the response for the given url. When a cache is given, the
+    response is looked up in the cache first (by the canonical form of the
+    url, unless another key is given) and the response is cached after it is
+    retrieved. When a conditional cache is given, the request is sent with
+    the validators of the last response of the url and a ``304 Not
+    Modified`` answer reuses that response.
+
+    Args:
+        url (str): URL for the API service
+        cache (ResponseCache): Cache of the responses
+        key (str): Key of the response in the cache (canonical form of the
+            url if None)
+        conditional_cache (ConditionalCache): Last responses of the urls with
+            their validators
+
+    Returns:
+        response (requests.Response/CachedResponse): Response from the URL
+    """
+    if cache is not None:
+        key = canonical_url(url) if key is None else key
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    if conditional_cache is None:
+        response = requests.get(url)
+    else:
+        response = conditional_get(url, conditional_cache)
+    if not response.status_code == 200:
+        raise response.raise_for_status()
+    if cache is not None:
+        cache.set(key, CachedResponse(response.text, response.status_code,
+                                      dict(response.headers)))
+    return response
+
+
+def conditional_get(url, conditional_cache):
+    """Sends a conditional request for the url and returns the response,
+    which is the kept response of the conditional cache when the service
+    answers ``304 Not Modified``"""
+    key = canonical_url(url)
+    headers = conditional_cache.headers(key)
+    if not headers:
+        response = requests.get(url)
+    else:
+        response = requests.get(url, headers=headers)
+        if response.status_code == 304:
+            kept = conditional_cache.not_modified_response(key)
+            if kept is not None:
+                return kept
+            response = requests.get(url)
+    if response.status_code == 200:
+        conditional_cache.set(key, response)
+    return response
+
+
+def get_many(urls, max_workers=8, cache=None, conditional_cache=None):
+    """Gets the responses for all the given urls concurrently
+
+    Args:
+        urls (list): URLs for the API service
+        max_workers (int): Maximum number of requests running at the same
+            time
+        cache (ResponseCache): Cache of the responses
+        conditional_cache (ConditionalCache): Last responses of the urls with
+            their validators
+
+    Returns:
+        responses (list): Responses from the URLs in the same order as the
+        given urls
+    """
+    def fetch(url):
+        return get(url, cache, conditional_cache=conditional_cache)
+    return map_concurrently(fetch, urls, max_workers)
+
+
+def map_concurrently(function, items, max_workers=8):
+    """Calls the function for all the given items concurrently (in the
+    calling thread when there is a single item)
+
+    Args:
+        function (function): Function called with every item
+        items (list): Items, such as URLs
+        max_workers (int): Maximum number of calls running at the same time
+
+    Returns:
+        results (list): Results of the function in the same order as the
+        given items
+    """
+    items = list(items)
+    if len(items) == 1:
+        return [function(items[0])]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(function, items))
@@ -0,0 +1,42 @@
+from collections import namedtuple
+from .transport import map_concurrently
+
+WarmResult = namedtuple('WarmResult', ['warmed', 'failed'])
+
+
+def warm_cache(service, queries, max_workers=8, **options):
+    """Warms the caches of an API service by sending the expected queries
+    concurrently, for example when a new worker starts.
+
+    Args:
+        service (class): API service class, such as :class:`LocationByAddress`
+            or :class:`ElevationsApi`
+        queries (list): Data of the expected queries
+        max_workers (int): Maximum number of queries running at the same time
+        options: Arguments given to the service for every query, such as
+            ``cache`` or ``geocode_cache``
+
+    Returns:
+        result (WarmResult): Number of warmed queries and list of (data,
+        exception) tuples of the failed queries
+
+    Example:
+
+        ::
+
+            >>> from bingmaps.cache import ResponseCache
+            >>> cache = ResponseCache()
+            >>> warm_cache(LocationByAddress, [
+            ...     {'locality': 'Seattle', 'key': 'abs'},
+            ...     {'locality': 'Tacoma', 'key': 'abs'}],
+            ...     cache=cache)  # doctest: +SKIP
+            WarmResult(warmed=2, failed=[])
+    """
+    def warm(data):
+        try:
+            service(data, **options)
+        except Exception as exc:
+            return data, exc
+    results = map_concurrently(warm, queries, max_workers)
+    failed = [result for result in results if result is not None]
+    return WarmResult(len(results) - len(failed), failed)
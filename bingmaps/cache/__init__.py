@@ -0,0 +1,59 @@
+from .address import (
+    address_key,
+    dedupe_addresses,
+    normalize_address,
+    normalize_text
+)
+
+from .base import CacheBackend
+
+from .conditional import (
+    ConditionalCache,
+    ConditionalStats
+)
+
+from .coverage import TrafficCoverageCache
+
+from .elevation import (
+    ElevationGrid,
+    ElevationTileCache
+)
+
+from .gridstore import ElevationGridStore
+
+from .keys import canonical_url
+
+from .memory import (
+    CachedResponse,
+    CacheStats,
+    ResponseCache
+)
+
+from .negative import (
+    NEGATIVE_STATUS_CODES,
+    NegativeCache,
+    NegativeEntry
+)
+
+from .snapshot import (
+    export_snapshot,
+    import_snapshot,
+    read_snapshot
+)
+
+from .shared import (
+    SocketCache,
+    SocketCacheServer
+)
+
+from .sqlite import (
+    GeocodeCache,
+    SQLiteResponseCache
+)
+
+from .spatial import ReverseGeocodeCache
+
+from .traffic import (
+    TrafficCache,
+    TrafficCacheStats
+)
@@ -0,0 +1,175 @@
+import re
+import unicodedata
+
+ADDRESS_FIELDS = ('adminDistrict', 'locality', 'addressLine', 'postalCode',
+                  'countryRegion')
+
+ABBREVIATIONS = {
+    'alley': 'aly',
+    'apartment': 'apt',
+    'avenue': 'ave',
+    'boulevard': 'blvd',
+    'building': 'bldg',
+    'circle': 'cir',
+    'court': 'ct',
+    'drive': 'dr',
+    'east': 'e',
+    'expressway': 'expy',
+    'floor': 'fl',
+    'freeway': 'fwy',
+    'highway': 'hwy',
+    'lane': 'ln',
+    'mount': 'mt',
+    'north': 'n',
+    'northeast': 'ne',
+    'northwest': 'nw',
+    'parkway': 'pkwy',
+    'place': 'pl',
+    'road': 'rd',
+    'route': 'rte',
+    'south': 's',
+    'southeast': 'se',
+    'southwest': 'sw',
+    'square': 'sq',
+    'street': 'st',
+    'suite': 'ste',
+    'terrace': 'ter',
+    'trail': 'trl',
+    'west': 'w'
+}
+
+_PUNCTUATION = re.compile(r'[^\w#/-]+|_')
+_DASHES = re.compile(r'(?<!\w)-|-(?!\w)')
+
+
+def normalize_text(value):
+    """Normalizes a part of an address so that the same address written in
+    different ways gives the same text:
+      - unicode folding (accents are dropped, compatibility characters are
+        replaced)
+      - case folding
+      - punctuation is replaced with spaces and whitespace is collapsed
+      - common words of street addresses are abbreviated (such as
+        ``street`` - ``st``, ``avenue`` - ``ave``, ``north`` - ``n``)
+
+    Args:
+        value (str): Part of an address
+
+    Returns:
+        text (str): Normalized text
+
+    Example:
+
+        ::
+
+            >>> normalize_text('123 Main St.')
+            '123 main st'
+            >>> normalize_text('  123  MAIN street ')
+            '123 main st'
+            >>> normalize_text('Zürich')
+            'zurich'
+    """
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _PUNCTUATION.sub(' ', text.casefold())
+    text = _DASHES.sub(' ', text)
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in text.split())
+
+
+def normalize_address(data):
+    """Normalizes the address fields (adminDistrict, locality, addressLine,
+    postalCode, countryRegion) of the data of a location by address request.
+    The other fields are left unchanged and the empty address fields are
+    dropped.
+
+    Args:
+        data (dict): Data of a location by address request
+
+    Returns:
+        data (dict): Data with the normalized address fields
+
+    Example:
+
+        ::
+
+            >>> sorted(normalize_address({'addressLine': '123 Main St.',
+            ...                           'locality': 'SEATTLE ',
+            ...                           'postalCode': 98101,
+            ...                           'maxResults': 5}).items())
+            [('addressLine', '123 main st'), ('locality', 'seattle'), \
+('maxResults', 5), ('postalCode', '98101')]
+    """
+    normalized = {}
+    for field, value in data.items():
+        if field in ADDRESS_FIELDS:
+            value = normalize_text(value) if value is not None else ''
+            if not value:
+                continue
+        normalized[field] = value
+    return normalized
+
+
+def address_key(data):
+    """Returns the key of a location by address request in the caches.
+    Requests for the same address written in different ways get the same key.
+    The Bing Maps key is not part of the key.
+
+    Args:
+        data (dict): Data of a location by address request
+
+    Returns:
+        key (str): Cache key of the address
+
+    Example:
+
+        ::
+
+            >>> address_key({'addressLine': '123 Main St.',
+            ...              'locality': 'Seattle', 'key': 'abs'})
+            'address:addressLine=123 main st&locality=seattle'
+            >>> address_key({'addressLine': '123 main street',
+            ...              'locality': 'seattle', 'key': 'other'})
+            'address:addressLine=123 main st&locality=seattle'
+    """
+    normalized = normalize_address(data)
+    return 'address:' + '&'.join(
+        '{0}={1}'.format(field, normalized[field])
+        for field in sorted(normalized) if not field == 'key')
+
+
+def dedupe_addresses(batch):
+    """Removes the duplicated addresses (by :func:`address_key`) from a batch
+    of location by address requests.
+
+    Args:
+        batch (list): Data of location by address requests
+
+    Returns:
+        unique (list): The first request of every distinct address
+        positions (list): For every request of the batch, the position of its
+        address in ``unique``
+
+    Example:
+
+        ::
+
+            >>> unique, positions = dedupe_addresses([
+            ...     {'addressLine': '123 Main St.', 'key': 'abs'},
+            ...     {'addressLine': '1 Pike Place', 'key': 'abs'},
+            ...     {'addressLine': '123 main street', 'key': 'abs'}])
+            >>> unique
+            [{'addressLine': '123 Main St.', 'key': 'abs'}, \
+{'addressLine': '1 Pike Place', 'key': 'abs'}]
+            >>> positions
+            [0, 1, 0]
+    """
+    unique = []
+    positions = []
+    seen = {}
+    for data in batch:
+        key = address_key(data)
+        if key not in seen:
+            seen[key] = len(unique)
+            unique.append(data)
+        positions.append(seen[key])
+    return unique, positions
@@ -0,0 +1,40 @@
+class CacheBackend(object):
+    """Interface of the caches of the responses given as the ``cache``
+    argument of the API services (:class:`LocationByAddress`,
+    :class:`ElevationsApi`, :class:`TrafficIncidentsApi`, ...).
+
+    The responses are cached as :class:`CachedResponse` tuples by the keys
+    given by the services (such as the canonical form of the URL). The
+    package ships with the following backends:
+      - :class:`ResponseCache`: in-memory cache of a single process
+      - :class:`SQLiteResponseCache`: SQLite file shared by the processes of
+        a host
+      - :class:`SocketCache`: client of a :class:`SocketCacheServer`, which
+        keeps the responses in memory for all the processes connected to its
+        local socket
+
+    Other backends (such as a memcached or redis client) only have to
+    implement these methods.
+    """
+    def get(self, key):
+        """Returns the cached response for the key (None if there isn't a
+        fresh cached response)"""
+        raise NotImplementedError
+
+    def set(self, key, response, ttl=None):
+        """Caches the response for the key. The ttl overrides the time to
+        live of the cache for this entry."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Removes the cached response for the key"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes all the cached responses"""
+        raise NotImplementedError
+
+    def items(self, limit=None):
+        """Returns the fresh cached responses as (key, response) tuples,
+        least recently used first (used by :func:`export_snapshot`)"""
+        raise NotImplementedError
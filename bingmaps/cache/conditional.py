@@ -0,0 +1,116 @@
+from collections import namedtuple
+import threading
+from .memory import CachedResponse, ResponseCache
+
+ConditionalStats = namedtuple('ConditionalStats',
+                              ['requests', 'not_modified', 'bytes_saved'])
+
+
+class ConditionalCache(object):
+    """Keeps the last response of every URL together with its validators
+    (``ETag``/``Last-Modified`` headers), so that the next request for the
+    URL is sent as a conditional request (``If-None-Match``/
+    ``If-Modified-Since``). When the service answers ``304 Not Modified``,
+    the kept response is reused instead of downloading the body again.
+
+    The services polling the same URLs (:class:`TrafficIncidentsApi`,
+    :class:`ElevationsApi`) take it as the ``conditional_cache`` argument.
+    Unlike a :class:`ResponseCache`, it never answers without asking the
+    service.
+
+    A ``304 Not Modified`` answer reuses the kept text, not a parsed copy of
+    it: the store may live in another process (see :class:`CacheBackend`),
+    which only holds the text. Also, the services modify the dictionaries
+    they parse, such as when they merge or filter incidents. A shared parsed
+    payload would need a deep copy on every reuse, and that copy is slower
+    than parsing the text again.
+
+    :ivar store: Cache of the responses by canonical URL (a new
+        :class:`ResponseCache` if None), see :class:`CacheBackend`
+    :ivar requests: Number of conditional requests sent
+    :ivar not_modified: Number of ``304 Not Modified`` answers
+    :ivar bytes_saved: Total size of the bodies which weren't downloaded
+        again
+
+    Example:
+
+        ::
+
+            >>> cache = ConditionalCache()
+            >>> cache.set('a', CachedResponse('{}', 200, {'ETag': '"v1"'}))
+            >>> cache.headers('a')
+            {'If-None-Match': '"v1"'}
+            >>> cache.not_modified_response('a').text
+            '{}'
+            >>> cache.stats
+            ConditionalStats(requests=1, not_modified=1, bytes_saved=2)
+    """
+    def __init__(self, store=None):
+        self.store = store if store is not None else ResponseCache()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+    def headers(self, key):
+        """Returns the conditional headers of the next request for the key
+        (an empty dictionary when no response with validators is kept)"""
+        response = self.store.get(key)
+        if response is None:
+            return {}
+        headers = {}
+        etag = header(response.headers, 'ETag')
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        modified = header(response.headers, 'Last-Modified')
+        if modified is not None:
+            headers['If-Modified-Since'] = modified
+        if headers:
+            with self._lock:
+                self.requests += 1
+        return headers
+
+    def set(self, key, response):
+        """Keeps the response for the key when it has validators
+
+        Args:
+            key (str): Key of the response, such as the canonical form of the
+                url
+            response (requests.Response/CachedResponse): Response with a 200
+                status code
+        """
+        if header(response.headers, 'ETag') is None and \
+                header(response.headers, 'Last-Modified') is None:
+            return
+        self.store.set(key, CachedResponse(response.text, response.status_code,
+                                           dict(response.headers)))
+
+    def not_modified_response(self, key):
+        """Returns the kept response to reuse after a ``304 Not Modified``
+        answer (None if the response is no longer kept)"""
+        response = self.store.get(key)
+        if response is not None:
+            with self._lock:
+                self.not_modified += 1
+                self.bytes_saved += len(response.text.encode('utf-8'))
+        return response
+
+    @property
+    def stats(self):
+        """Conditional requests sent, ``304 Not Modified`` answers and bytes
+        saved
+
+        :getter: Returns a namedtuple of the statistics
+        :type: ConditionalStats
+        """
+        return ConditionalStats(self.requests, self.not_modified,
+                                self.bytes_saved)
+
+
+def header(headers, name):
+    """Returns the value of a header whatever its case (None if missing)"""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+import json
+import threading
+import time
+
+FILTERS = ('mapArea', 'severity', 'type')
+
+
+class TrafficCoverageCache(object):
+    """Cache of the responses of the traffic incidents API service which also
+    answers the narrower requests: a cached response covers a request when
+      - its mapArea contains the mapArea of the request,
+      - its ``severity``/``type`` filters are missing or a superset of the
+        filters of the request,
+      - all the other parameters (output format, location codes, key) are the
+        same.
+
+    The :class:`TrafficIncidentsApi` answers a covered request by filtering
+    the incidents of the cached response locally, so the many filtered
+    variants of the same area of a dashboard cost a single request.
+
+    :ivar ttl: Time in seconds a response is used
+    :ivar max_entries: Maximum number of cached responses (least recently
+        used first out)
+    :ivar hits: Number of requests answered from the cache
+    :ivar misses: Number of requests not covered by a cached response
+
+    Example:
+
+        ::
+
+            >>> cache = TrafficCoverageCache(ttl=60)
+            >>> cache.set({'mapArea': [37, -105, 45, -94], 'key': 'abs'},
+            ...           {'resourceSets': []})
+            >>> cache.find({'mapArea': [38, -100, 40, -98], 'severity': [3, 4],
+            ...             'key': 'abs'})
+            {'resourceSets': []}
+            >>> cache.find({'mapArea': [30, -100, 40, -98], 'key': 'abs'}) \\
+            ...     is None
+            True
+    """
+    def __init__(self, ttl=60, max_entries=64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def set(self, data, response):
+        """Caches the response of a request
+
+        Args:
+            data (dict): Data of the request
+            response (object): Response of the request, such as the
+                JSON/XML response converted to a dictionary
+        """
+        key = coverage_key(data)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (data, response, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def find(self, data):
+        """Returns the most recently cached response covering the request
+        (None if no fresh cached response covers it)
+
+        Args:
+            data (dict): Data of the request
+
+        Returns:
+            response (object): Cached response of the broader request
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, (cached, response, stored) in reversed(
+                    list(self._entries.items())):
+                if now - stored >= self.ttl:
+                    del self._entries[key]
+                elif covers(cached, data):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+            self.misses += 1
+        return None
+
+    def clear(self):
+        """Removes all the cached responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def coverage_key(data):
+    """Returns the key of the exact request of the data"""
+    return json.dumps([[data.get(name) for name in FILTERS],
+                       other_params(data)], sort_keys=True)
+
+
+def other_params(data):
+    """Returns the parameters of the data other than the mapArea and the
+    filters, with the default output format made explicit"""
+    params = dict((key, value) for key, value in data.items()
+                  if key not in FILTERS)
+    params['o'] = (params.get('o') or 'json').lower()
+    return json.dumps(params, sort_keys=True)
+
+
+def covers(broad, narrow):
+    """Returns whether the response of the broad request contains all the
+    incidents of the narrow request
+
+    Args:
+        broad (dict): Data of the cached request
+        narrow (dict): Data of the new request
+
+    Returns:
+        covered (bool): Whether the narrow request can be answered by
+        filtering the response of the broad request
+    """
+    if not other_params(broad) == other_params(narrow):
+        return False
+    try:
+        south, west, north, east = [float(value)
+                                    for value in broad['mapArea']]
+        inner = [float(value) for value in narrow['mapArea']]
+    except (KeyError, TypeError, ValueError):
+        return False
+    if not (len(inner) == 4 and south <= inner[0] and west <= inner[1] and
+            north >= inner[2] and east >= inner[3]):
+        return False
+    for name in ('severity', 'type'):
+        if broad.get(name) is None:
+            continue
+        if narrow.get(name) is None or \
+                not set(narrow[name]) <= set(broad[name]):
+            return False
+    return True
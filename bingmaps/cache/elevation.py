@@ -0,0 +1,204 @@
+from collections import defaultdict
+import math
+import threading
+
+
+class ElevationGrid(object):
+    """Elevations of a Bounds request: a grid of ``rows`` x ``cols``
+    elevations spread evenly over the bounding box, starting with the
+    southwest corner, going west to east and then south to north.
+
+    :ivar bounds: (south, west, north, east) of the grid
+    :ivar rows: Number of rows of the grid
+    :ivar cols: Number of columns of the grid
+    :ivar values: Elevations of the grid (row major, starting with the
+        southern most row). Any sequence of numbers, such as a memory-mapped
+        array of an :class:`ElevationGridStore`.
+    :ivar zoom_level: Zoom level of the elevations of the grid
+
+    Example:
+
+        ::
+
+            >>> grid = ElevationGrid([0, 0, 1, 1], 2, 2, [0, 10, 20, 30])
+            >>> grid.contains(0.5, 0.5)
+            True
+            >>> grid.interpolate(0.5, 0.5)
+            15.0
+            >>> grid.interpolate(0.25, 1)
+            15.0
+    """
+    def __init__(self, bounds, rows, cols, values, zoom_level=None):
+        self.bounds = tuple(float(value) for value in bounds)
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.zoom_level = zoom_level
+        if not len(self.values) == rows * cols:
+            raise ValueError('the grid should have rows * cols elevations')
+
+    def contains(self, latitude, longitude):
+        """Returns whether the point is inside the bounding box of the
+        grid"""
+        south, west, north, east = self.bounds
+        return south <= latitude <= north and west <= longitude <= east
+
+    def interpolate(self, latitude, longitude):
+        """Returns the elevation at the point by bilinear interpolation of
+        the four surrounding elevations of the grid"""
+        south, west, north, east = self.bounds
+        row, row_fraction = grid_position(latitude, south, north, self.rows)
+        col, col_fraction = grid_position(longitude, west, east, self.cols)
+        start = row * self.cols + col
+        south_west = float(self.values[start])
+        south_east = float(self.values[start + (col_fraction > 0)])
+        start += self.cols * (row_fraction > 0)
+        north_west = float(self.values[start])
+        north_east = float(self.values[start + (col_fraction > 0)])
+        southern = south_west + (south_east - south_west) * col_fraction
+        northern = north_west + (north_east - north_west) * col_fraction
+        return southern + (northern - southern) * row_fraction
+
+
+class ElevationTileCache(object):
+    """Cache of the elevation grids of Bounds requests. The elevations of
+    points inside the cached grids are computed locally by bilinear
+    interpolation instead of requesting them from the elevations API service.
+
+    When ``fetch`` is True, the :class:`ElevationsApi` fetches the missing
+    fixed-resolution tiles (``tile_size`` degrees wide, ``samples`` x
+    ``samples`` elevations) of a List request as Bounds requests, caches them
+    and then answers the List request locally.
+
+    :ivar tile_size: Size in degrees of the tiles fetched on demand
+    :ivar samples: Number of rows and columns of the tiles fetched on demand
+        (at most 32, as a Bounds request gives at most 1024 elevations)
+    :ivar fetch: Whether the missing tiles are fetched on demand
+
+    The grids are indexed by the 1 degree cells they overlap, and are kept
+    separately for every ``heights`` model (ellipsoid/sealevel).
+
+    Example:
+
+        ::
+
+            >>> cache = ElevationTileCache()
+            >>> cache.add([0, 0, 1, 1], 2, 2, [0, 10, 20, 30])
+            >>> cache.interpolate([(0.5, 0.5), (1, 1)])
+            [15.0, 30.0]
+            >>> cache.interpolate([(0.5, 0.5), (2, 2)]) is None
+            True
+    """
+    def __init__(self, tile_size=0.1, samples=32, fetch=False):
+        self.tile_size = tile_size
+        self.samples = samples
+        self.fetch = fetch
+        self._index = defaultdict(list)
+        self._lock = threading.Lock()
+        self.grids = 0
+
+    def add(self, bounds, rows, cols, values, heights='ellipsoid',
+            zoom_level=None):
+        """Caches the elevations of a Bounds request
+
+        Args:
+            bounds (list): (south, west, north, east) of the grid
+            rows (int): Number of rows of the grid
+            cols (int): Number of columns of the grid
+            values (list): Elevations of the grid, starting with the
+                southwest corner, going west to east and then south to north
+            heights (str): Heights model of the elevations
+            zoom_level (int): Zoom level of the elevations
+        """
+        grid = ElevationGrid(bounds, rows, cols, values, zoom_level)
+        south, west, north, east = grid.bounds
+        with self._lock:
+            for lat in range(int(math.floor(south)),
+                             int(math.floor(north)) + 1):
+                for lon in range(int(math.floor(west)),
+                                 int(math.floor(east)) + 1):
+                    self._index[(heights_model(heights), lat, lon)].append(
+                        grid)
+            self.grids += 1
+
+    def find(self, latitude, longitude, heights='ellipsoid'):
+        """Returns the most recently cached grid containing the point (None
+        if the point isn't inside any cached grid)"""
+        cell = (heights_model(heights), int(math.floor(latitude)),
+                int(math.floor(longitude)))
+        with self._lock:
+            grids = list(self._index.get(cell, []))
+        for grid in reversed(grids):
+            if grid.contains(latitude, longitude):
+                return grid
+        return None
+
+    def find_all(self, points, heights='ellipsoid'):
+        """Returns the grids containing each of the (latitude, longitude)
+        points (None if any of the points isn't inside a cached grid)"""
+        grids = []
+        for latitude, longitude in points:
+            grid = self.find(latitude, longitude, heights)
+            if grid is None:
+                return None
+            grids.append(grid)
+        return grids
+
+    def interpolate(self, points, heights='ellipsoid'):
+        """Returns the interpolated elevations of the (latitude, longitude)
+        points (None if any of the points isn't inside a cached grid)"""
+        grids = self.find_all(points, heights)
+        if grids is None:
+            return None
+        return [grid.interpolate(latitude, longitude)
+                for grid, (latitude, longitude) in zip(grids, points)]
+
+    def missing_tiles(self, points, heights='ellipsoid'):
+        """Returns the bounds (south, west, north, east) of the distinct
+        fixed-resolution tiles containing the points which aren't inside a
+        cached grid"""
+        tiles = []
+        for latitude, longitude in points:
+            if self.find(latitude, longitude, heights) is not None:
+                continue
+            bounds = self.tile_bounds(latitude, longitude)
+            if bounds not in tiles:
+                tiles.append(bounds)
+        return tiles
+
+    def tile_bounds(self, latitude, longitude):
+        """Returns the bounds (south, west, north, east) of the
+        fixed-resolution tile containing the point"""
+        row = int(math.floor(latitude / self.tile_size))
+        col = int(math.floor(longitude / self.tile_size))
+        return [round(row * self.tile_size, 10),
+                round(col * self.tile_size, 10),
+                round((row + 1) * self.tile_size, 10),
+                round((col + 1) * self.tile_size, 10)]
+
+    def clear(self):
+        """Removes all the cached grids"""
+        with self._lock:
+            self._index.clear()
+            self.grids = 0
+
+    def __len__(self):
+        return self.grids
+
+
+def grid_position(value, start, end, count):
+    """Returns the index of the grid line before the value and the fraction
+    of the way from that grid line to the next one"""
+    if end == start:
+        return 0, 0.0
+    position = (value - start) / (end - start) * (count - 1)
+    index = min(max(int(math.floor(position)), 0), count - 2)
+    fraction = min(max(position - index, 0.0), 1.0)
+    if fraction == 1.0:
+        return index + 1, 0.0
+    return index, fraction
+
+
+def heights_model(heights):
+    """Returns the name of the heights model (ellipsoid by default)"""
+    return (heights or 'ellipsoid').lower()
@@ -0,0 +1,150 @@
+from array import array
+from collections import OrderedDict
+import mmap
+import os
+import uuid
+from .elevation import ElevationGrid, ElevationTileCache, heights_model
+from .sqlite import SQLiteConnections
+
+
+class ElevationGridStore(ElevationTileCache):
+    """On-disk store of the elevation grids of Bounds requests, shared by
+    multiple processes.
+
+    Every grid is written once to a raw file of 32-bit floats and read
+    through a read-only memory map, so the processes using the same directory
+    share the elevations through the page cache of the operating system
+    instead of copying them. A small SQLite index (in WAL mode) keeps the
+    bounding boxes of the grids.
+
+    The store can be given as the ``tile_cache`` of :class:`ElevationsApi`
+    (see :class:`ElevationTileCache`): the grids of the Bounds requests are
+    stored, and the List, Polyline and Bounds requests inside the stored grids
+    are answered locally.
+
+    :ivar directory: Directory of the grid files and of the index
+    :ivar tile_size: Size in degrees of the tiles fetched on demand
+    :ivar samples: Number of rows and columns of the tiles fetched on demand
+    :ivar fetch: Whether the missing tiles are fetched on demand
+    :ivar max_open: Maximum number of grid files kept memory mapped. Every
+        map holds a file descriptor, so the least recently used maps are
+        dropped beyond it (their file is closed once the grids in use are
+        released).
+
+    Example:
+
+        ::
+
+            >>> import tempfile
+            >>> store = ElevationGridStore(tempfile.mkdtemp())
+            >>> store.add([0, 0, 1, 1], 2, 2, [0, 10, 20, 30])
+            >>> store.interpolate([(0.5, 0.5)])
+            [15.0]
+            >>> store.close()
+    """
+    def __init__(self, directory, tile_size=0.1, samples=32, fetch=False,
+                 max_open=256):
+        super().__init__(tile_size, samples, fetch)
+        self.directory = directory
+        self.max_open = max_open
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._connections = SQLiteConnections(
+            os.path.join(directory, 'index.sqlite'))
+        self._maps = OrderedDict()
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS grids ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'heights TEXT NOT NULL, south REAL NOT NULL, '
+                'west REAL NOT NULL, north REAL NOT NULL, '
+                'east REAL NOT NULL, rows INTEGER NOT NULL, '
+                'cols INTEGER NOT NULL, zoom INTEGER, file TEXT NOT NULL)')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS grids_bounds ON grids '
+                '(heights, south, north, west, east)')
+
+    @property
+    def connection(self):
+        """SQLite connection of the index for the current thread
+
+        :getter: Returns the connection of the current thread, opening it
+            when needed
+        :type: sqlite3.Connection
+        """
+        return self._connections.connection
+
+    def add(self, bounds, rows, cols, values, heights='ellipsoid',
+            zoom_level=None):
+        """Stores the elevations of a Bounds request (see
+        :meth:`ElevationTileCache.add`)"""
+        grid = ElevationGrid(bounds, rows, cols, values, zoom_level)
+        name = '{0}.f32'.format(uuid.uuid4().hex)
+        path = os.path.join(self.directory, name)
+        with open(path + '.tmp', 'wb') as fp:
+            array('f', [float(value) for value in values]).tofile(fp)
+        os.replace(path + '.tmp', path)
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO grids (heights, south, west, north, east, rows, '
+                'cols, zoom, file) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (heights_model(heights),) + grid.bounds +
+                (rows, cols, zoom_level, name))
+
+    def find(self, latitude, longitude, heights='ellipsoid'):
+        """Returns the most recently stored grid containing the point (None
+        if the point isn't inside any stored grid)"""
+        row = self.connection.execute(
+            'SELECT id, south, west, north, east, rows, cols, zoom, file '
+            'FROM grids WHERE heights = ? AND south <= ? AND north >= ? AND '
+            'west <= ? AND east >= ? ORDER BY id DESC LIMIT 1',
+            (heights_model(heights), latitude, latitude, longitude,
+             longitude)).fetchone()
+        if row is None:
+            return None
+        return self.open_grid(row)
+
+    def open_grid(self, row):
+        """Returns the grid of a row of the index, memory mapping its file
+        when it isn't mapped yet"""
+        grid_id, south, west, north, east, rows, cols, zoom, name = row
+        with self._lock:
+            if grid_id in self._maps:
+                self._maps.move_to_end(grid_id)
+            else:
+                with open(os.path.join(self.directory, name), 'rb') as fp:
+                    mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                values = memoryview(mapped).cast('f')
+                grid = ElevationGrid((south, west, north, east), rows, cols,
+                                     values, zoom)
+                self._maps[grid_id] = (mapped, grid)
+                while len(self._maps) > self.max_open:
+                    self._maps.popitem(last=False)
+            return self._maps[grid_id][1]
+
+    def clear(self):
+        """Removes all the stored grids"""
+        self.close()
+        with self.connection:
+            names = [name for name, in self.connection.execute(
+                'SELECT file FROM grids')]
+            self.connection.execute('DELETE FROM grids')
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+
+    def close(self):
+        """Unmaps the grid files opened by this process and closes the
+        connection of the current thread"""
+        with self._lock:
+            for mapped, grid in self._maps.values():
+                grid.values.release()
+                mapped.close()
+            self._maps.clear()
+        self._connections.close()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM grids').fetchone()[0]
@@ -0,0 +1,32 @@
+from urllib.parse import urlsplit, parse_qsl, quote
+
+
+def canonical_url(url):
+    """Returns the canonical form of a URL of the bing maps REST services
+    which is used as the key of the cached responses. The protocol and the
+    ``key`` query parameter are dropped and the query parameters are sorted,
+    so the same request always gives the same canonical form whatever the
+    Bing Maps key, the protocol or the order of the parameters.
+
+    Args:
+        url (str): URL for the API service
+
+    Returns:
+        key (str): Canonical form of the URL
+
+    Example:
+
+        ::
+
+            >>> canonical_url('http://dev.virtualearth.net/REST/v1/Locations'
+            ...               '?locality=Seattle&adminDistrict=WA&key=abs')
+            'dev.virtualearth.net/REST/v1/Locations?adminDistrict=WA&\
+locality=Seattle'
+    """
+    parts = urlsplit(url)
+    params = sorted((name, value) for name, value in
+                    parse_qsl(parts.query, keep_blank_values=True)
+                    if not name == 'key')
+    query = '&'.join('{0}={1}'.format(name, quote(value, safe=',-_.~'))
+                     for name, value in params)
+    return '{0}{1}?{2}'.format(parts.netloc, parts.path, query)
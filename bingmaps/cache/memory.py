@@ -0,0 +1,142 @@
+from collections import namedtuple, OrderedDict
+import threading
+import time
+from .base import CacheBackend
+
+CachedResponse = namedtuple('CachedResponse',
+                            ['text', 'status_code', 'headers'])
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions',
+                                       'expirations', 'entries', 'bytes'])
+
+
+class ResponseCache(CacheBackend):
+    """In-memory LRU cache of the responses of the bing maps REST services
+    (see :class:`CacheBackend`)
+
+    The cache is bounded both by the number of entries and by the total size
+    of the cached responses. When one of the bounds is exceeded, the least
+    recently used entries are evicted. Entries older than the time to live
+    are dropped when they are looked up.
+
+    :ivar max_entries: Maximum number of cached responses
+    :ivar max_bytes: Maximum total size (in bytes) of the cached responses
+    :ivar ttl: Time to live of an entry in seconds (None: never expires)
+
+    The cache is safe to be shared by multiple threads and by all the API
+    services (every service takes a ``cache`` argument).
+
+    Example:
+
+        ::
+
+            >>> cache = ResponseCache(max_entries=2)
+            >>> cache.set('a', CachedResponse('{}', 200, {}))
+            >>> cache.get('a')
+            CachedResponse(text='{}', status_code=200, headers={})
+            >>> cache.get('b') is None
+            True
+            >>> cache.stats
+            CacheStats(hits=1, misses=1, evictions=0, expirations=0, \
+entries=1, bytes=2)
+    """
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Returns the cached response for the key (None if there isn't a
+        fresh cached response)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            response, size, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def set(self, key, response, ttl=None):
+        """Caches the response for the key. The ttl overrides the time to
+        live of the cache for this entry."""
+        size = len(response.text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, size, expires)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or \
+                    self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        """Removes the cached response for the key"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Removes all the cached responses"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def items(self, limit=None):
+        """Returns the fresh cached responses, least recently used first
+
+        Args:
+            limit (int): Only the ``limit`` most recently used responses are
+                returned (all of them if None)
+
+        Returns:
+            items (list): List of (key, response) tuples
+        """
+        now = time.monotonic()
+        with self._lock:
+            items = [(key, response) for key, (response, size, expires)
+                     in self._entries.items()
+                     if expires is None or expires > now]
+        if limit is not None:
+            items = items[max(len(items) - limit, 0):]
+        return items
+
+    def _remove(self, key):
+        response, size, expires = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def stats(self):
+        """Hits, misses, evictions, expirations, number of entries and total
+        size of the cache
+
+        :getter: Returns a namedtuple of the cache statistics
+        :type: CacheStats
+        """
+        return CacheStats(self.hits, self.misses, self.evictions,
+                          self.expirations, len(self._entries), self._bytes)
@@ -0,0 +1,112 @@
+from collections import namedtuple, OrderedDict
+import threading
+import time
+
+NegativeEntry = namedtuple('NegativeEntry', ['reason', 'detail'])
+
+NEGATIVE_STATUS_CODES = (400, 404, 410, 422)
+
+
+class NegativeCache(object):
+    """Cache of the requests which are known to give no result, so that
+    they are skipped without sending them again. Three kinds of entries are
+    recorded (the ``reason`` of the entry):
+      - ``empty``: the response had no resources
+      - ``invalid``: the data failed the validation of the URL schema
+        (``detail`` holds the validation errors)
+      - ``http``: the response had a hard client error status code, such as
+        400 or 404 (``detail`` holds the status code). Authentication errors
+        (401, 403) and throttling (429) aren't recorded, as they don't depend
+        on the request.
+
+    :ivar ttl: Time to live of an entry in seconds (None: never expires)
+    :ivar status_codes: Status codes of the failures which are recorded
+    :ivar store: Persistent store of the entries, such as a
+        :class:`GeocodeCache`, so that the known-bad inputs are skipped by
+        later runs too. When None, the entries are kept in memory (at most
+        ``max_entries``, oldest first out). The keys are prefixed with
+        ``negative:`` in the store.
+
+    Example:
+
+        ::
+
+            >>> cache = NegativeCache(ttl=3600)
+            >>> cache.set('address:addressLine=nowhere', 'empty')
+            >>> cache.get('address:addressLine=nowhere')
+            NegativeEntry(reason='empty', detail=None)
+            >>> cache.get('address:addressLine=1 main st') is None
+            True
+    """
+    def __init__(self, ttl=24 * 60 * 60, status_codes=NEGATIVE_STATUS_CODES,
+                 store=None, max_entries=65536):
+        self.ttl = ttl
+        self.status_codes = status_codes
+        self.store = store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the negative entry for the key (None if the key isn't
+        known to give no result)"""
+        entry = self._get('negative:{0}'.format(key))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return NegativeEntry(*entry)
+
+    def set(self, key, reason, detail=None, ttl=None):
+        """Records that the key gives no result. The ttl overrides the time
+        to live of the cache for this entry."""
+        key = 'negative:{0}'.format(key)
+        ttl = self.ttl if ttl is None else ttl
+        if self.store is not None:
+            self.store.set(key, [reason, detail], ttl)
+            return
+        expires = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = ([reason, detail], expires)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_failure(self, key, status_code):
+        """Records a failed request if its status code is one of the
+        recorded status codes
+
+        Returns:
+            recorded (bool): Whether the failure was recorded
+        """
+        if status_code not in self.status_codes:
+            return False
+        self.set(key, 'http', status_code)
+        return True
+
+    def delete(self, key):
+        """Removes the negative entry for the key"""
+        key = 'negative:{0}'.format(key)
+        if self.store is not None:
+            self.store.delete(key)
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _get(self, key):
+        if self.store is not None:
+            return self.store.get(key)
+        with self._lock:
+            entry, expires = self._entries.get(key, (None, None))
+            if expires is not None and expires <= time.time():
+                del self._entries[key]
+                return None
+            return entry
+
+    def __len__(self):
+        if self.store is not None:
+            return len(self.store)
+        return len(self._entries)
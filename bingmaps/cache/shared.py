@@ -0,0 +1,254 @@
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (
+    Connection,
+    Listener,
+    address_type,
+    answer_challenge,
+    deliver_challenge
+)
+import argparse
+import os
+import socket
+import struct
+import threading
+from .base import CacheBackend
+from .memory import CachedResponse, ResponseCache
+
+COMMANDS = ('get', 'set', 'delete', 'clear', 'items', 'len')
+
+
+class SocketCacheServer(object):
+    """Server keeping a single in-memory cache of the responses for all the
+    processes of a host, such as the workers of a gunicorn server. The
+    processes use the cache through a :class:`SocketCache` connected to the
+    local socket of the server.
+
+    :ivar address: Address of the socket: path of a unix socket or (host,
+        port) tuple of a TCP socket (use a local host such as
+        ``'127.0.0.1'``)
+    :ivar cache: Cache holding the responses (a new :class:`ResponseCache` if
+        None)
+    :ivar authkey: Secret shared by the server and the clients (bytes). The
+        clients which don't know it are rejected. Required for a TCP socket.
+
+    Every client connection is served by its own thread, which also checks
+    the authkey, so a client failing the check (or disconnecting during it)
+    doesn't stop the server from accepting the other clients. The messages are
+    pickled, so the server only talks to the clients which know the authkey.
+    A unix socket can be used without an authkey, in which case any process
+    which can open the socket is trusted: keep the permissions of the socket
+    (or of its directory) tight.
+
+    Example:
+
+        ::
+
+            >>> import os, tempfile
+            >>> path = os.path.join(tempfile.mkdtemp(), 'cache.sock')
+            >>> server = SocketCacheServer(path).start()
+            >>> cache = SocketCache(path)
+            >>> cache.set('a', CachedResponse('{}', 200, {}))
+            >>> SocketCache(path).get('a')
+            CachedResponse(text='{}', status_code=200, headers={})
+            >>> server.close()
+    """
+    def __init__(self, address, cache=None, authkey=None):
+        if isinstance(address, tuple) and not authkey:
+            raise ValueError('A TCP cache server needs an authkey, as it '
+                             'unpickles the messages of its clients')
+        self.cache = cache if cache is not None else ResponseCache()
+        self.authkey = authkey
+        self.listener = Listener(address)
+        self.address = self.listener.address
+        self._closed = False
+
+    def start(self):
+        """Serves the clients in a background thread
+
+        Returns:
+            server (SocketCacheServer): The server itself
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def serve_forever(self):
+        """Accepts the client connections until the server is closed"""
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            thread = threading.Thread(target=self.handle, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def handle(self, connection):
+        """Checks the authkey of a client connection, then answers its
+        requests until the client disconnects"""
+        with connection:
+            if self.authkey:
+                try:
+                    deliver_challenge(connection, self.authkey)
+                    answer_challenge(connection, self.authkey)
+                except (AuthenticationError, EOFError, OSError):
+                    return
+            while True:
+                try:
+                    command, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if command not in COMMANDS:
+                        raise ValueError('unknown command {0}'.format(
+                            command))
+                    if command == 'len':
+                        result = len(self.cache)
+                    elif command == 'items':
+                        result = list(self.cache.items(*args))
+                    else:
+                        result = getattr(self.cache, command)(*args)
+                except Exception as exc:
+                    result = exc
+                connection.send(result)
+
+    def close(self):
+        """Stops accepting client connections"""
+        self._closed = True
+        self.listener.close()
+
+
+class SocketCache(CacheBackend):
+    """Client of a :class:`SocketCacheServer` (see :class:`CacheBackend`)
+
+    Every thread uses its own connection to the server. When the server
+    can't be reached or doesn't answer within the timeout, the cache behaves
+    as an empty cache (responses are neither found nor stored), so that the
+    requests are still sent.
+
+    :ivar address: Address of the socket of the server
+    :ivar authkey: Secret shared by the server and the clients (bytes)
+    :ivar timeout: Time in seconds to wait for the connection and for every
+        answer of the server
+    """
+    def __init__(self, address, authkey=None, timeout=5.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, command, *args):
+        """Sends a request to the server and returns its answer (None if the
+        server can't be reached)"""
+        if command not in COMMANDS:
+            raise ValueError('unknown command {0}'.format(command))
+        try:
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = connect(self.address, self.authkey,
+                                     self.timeout)
+                self._local.connection = connection
+            connection.send((command, args))
+            result = connection.recv()
+        except (EOFError, OSError):
+            self.close()
+            return None
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def get(self, key):
+        return self.request('get', key)
+
+    def set(self, key, response, ttl=None):
+        self.request('set', key, response, ttl)
+
+    def delete(self, key):
+        self.request('delete', key)
+
+    def clear(self):
+        self.request('clear')
+
+    def items(self, limit=None):
+        return self.request('items', limit) or []
+
+    def close(self):
+        """Closes the connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __len__(self):
+        return self.request('len') or 0
+
+
+def connect(address, authkey=None, timeout=None):
+    """Opens a connection to a :class:`SocketCacheServer` whose connect,
+    send and receive calls fail with an OSError after the timeout
+
+    Args:
+        address (str/tuple): Address of the socket of the server
+        authkey (bytes): Secret shared by the server and the clients
+        timeout (float): Timeout in seconds (no timeout if None)
+
+    Returns:
+        connection (multiprocessing.connection.Connection): Connection to
+        the server
+    """
+    sock = socket.socket(getattr(socket, address_type(address)))
+    try:
+        if timeout is not None:
+            seconds = int(timeout)
+            value = struct.pack('ll', seconds,
+                                int((timeout - seconds) * 1000000))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, value)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, value)
+        sock.connect(address)
+        connection = Connection(sock.detach())
+    finally:
+        sock.close()
+    if authkey is not None:
+        try:
+            answer_challenge(connection, authkey)
+            deliver_challenge(connection, authkey)
+        except BaseException:
+            connection.close()
+            raise
+    return connection
+
+
+def main(args=None):
+    """Command line tool running a :class:`SocketCacheServer`
+
+    ::
+
+        bingmaps-cache-server /run/bingmaps/cache.sock --max-entries 100000
+
+    The secret shared with the clients is read from the
+    ``BINGMAPS_CACHE_AUTHKEY`` environment variable, which is required.
+    """
+    parser = argparse.ArgumentParser(prog='bingmaps-cache-server')
+    parser.add_argument('address', help='path of the unix socket')
+    parser.add_argument('--max-entries', type=int, default=1024,
+                        help='maximum number of cached responses')
+    parser.add_argument('--max-bytes', type=int, default=64 * 1024 * 1024,
+                        help='maximum total size of the cached responses')
+    parser.add_argument('--ttl', type=float, default=None,
+                        help='time to live of the responses in seconds')
+    options = parser.parse_args(args)
+    authkey = os.environ.get('BINGMAPS_CACHE_AUTHKEY')
+    if not authkey:
+        parser.error('the BINGMAPS_CACHE_AUTHKEY environment variable should '
+                     'hold the secret shared with the clients')
+    server = SocketCacheServer(
+        options.address,
+        ResponseCache(options.max_entries, options.max_bytes, options.ttl),
+        authkey.encode('utf-8'))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
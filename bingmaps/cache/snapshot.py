@@ -0,0 +1,85 @@
+import gzip
+import json
+from .memory import CachedResponse
+
+SNAPSHOT_FORMAT = 'bingmaps-cache-snapshot'
+
+
+def export_snapshot(cache, path, limit=None):
+    """Writes the fresh entries of a cache (:class:`ResponseCache` or
+    :class:`GeocodeCache`) to a gzip-compressed snapshot file, one JSON line
+    per entry. The entries are written as they are read from the cache, so
+    that the memory stays bounded.
+
+    Args:
+        cache (ResponseCache/GeocodeCache): Cache to be exported
+        path (str): Path of the snapshot file
+        limit (int): Only the ``limit`` hottest (most recently used or
+            stored) entries are exported (all of them if None)
+
+    Returns:
+        count (int): Number of exported entries
+    """
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as fp:
+        fp.write(json.dumps({'format': SNAPSHOT_FORMAT, 'version': 1}) + '\n')
+        for key, value in cache.items(limit):
+            if isinstance(value, CachedResponse):
+                entry = {'key': key, 'response': list(value)}
+            else:
+                entry = {'key': key, 'resources': value}
+            fp.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            count += 1
+    return count
+
+
+def read_snapshot(path):
+    """Iterates over the entries of a snapshot file
+
+    Args:
+        path (str): Path of the snapshot file
+
+    Returns:
+        entries (generator): Generator of (key, value) tuples, where the
+        value is a :class:`CachedResponse` or a list of resources
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as fp:
+        header = json.loads(fp.readline() or '{}')
+        if not header.get('format') == SNAPSHOT_FORMAT:
+            raise ValueError('{0} is not a cache snapshot'.format(path))
+        for line in fp:
+            entry = json.loads(line)
+            if 'response' in entry:
+                yield entry['key'], CachedResponse(*entry['response'])
+            else:
+                yield entry['key'], entry['resources']
+
+
+def import_snapshot(cache, path, batch_size=500):
+    """Loads the entries of a snapshot file into a cache. The entries are
+    streamed from the file and, for caches storing several entries at once
+    (such as :class:`GeocodeCache`), stored in batches of ``batch_size``
+    entries.
+
+    Args:
+        cache (ResponseCache/GeocodeCache): Cache to be loaded
+        path (str): Path of the snapshot file
+        batch_size (int): Number of entries stored at once
+
+    Returns:
+        count (int): Number of imported entries
+    """
+    count = 0
+    batch = {}
+    for key, value in read_snapshot(path):
+        if not hasattr(cache, 'set_many'):
+            cache.set(key, value)
+        else:
+            batch[key] = value
+            if len(batch) >= batch_size:
+                cache.set_many(batch)
+                batch = {}
+        count += 1
+    if batch:
+        cache.set_many(batch)
+    return count
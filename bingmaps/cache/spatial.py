@@ -0,0 +1,131 @@
+from bingmaps.urls import distance, geohash
+from collections import OrderedDict
+import threading
+
+
+class ReverseGeocodeCache(object):
+    """Cache of the results of the location by point API service keyed on
+    the geohash cell of the point instead of the exact point, so that points
+    a few metres apart (such as the GPS positions of a vehicle parked at the
+    same depot) share a single cache entry.
+
+    :ivar precision: Number of characters of the geohash of the cells (7: about
+        150 m x 150 m, 8: about 40 m x 20 m)
+    :ivar max_distance: When given, a cached result is only served if one of
+        its locations is within this distance (in metres) of the point;
+        otherwise the point is geocoded again.
+    :ivar store: Cache of the resources by key, such as a
+        :class:`GeocodeCache`. When None, the resources are kept in memory
+        (at most ``max_entries`` cells, least recently used first out).
+
+    Example:
+
+        ::
+
+            >>> cache = ReverseGeocodeCache(precision=7, max_distance=100)
+            >>> resources = [{
+            ...     'name': 'Redmond, WA',
+            ...     'point': {'coordinates': [47.64054, -122.12934]}}]
+            >>> cache.set('47.64054,-122.12934', resources)
+            >>> cache.get('47.64056,-122.12931') == resources
+            True
+            >>> cache.get('47.6502,-122.1401') is None
+            True
+    """
+    def __init__(self, precision=7, max_distance=None, store=None,
+                 max_entries=4096):
+        self.precision = precision
+        self.max_distance = max_distance
+        self.store = store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, point, params=''):
+        """Returns the key of the cell of the point
+
+        Args:
+            point (str/tuple): Point as a ``latitude,longitude`` string or
+                as a (latitude, longitude) tuple
+            params (str): Other query parameters of the request (the results
+                for different parameters are cached separately)
+
+        Returns:
+            key (str): Key of the cell in the cache
+        """
+        latitude, longitude = parse_point(point)
+        key = 'point:{0}'.format(geohash(latitude, longitude, self.precision))
+        if params:
+            key = '{0}?{1}'.format(key, params)
+        return key
+
+    def get(self, point, params=''):
+        """Returns the cached resources of the cell of the point (None if
+        there aren't cached resources or, when ``max_distance`` is given, if
+        none of the cached locations is close enough to the point)"""
+        resources = self._get(self.key(point, params))
+        if resources is not None and self.max_distance is not None:
+            point = parse_point(point)
+            distances = [distance(point, location)
+                         for location in resource_points(resources)]
+            if not distances or min(distances) > self.max_distance:
+                resources = None
+        with self._lock:
+            if resources is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return resources
+
+    def set(self, point, resources, params=''):
+        """Caches the resources for the cell of the point"""
+        key = self.key(point, params)
+        if self.store is not None:
+            self.store.set(key, resources)
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = resources
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get(self, key):
+        if self.store is not None:
+            return self.store.get(key)
+        with self._lock:
+            resources = self._entries.get(key)
+            if resources is not None:
+                self._entries.move_to_end(key)
+            return resources
+
+    def __len__(self):
+        if self.store is not None:
+            return len(self.store)
+        return len(self._entries)
+
+
+def parse_point(point):
+    """Returns the (latitude, longitude) tuple of a point given as a
+    ``latitude,longitude`` string or as a sequence"""
+    if isinstance(point, str):
+        point = point.split(',')
+    latitude, longitude = point
+    return float(latitude), float(longitude)
+
+
+def resource_points(resources):
+    """Returns the (latitude, longitude) points of the locations of the
+    resources of a JSON or XML (converted to dict) response"""
+    points = []
+    for resource in resources:
+        try:
+            points.append(parse_point(resource['point']['coordinates']))
+        except (KeyError, TypeError, ValueError):
+            try:
+                points.append(parse_point((resource['Point']['Latitude'],
+                                           resource['Point']['Longitude'])))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return points
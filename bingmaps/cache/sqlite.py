@@ -0,0 +1,414 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from .base import CacheBackend
+from .memory import CachedResponse
+from .snapshot import export_snapshot, import_snapshot
+
+
+class SQLiteConnections(object):
+    """Connections to a SQLite file, one for each thread, opened in WAL mode
+    so that multiple processes can read the file while one of them writes to
+    it
+
+    An in-memory database (``':memory:'``) only exists within its connection,
+    so it is opened once and shared by all the threads, which take turns
+    through a lock.
+
+    :ivar path: Path of the SQLite file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._shared = None
+        if path == ':memory:':
+            self._shared = LockedConnection(
+                sqlite3.connect(path, check_same_thread=False))
+
+    @property
+    def connection(self):
+        """SQLite connection of the current thread
+
+        :getter: Returns the connection of the current thread, opening it
+            when needed (the shared connection of an in-memory database)
+        :type: sqlite3.Connection
+        """
+        if self._shared is not None:
+            return self._shared
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """Closes the connection of the current thread (the shared connection
+        of an in-memory database)"""
+        if self._shared is not None:
+            self._shared.close()
+            return
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class LockedConnection(object):
+    """SQLite connection shared by several threads, which hold a lock for
+    every statement and for every transaction (``with connection:`` block)
+
+    :ivar connection: Shared SQLite connection
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self._lock = threading.RLock()
+
+    def execute(self, *args):
+        with self._lock:
+            return self.connection.execute(*args)
+
+    def executemany(self, *args):
+        with self._lock:
+            return self.connection.executemany(*args)
+
+    def commit(self):
+        with self._lock:
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self.connection.__enter__()
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *args):
+        try:
+            return self.connection.__exit__(*args)
+        finally:
+            self._lock.release()
+
+
+class GeocodeCache(object):
+    """Persistent cache of the results of the location API services
+    (LocationByAddress, LocationByQuery, LocationByPoint) stored in a local
+    SQLite file.
+
+    Only the parsed resources of a response are stored (as compressed JSON),
+    not the raw response text. Every entry has its own time to live.
+
+    :ivar path: Path of the SQLite file
+    :ivar ttl: Default time to live of an entry in seconds (None: never
+        expires)
+
+    The database is opened in WAL mode, so that multiple processes can read
+    the cache while one of them writes to it. Every thread uses its own
+    connection, except with an in-memory database (``':memory:'``), which
+    the threads share through a single connection.
+
+    Example:
+
+        ::
+
+            >>> cache = GeocodeCache(':memory:')
+            >>> cache.set('seattle', [{'name': 'Seattle, WA'}])
+            >>> cache.get('seattle')
+            [{'name': 'Seattle, WA'}]
+            >>> cache.get_many(['seattle', 'tacoma'])
+            {'seattle': [{'name': 'Seattle, WA'}]}
+    """
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._connections = SQLiteConnections(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS geocodes ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)')
+        self.connection.commit()
+
+    @property
+    def connection(self):
+        """SQLite connection of the current thread
+
+        :getter: Returns the connection of the current thread, opening it
+            when needed
+        :type: sqlite3.Connection
+        """
+        return self._connections.connection
+
+    def get(self, key):
+        """Returns the cached resources for the key (None if there aren't
+        fresh cached resources)"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Returns the fresh cached resources for the given keys
+
+        Args:
+            keys (list): Keys to be looked up
+
+        Returns:
+            resources (dict): Cached resources by key, only for the keys
+            which have fresh cached resources
+        """
+        found = {}
+        keys = list(keys)
+        now = time.time()
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            rows = self.connection.execute(
+                'SELECT key, value FROM geocodes WHERE key IN ({0}) AND '
+                '(expires IS NULL OR expires > ?)'.format(
+                    ','.join('?' * len(part))), part + [now])
+            for key, value in rows:
+                found[key] = decode(value)
+        return found
+
+    def set(self, key, resources, ttl=None):
+        """Caches the resources for the key. The ttl overrides the time to
+        live of the cache for this entry."""
+        self.set_many({key: resources}, ttl)
+
+    def set_many(self, items, ttl=None):
+        """Caches the resources of all the given keys in a single
+        transaction
+
+        Args:
+            items (dict): Resources by key
+            ttl (int): Time to live of the entries in seconds, overriding the
+                time to live of the cache
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.time() + ttl
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO geocodes (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                [(key, encode(resources), expires)
+                 for key, resources in items.items()])
+
+    def items(self, limit=None):
+        """Iterates over the fresh cached resources, least recently stored
+        first. The rows are read from the SQLite file as they are iterated,
+        so that the memory stays bounded.
+
+        Args:
+            limit (int): Only the ``limit`` most recently stored resources are
+                returned (all of them if None)
+
+        Returns:
+            items (generator): Generator of (key, resources) tuples
+        """
+        query = 'SELECT rowid, key, value FROM geocodes WHERE ' \
+                'expires IS NULL OR expires > ?'
+        params = [time.time()]
+        if limit is not None:
+            query = 'SELECT * FROM ({0} ORDER BY rowid DESC LIMIT ?)'.format(
+                query)
+            params.append(limit)
+        rows = self.connection.execute(query + ' ORDER BY rowid', params)
+        for rowid, key, value in rows:
+            yield key, decode(value)
+
+    def delete(self, key):
+        """Removes the cached resources for the key"""
+        with self.connection:
+            self.connection.execute('DELETE FROM geocodes WHERE key = ?',
+                                    (key,))
+
+    def compact(self):
+        """Removes the expired entries and gives the free space of the
+        SQLite file back to the file system
+
+        Returns:
+            removed (int): Number of expired entries removed
+        """
+        with self.connection:
+            removed = self.connection.execute(
+                'DELETE FROM geocodes WHERE expires IS NOT NULL AND '
+                'expires <= ?', (time.time(),)).rowcount
+        self.connection.execute('VACUUM')
+        self.connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return removed
+
+    def close(self):
+        """Closes the connection of the current thread"""
+        self._connections.close()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM geocodes').fetchone()[0]
+
+
+class SQLiteResponseCache(CacheBackend):
+    """Cache of the responses of the bing maps REST services stored in a
+    local SQLite file (see :class:`CacheBackend`), so that all the worker
+    processes of a host share the cached responses.
+
+    The responses are stored as compressed JSON in their own ``responses``
+    table, so the file can also hold a :class:`GeocodeCache`. When the cache
+    is full, the least recently used responses are evicted.
+
+    :ivar path: Path of the SQLite file
+    :ivar ttl: Default time to live of an entry in seconds (None: never
+        expires)
+    :ivar max_entries: Maximum number of cached responses (None: no maximum)
+
+    Example:
+
+        ::
+
+            >>> cache = SQLiteResponseCache(':memory:', max_entries=1)
+            >>> cache.set('a', CachedResponse('{}', 200, {}))
+            >>> cache.get('a')
+            CachedResponse(text='{}', status_code=200, headers={})
+            >>> cache.set('b', CachedResponse('[]', 200, {}))
+            >>> cache.get('a') is None
+            True
+    """
+    def __init__(self, path, ttl=None, max_entries=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._connections = SQLiteConnections(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+                'used REAL NOT NULL)')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS responses_used ON responses '
+                '(used)')
+
+    @property
+    def connection(self):
+        """SQLite connection of the current thread
+
+        :getter: Returns the connection of the current thread, opening it
+            when needed
+        :type: sqlite3.Connection
+        """
+        return self._connections.connection
+
+    def get(self, key):
+        now = time.time()
+        row = self.connection.execute(
+            'SELECT value FROM responses WHERE key = ? AND '
+            '(expires IS NULL OR expires > ?)', (key, now)).fetchone()
+        if row is None:
+            return None
+        if self.max_entries is not None:
+            with self.connection:
+                self.connection.execute(
+                    'UPDATE responses SET used = ? WHERE key = ?', (now, key))
+        return CachedResponse(*decode(row[0]))
+
+    def set(self, key, response, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses (key, value, expires, used) '
+                'VALUES (?, ?, ?, ?)',
+                (key, encode(list(response)), expires, now))
+            if self.max_entries is not None:
+                self.connection.execute(
+                    'DELETE FROM responses WHERE rowid IN (SELECT rowid FROM '
+                    'responses ORDER BY used DESC, rowid DESC '
+                    'LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def delete(self, key):
+        with self.connection:
+            self.connection.execute('DELETE FROM responses WHERE key = ?',
+                                    (key,))
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute('DELETE FROM responses')
+
+    def items(self, limit=None):
+        query = 'SELECT key, value, used, rowid FROM responses WHERE ' \
+                'expires IS NULL OR expires > ?'
+        params = [time.time()]
+        if limit is not None:
+            query = 'SELECT * FROM ({0} ORDER BY used DESC, rowid DESC ' \
+                    'LIMIT ?)'.format(query)
+            params.append(limit)
+        rows = self.connection.execute(query + ' ORDER BY used, rowid',
+                                       params)
+        for key, value, _, _ in rows:
+            yield key, CachedResponse(*decode(value))
+
+    def close(self):
+        """Closes the connection of the current thread"""
+        self._connections.close()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+def encode(resources):
+    """Compresses the resources to be stored in the SQLite file"""
+    return zlib.compress(json.dumps(resources,
+                                    separators=(',', ':')).encode('utf-8'))
+
+
+def decode(value):
+    """Decompresses the resources stored in the SQLite file"""
+    return json.loads(zlib.decompress(value).decode('utf-8'))
+
+
+def main(args=None):
+    """Command line tool for the persistent geocode cache
+
+    ::
+
+        bingmaps-geocode-cache compact geocodes.sqlite
+        bingmaps-geocode-cache export geocodes.sqlite hot.jsonl.gz --limit 1000
+        bingmaps-geocode-cache import geocodes.sqlite hot.jsonl.gz
+    """
+    parser = argparse.ArgumentParser(prog='bingmaps-geocode-cache')
+    commands = parser.add_subparsers(dest='command')
+    compact = commands.add_parser(
+        'compact', help='remove the expired entries and shrink the file')
+    compact.add_argument('path', help='path of the SQLite file')
+    export = commands.add_parser(
+        'export', help='write the most recent entries to a snapshot file')
+    export.add_argument('path', help='path of the SQLite file')
+    export.add_argument('snapshot', help='path of the snapshot file')
+    export.add_argument('--limit', type=int, default=None,
+                        help='number of most recent entries to export')
+    load = commands.add_parser(
+        'import', help='load the entries of a snapshot file')
+    load.add_argument('path', help='path of the SQLite file')
+    load.add_argument('snapshot', help='path of the snapshot file')
+    options = parser.parse_args(args)
+    if options.command == 'compact':
+        removed = GeocodeCache(options.path).compact()
+        print('Removed {0} expired entries'.format(removed))
+    elif options.command == 'export':
+        count = export_snapshot(GeocodeCache(options.path), options.snapshot,
+                                options.limit)
+        print('Exported {0} entries'.format(count))
+    elif options.command == 'import':
+        count = import_snapshot(GeocodeCache(options.path), options.snapshot)
+        print('Imported {0} entries'.format(count))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+from collections import namedtuple, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import threading
+import time
+from .memory import CachedResponse
+
+TrafficCacheStats = namedtuple('TrafficCacheStats',
+                               ['hits', 'stale_hits', 'misses', 'refreshes',
+                                'refresh_errors', 'entries'])
+
+
+class TrafficCache(object):
+    """Short-lived cache of the responses of the traffic incidents API
+    service with stale-while-revalidate.
+
+      - A response younger than ``ttl`` seconds is served from the cache.
+      - A response older than ``ttl`` but younger than ``ttl + stale_ttl``
+        seconds is served immediately from the cache, while the response is
+        refreshed in a background thread.
+      - Otherwise the response is fetched and the caller waits for it.
+
+    Concurrent fetches and background refreshes of the same key are
+    deduplicated: only one request is sent, and the other callers get its
+    response.
+
+    :ivar ttl: Time in seconds a response is fresh
+    :ivar stale_ttl: Time in seconds a response is still served (and
+        refreshed in the background) after it is no longer fresh
+    :ivar max_entries: Maximum number of cached responses
+    :ivar max_workers: Maximum number of background refreshes running at the
+        same time
+
+    Example:
+
+        ::
+
+            >>> cache = TrafficCache(ttl=10, stale_ttl=60)
+            >>> cache.get('seattle', lambda: CachedResponse('{}', 200, {}))
+            CachedResponse(text='{}', status_code=200, headers={})
+            >>> cache.get('seattle', lambda: None)
+            CachedResponse(text='{}', status_code=200, headers={})
+            >>> cache.stats
+            TrafficCacheStats(hits=1, stale_hits=0, misses=1, refreshes=0, \
+refresh_errors=0, entries=1)
+    """
+    def __init__(self, ttl=10, stale_ttl=60, max_entries=256, max_workers=2):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._refreshes = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get(self, key, fetch):
+        """Returns the response for the key, fetching it (or refreshing it in
+        the background) when needed
+
+        Args:
+            key (str): Key of the response, such as the canonical form of the
+                url
+            fetch (function): Function without arguments which fetches the
+                response
+
+        Returns:
+            response (CachedResponse): Cached or fetched response
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, fetched = entry
+                age = time.monotonic() - fetched
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    self._schedule_refresh(key, fetch)
+                    return response
+            self.misses += 1
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            response = self._fetch(key, fetch)
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _fetch(self, key, fetch):
+        response = fetch()
+        response = CachedResponse(response.text, response.status_code,
+                                  dict(response.headers))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (response, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return response
+
+    def _schedule_refresh(self, key, fetch):
+        if key in self._refreshes or key in self._pending:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.refreshes += 1
+        self._refreshes[key] = self._executor.submit(self._refresh, key,
+                                                     fetch)
+
+    def _refresh(self, key, fetch):
+        try:
+            self._fetch(key, fetch)
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshes.pop(key, None)
+
+    def wait(self, timeout=None):
+        """Waits for the running background refreshes to finish"""
+        with self._lock:
+            futures = list(self._refreshes.values())
+        wait(futures, timeout)
+
+    def delete(self, key):
+        """Removes the cached response for the key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes all the cached responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        """Waits for the background refreshes and stops their threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def stats(self):
+        """Hits, stale hits, misses, background refreshes, failed background
+        refreshes and number of entries of the cache
+
+        :getter: Returns a namedtuple of the cache statistics
+        :type: TrafficCacheStats
+        """
+        return TrafficCacheStats(self.hits, self.stale_hits, self.misses,
+                                 self.refreshes, self.refresh_errors,
+                                 len(self._entries))
@@ -1,3 +1,12 @@
+from .coordinates import (
+    EARTH_RADIUS,
+    distance,
+    format_coordinate,
+    format_point,
+    geohash,
+    polyline_distance
+)
+
 from .locations_build_urls import (
     LocationByAddressSchema,
     LocationByAddressUrl,
@@ -8,6 +17,9 @@ from .locations_build_urls import (
 )
 
 from .elevations_build_urls import (
+    MAX_POINTS,
+    compress_points,
+    decompress_points,
     ElevationsUrl,
     Coordinates,
     Polyline,
@@ -19,3 +31,9 @@ from .traffic_build_urls import (
     TrafficIncidentsSchema,
     TrafficIncidentsUrl
 )
+
+from .planner import (
+    MAX_AREA_SIZE,
+    URL_LIMITS,
+    RequestPlanner
+)
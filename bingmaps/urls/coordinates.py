@@ -0,0 +1,160 @@
+from decimal import Decimal
+import math
+
+EARTH_RADIUS = 6371008.8
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def format_coordinate(value, precision=None):
+    """Formats a latitude/longitude for the URL of the bing maps REST
+    services.
+
+    Args:
+        value (float): Latitude/longitude in WGS84 decimal degrees
+        precision (int): Number of decimal places the latitude/longitude is
+            rounded to. If None, the value is formatted in full precision.
+
+    Returns:
+        coordinate (str): Formatted latitude/longitude
+
+    Example:
+
+        ::
+
+            >>> format_coordinate(35.894310000000004)
+            '35.894310000000004'
+            >>> format_coordinate(35.894310000000004, 5)
+            '35.89431'
+            >>> format_coordinate(37, 5)
+            '37.0'
+            >>> format_coordinate(-0.000001, 5)
+            '0.0'
+            >>> format_coordinate(-0.00004, 5)
+            '-0.00004'
+            >>> format_coordinate(0.00001)
+            '0.00001'
+    """
+    if precision is None:
+        text = str(value)
+        if 'e' in text.lower():
+            text = format(Decimal(repr(float(value))), 'f')
+        return text
+    text = '{0:.{1}f}'.format(round(float(value), precision) + 0.0,
+                              precision)
+    if '.' not in text:
+        return text + '.0'
+    text = text.rstrip('0')
+    return text + '0' if text.endswith('.') else text
+
+
+def format_point(point, precision=None):
+    """Formats a point given as a ``latitude,longitude`` string
+
+    Example:
+
+        ::
+
+            >>> format_point('47.640541234,-122.129341234', 5)
+            '47.64054,-122.12934'
+            >>> format_point('47.640541234,-122.129341234')
+            '47.640541234,-122.129341234'
+    """
+    if precision is None:
+        return point
+    return ','.join(format_coordinate(float(value), precision)
+                    for value in point.split(','))
+
+
+def distance(start, end):
+    """Returns the great-circle distance in metres between two (latitude,
+    longitude) points using the haversine formula"""
+    lat1, lon1 = math.radians(start[0]), math.radians(start[1])
+    lat2, lon2 = math.radians(end[0]), math.radians(end[1])
+    hav = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(hav)))
+
+
+def geohash(latitude, longitude, precision=7):
+    """Returns the geohash of the cell containing the point. The cells of 7
+    characters are about 150 m x 150 m, every character less makes the cells
+    about 4 to 8 times larger.
+
+    Args:
+        latitude (float): Latitude in WGS84 decimal degrees
+        longitude (float): Longitude in WGS84 decimal degrees
+        precision (int): Number of characters of the geohash
+
+    Returns:
+        geohash (str): Geohash of the cell
+
+    Example:
+
+        ::
+
+            >>> geohash(57.64911, 10.40744, 11)
+            'u4pruydqqvj'
+            >>> geohash(47.64054, -122.12934)
+            'c23phbs'
+    """
+    south, north = -90.0, 90.0
+    west, east = -180.0, 180.0
+    chars = []
+    value = bits = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            middle = (west + east) / 2
+            if longitude >= middle:
+                value = value * 2 + 1
+                west = middle
+            else:
+                value *= 2
+                east = middle
+        else:
+            middle = (south + north) / 2
+            if latitude >= middle:
+                value = value * 2 + 1
+                south = middle
+            else:
+                value *= 2
+                north = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            value = bits = 0
+    return ''.join(chars)
+
+
+def polyline_distance(point, points):
+    """Returns the distance in metres from a (latitude, longitude) point to
+    the nearest segment of a polyline given as a list of (latitude,
+    longitude) points. The segments are projected on the plane tangent at
+    the point, which is accurate for distances up to tens of kilometres.
+
+    Example:
+
+        ::
+
+            >>> round(polyline_distance((0.01, 0.5), [(0, 0), (0, 1)]))
+            1112
+    """
+    latitude, longitude = point
+    scale = math.radians(1) * EARTH_RADIUS
+    parallel = math.cos(math.radians(latitude))
+    projected = [((lon - longitude) * scale * parallel,
+                  (lat - latitude) * scale) for lat, lon in points]
+    if len(projected) == 1:
+        return math.hypot(*projected[0])
+    nearest = None
+    for (x1, y1), (x2, y2) in zip(projected, projected[1:]):
+        dx, dy = x2 - x1, y2 - y1
+        length = dx * dx + dy * dy
+        fraction = 0.0 if not length else \
+            min(max(-(x1 * dx + y1 * dy) / length, 0.0), 1.0)
+        gap = math.hypot(x1 + fraction * dx, y1 + fraction * dy)
+        if nearest is None or gap < nearest:
+            nearest = gap
+    return nearest
@@ -1,4 +1,111 @@
-from marshmallow import fields, Schema, post_dump, validate
+from marshmallow import (
+    fields,
+    Schema,
+    post_dump,
+    validate,
+    validates_schema,
+    ValidationError
+)
+import math
+from .coordinates import format_coordinate
+
+MAX_POINTS = 1024
+
+SAFE_CHARACTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' \
+                  'abcdefghijklmnopqrstuvwxyz0123456789_-'
+
+
+def compress_points(points, previous=None):
+    """Compresses the points using the point compression algorithm of the
+    bing maps REST services
+    (https://msdn.microsoft.com/en-us/library/jj158958.aspx). The latitudes
+    and longitudes are rounded to 5 decimal places.
+
+    Args:
+        points (list): Flattened latitudes and longitudes
+        previous (list): The point before the first point, if the compressed
+            string continues another compressed string
+
+    Returns:
+        compressed (str): Compressed string of the points
+
+    Example:
+
+        ::
+
+            >>> compress_points([35.894309002906084, -110.72522000409663,
+            ...                  35.893930979073048, -110.72577999904752,
+            ...                  35.893744984641671, -110.72606003843248,
+            ...                  35.893366960808635, -110.72661500424147])
+            'vx1vilihnM6hR7mEl2Q'
+    """
+    latitude, longitude = (0, 0) if previous is None else \
+        (int(round(previous[0] * 100000)), int(round(previous[1] * 100000)))
+    result = []
+    for index in range(0, len(points), 2):
+        new_latitude = int(round(points[index] * 100000))
+        new_longitude = int(round(points[index + 1] * 100000))
+        dy = new_latitude - latitude
+        dx = new_longitude - longitude
+        latitude, longitude = new_latitude, new_longitude
+        dy = (dy << 1) ^ (dy >> 31)
+        dx = (dx << 1) ^ (dx >> 31)
+        value = ((dy + dx) * (dy + dx + 1) // 2) + dy
+        while True:
+            rem = value & 31
+            value = (value - rem) // 32
+            if value > 0:
+                rem += 32
+            result.append(SAFE_CHARACTERS[rem])
+            if value == 0:
+                break
+    return ''.join(result)
+
+
+def decompress_points(value):
+    """Decompresses a string compressed with :func:`compress_points`
+
+    Args:
+        value (str): Compressed string of the points
+
+    Returns:
+        points (list): Flattened latitudes and longitudes
+
+    Example:
+
+        ::
+
+            >>> points = decompress_points('vx1vilihnM6hR7mEl2Q')
+            >>> points[:4]
+            [35.89431, -110.72522, 35.89393, -110.72578]
+            >>> points[4:]
+            [35.89374, -110.72606, 35.89337, -110.72662]
+    """
+    points = []
+    latitude = longitude = 0
+    index = 0
+    while index < len(value):
+        number = 0
+        shift = 0
+        while True:
+            rem = SAFE_CHARACTERS.index(value[index])
+            index += 1
+            number |= (rem & 31) << shift
+            shift += 5
+            if rem < 32:
+                break
+        diagonal = int((math.sqrt(8 * number + 5) - 1) / 2)
+        while diagonal * (diagonal + 1) // 2 > number:
+            diagonal -= 1
+        while (diagonal + 1) * (diagonal + 2) // 2 <= number:
+            diagonal += 1
+        dy = number - diagonal * (diagonal + 1) // 2
+        dx = diagonal - dy
+        latitude += (dy >> 1) ^ -(dy & 1)
+        longitude += (dx >> 1) ^ -(dx & 1)
+        points.extend([round(latitude / 100000.0, 5),
+                       round(longitude / 100000.0, 5)])
+    return points
 
 
 class ElevationsUrl(object):
@@ -184,6 +291,18 @@ class Elevations(Schema):
             >>> schema.dump(data).data
             OrderedDict([('version', 'v1'), ('restApi', 'Elevation')])
 
+        The latitudes and longitudes are rounded to a number of decimal places
+        when the schema is created with a ``precision`` in its context, which
+        makes the URLs shorter and nearly identical points share the same URL:
+
+        ::
+
+            >>> schema = Coordinates(context={'precision': 5})
+            >>> schema.dump({'method': 'List',
+            ...              'points': [35.894310000000004, -110.725224],
+            ...              'key': 'abs'}).data['query']
+            'List?points=35.89431,-110.72522&heights=sealevel&key=abs'
+
     .. note:: Elevations class is common for all the elevations based services
         with the same default data.
     """
@@ -201,6 +320,24 @@ class Elevations(Schema):
         fields = ('version', 'restApi', 'resourcePath')
         ordered = True
 
+    def coordinate(self, value):
+        """Returns the latitude/longitude as a string for the query
+        parameters. The value is rounded to the number of decimal places
+        given with ``context={'precision': 6}`` when the schema was
+        created."""
+        return format_coordinate(value, self.context.get('precision'))
+
+    def points_string(self, points):
+        """Returns the points as a string for the query parameters. The
+        points are compressed (see :func:`compress_points`) when the schema
+        was created with ``context={'compress_points': True}``."""
+        if self.context.get('compress_points'):
+            precision = self.context.get('precision')
+            if precision is not None:
+                points = [round(val, precision) for val in points]
+            return compress_points(points)
+        return ','.join(self.coordinate(val) for val in points)
+
 
 class Coordinates(Elevations, Schema):
     """Inherited from :class:`Elevations`
@@ -260,10 +397,16 @@ class Coordinates(Elevations, Schema):
     )
     points = fields.List(
         fields.Float,
-        validate=validate.Length(
-            min=2,
-            error='Both latitude and longitude should be entered'
-        ),
+        validate=[
+            validate.Length(
+                min=2,
+                error='Both latitude and longitude should be entered'
+            ),
+            validate.Length(
+                max=2 * MAX_POINTS,
+                error='The maximum number of points is {0}'.format(MAX_POINTS)
+            )
+        ],
         required=True,
         error_messages={'required': 'Latitudes, Longitudes not specified'}
     )
@@ -297,7 +440,7 @@ class Coordinates(Elevations, Schema):
             if key not in ['version', 'restApi', 'resourcePath']:
                 if not key == 'method':
                     if key == 'points':
-                        value = ','.join(str(val) for val in value)
+                        value = self.points_string(value)
                         keys_to_be_removed.append(key)
                     query.append('{0}={1}'.format(key, value))
                     keys_to_be_removed.append(key)
@@ -386,6 +529,11 @@ samples=10&key=abs')])
     )
     samples = fields.Int(
         required=True,
+        validate=validate.Range(
+            min=1,
+            max=MAX_POINTS,
+            error='samples should be between 1 and {0}'.format(MAX_POINTS)
+        ),
         error_messages={'required': 'need a samples value'}
     )
     o = fields.Str()
@@ -415,7 +563,7 @@ samples=10&key=abs')])
             if key not in ['version', 'restApi', 'resourcePath']:
                 if not key == 'method':
                     if key == 'points':
-                        value = ','.join(str(val) for val in value)
+                        value = self.points_string(value)
                         keys_to_be_removed.append(key)
                     query.append('{0}={1}'.format(key, value))
                     keys_to_be_removed.append(key)
@@ -481,10 +629,16 @@ class Offset(Elevations, Schema):
     )
     points = fields.List(
         fields.Float,
-        validate=validate.Length(
-            min=2,
-            error='Both latitude and longitude should be entered'
-        ),
+        validate=[
+            validate.Length(
+                min=2,
+                error='Both latitude and longitude should be entered'
+            ),
+            validate.Length(
+                max=2 * MAX_POINTS,
+                error='The maximum number of points is {0}'.format(MAX_POINTS)
+            )
+        ],
         required=True,
         error_messages={'required': 'Latitudes, Longitudes not specified'}
     )
@@ -515,7 +669,7 @@ class Offset(Elevations, Schema):
             if key not in ['version', 'restApi', 'resourcePath']:
                 if not key == 'method':
                     if key == 'points':
-                        value = ','.join(str(val) for val in value)
+                        value = self.points_string(value)
                         keys_to_be_removed.append(key)
                     query.append('{0}={1}'.format(key, value))
                     keys_to_be_removed.append(key)
@@ -603,10 +757,18 @@ sealevel&key=abs')])
     )
     rows = fields.Int(
         required=True,
+        validate=validate.Range(
+            min=2,
+            error='Number of rows should be at least 2'
+        ),
         error_messages={'required': 'Number of rows should be specified'}
     )
     cols = fields.Int(
         required=True,
+        validate=validate.Range(
+            min=2,
+            error='Number of columns should be at least 2'
+        ),
         error_messages={'required': 'Number of columns should be specified'}
     )
     heights = fields.Str(
@@ -623,6 +785,19 @@ sealevel&key=abs')])
                   'rows', 'cols', 'heights', 'o', 'key')
         ordered = True
 
+    @validates_schema
+    def validate_grid_size(self, data):
+        """Validates that the grid doesn't define more than 1024 locations
+        (rows * cols <= 1024)"""
+        rows = data.get('rows')
+        cols = data.get('cols')
+        if isinstance(rows, int) and isinstance(cols, int) and \
+                rows * cols > MAX_POINTS:
+            raise ValidationError(
+                'rows * cols should be less than or equal to {0}'.format(
+                    MAX_POINTS),
+                ['rows', 'cols'])
+
     @post_dump
     def build_query_string(self, data):
         """This method occurs after dumping the data into the class.
@@ -639,7 +814,8 @@ sealevel&key=abs')])
             if key not in ['version', 'restApi', 'resourcePath']:
                 if not key == 'method':
                     if key == 'bounds':
-                        value = ','.join(str(val) for val in value)
+                        value = ','.join(self.coordinate(val)
+                                         for val in value)
                         keys_to_be_removed.append(key)
                     query.append('{0}={1}'.format(key, value))
                     keys_to_be_removed.append(key)
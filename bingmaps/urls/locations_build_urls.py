@@ -1,5 +1,6 @@
 from marshmallow import Schema, fields, post_dump
 from urllib.parse import quote
+from .coordinates import format_point
 
 
 class LocationUrl(object):
@@ -383,6 +384,10 @@ class LocationByPointSchema(Location, Schema):
         key
           - Required
 
+    The latitude and longitude of the point are rounded to a number of
+    decimal places when the schema is created with a ``precision`` in its
+    context (``context={'precision': 5}``).
+
     Post-Dump:
         After dumping the data, build_query_string builds up the
         queryParameters string. The final value after dumping the data would
@@ -457,7 +462,8 @@ includeNeighborhood=1&include=ciso2&c=te&o=xml&maxResults=20&key=abs')])
                     keys_to_be_removed.append(key)
                 keys_to_be_removed.append(key)
         queryString = '&'.join(queryValues)
-        data['query'] = '{0}?{1}'.format(data['point'], queryString)
+        point = format_point(data['point'], self.context.get('precision'))
+        data['query'] = '{0}?{1}'.format(point, queryString)
         for k in list(set(keys_to_be_removed)):
             del data[k]
         return data
@@ -469,6 +475,7 @@ class LocationByPointUrl(LocationUrl):
     :ivar data: Data required for building up the URL
     :ivar httpprotocol: http protocol for the url
     :ivar schema: location by point schema to which the data will be dumped
+    :ivar precision: Number of decimal places the point is rounded to
 
     All the URL values are retrieved from the schema.
 
@@ -499,8 +506,8 @@ class LocationByPointUrl(LocationUrl):
             '47.64054,-122.12934?includeEntityTypes=Address&\
 includeNeighborhood=1&include=ciso2&c=te&o=xml&maxResults=20&key=abs'
     """
-    def __init__(self, data, httpprotocol):
-        schema = LocationByPointSchema()
+    def __init__(self, data, httpprotocol, precision=None):
+        schema = LocationByPointSchema(context={'precision': precision})
         super().__init__(data, httpprotocol, schema)
 
     @property
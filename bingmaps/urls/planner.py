@@ -0,0 +1,289 @@
+from .coordinates import EARTH_RADIUS, distance
+from .elevations_build_urls import MAX_POINTS, compress_points
+import math
+
+URL_LIMITS = {
+    'Locations': 2048,
+    'Elevation': 2048,
+    'Traffic': 2048
+}
+
+MAX_AREA_SIZE = 500000
+
+
+class RequestPlanner(object):
+    """This class helps in planning the requests sent to the bing maps REST
+    services so that no request gets rejected because of the length of its
+    URL.
+
+    :ivar url_limits: Maximum length of the URL for every REST API
+        (``Locations``, ``Elevation``, ``Traffic``). The given limits
+        override the default limits in ``URL_LIMITS``.
+    :ivar compress: Whether the points of the elevations API may be sent
+        compressed (off by default). The compressed points are rounded to 5
+        decimal places, so only enable it when that precision is enough.
+    :ivar max_area_size: Maximum height and width in metres of the mapArea of
+        a traffic incidents request (500 km for the service).
+
+    The planner packs as many values as possible into every request:
+      - Points of the elevations API are split into the fewest chunks which
+        fit both in the URL and in the 1024 points limit of the service. When
+        ``compress`` is enabled and the points need more than one request,
+        the planner also tries the compressed encoding of the points (see
+        :func:`compress_points`) and uses it if it needs fewer requests.
+      - Lists of values (such as the ``severity``/``type`` filters of the
+        traffic incidents API) are halved until the URLs of all the parts
+        fit.
+      - A mapArea larger than ``max_area_size`` x ``max_area_size`` is split
+        into a grid of tiles which all fit.
+      - A route corridor (polyline and width) is covered by boxes following
+        the route, each fitting in ``max_area_size``.
+      - Everything which can't be split (such as the address of a location
+        query) is checked and a ValueError is raised before sending the
+        request.
+
+    Example:
+
+        ::
+
+            >>> planner = RequestPlanner({'Elevation': 60})
+            >>> planner.split_points([1.5, 2.5, 3.5, 4.5, 5.5, 6.5], 40)
+            [[1.5, 2.5, 3.5, 4.5], [5.5, 6.5]]
+            >>> planner.fits('x' * 61, 'Elevation')
+            False
+    """
+    def __init__(self, url_limits=None, compress=False,
+                 max_area_size=MAX_AREA_SIZE):
+        self.compress = compress
+        self.max_area_size = max_area_size
+        self.url_limits = dict(URL_LIMITS)
+        if url_limits:
+            self.url_limits.update(url_limits)
+
+    def url_limit(self, rest_api):
+        """Returns the maximum length of the URL for the given REST API"""
+        return self.url_limits.get(rest_api, min(URL_LIMITS.values()))
+
+    def fits(self, url, rest_api):
+        """Returns whether the given URL fits in the limit of the REST API"""
+        return len(url) <= self.url_limit(rest_api)
+
+    def check_url(self, url, rest_api):
+        """Raises a ValueError when the given URL doesn't fit in the limit of
+        the REST API and can't be split into multiple requests"""
+        if not self.fits(url, rest_api):
+            raise ValueError('The URL is {0} characters long, the maximum for '
+                             'the {1} API is {2}'.format(
+                                 len(url), rest_api,
+                                 self.url_limit(rest_api)))
+
+    def split_points(self, points, base_length, rest_api='Elevation',
+                     max_points=MAX_POINTS, compress=False, fmt=str):
+        """Splits the points into the fewest chunks whose URLs fit in the
+        limit of the REST API.
+
+        Args:
+            points (list): Flattened latitudes and longitudes
+            base_length (int): Length of the URL without any points
+            rest_api (str): REST API the URLs are built for
+            max_points (int): Maximum number of points in a chunk
+            compress (bool): Whether the points are sent compressed
+            fmt (function): Function formatting a latitude/longitude in the
+                URL
+
+        Returns:
+            chunks (list): List of flattened latitudes and longitudes
+        """
+        budget = self.url_limit(rest_api) - base_length
+        chunks = []
+        chunk = []
+        length = 0
+        for index in range(0, len(points), 2):
+            point = points[index:index + 2]
+            previous = chunk[-2:] if chunk else None
+            cost = points_length(point, previous, compress, fmt)
+            if chunk and (length + cost > budget or
+                          len(chunk) >= 2 * max_points):
+                chunks.append(chunk)
+                chunk = []
+                length = 0
+                cost = points_length(point, None, compress, fmt)
+            if cost > budget:
+                raise ValueError('The point {0} does not fit in the '
+                                 'URL'.format(point))
+            chunk.extend(point)
+            length += cost
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def split_lists(self, data, keys, fits):
+        """Splits the data into the fewest parts for which ``fits(part)`` is
+        true by halving the longest of the lists of the given keys until
+        every part fits.
+
+        Args:
+            data (dict): Data given by the user
+            keys (list): Keys of the lists in the data which can be split
+            fits (function): Function returning whether the URL built with
+                the given part of the data fits in the limit
+
+        Returns:
+            parts (list): List of data dictionaries
+        """
+        if fits(data):
+            return [data]
+        keys = [key for key in keys
+                if isinstance(data.get(key), list) and len(data[key]) > 1]
+        if not keys:
+            raise ValueError('The URL does not fit in the limit and can not '
+                             'be split into multiple requests')
+        key = max(keys, key=lambda key: len(data[key]))
+        middle = len(data[key]) // 2
+        first, second = dict(data), dict(data)
+        first[key] = data[key][:middle]
+        second[key] = data[key][middle:]
+        return self.split_lists(first, keys, fits) + \
+            self.split_lists(second, keys, fits)
+
+    def split_area(self, bounds):
+        """Splits a bounding box into the fewest rows of equal tiles whose
+        height and width are at most ``max_area_size``. The width of the
+        tiles of a row is measured along the parallel of the row closest to
+        the equator, where the row is the widest.
+
+        Args:
+            bounds (list): (south, west, north, east) of the bounding box
+
+        Returns:
+            tiles (list): (south, west, north, east) lists of the tiles, row
+            by row from south to north and from west to east
+
+        Example:
+
+            ::
+
+                >>> planner = RequestPlanner()
+                >>> planner.split_area([37, -105, 40, -100])
+                [[37.0, -105.0, 40.0, -100.0]]
+                >>> len(planner.split_area([37, -105, 45, -94]))
+                4
+        """
+        south, west, north, east = [float(value) for value in bounds]
+        height = distance((south, west), (north, west))
+        latitudes = split_line(south, north, height / self.max_area_size)
+        tiles = []
+        for row_south, row_north in zip(latitudes, latitudes[1:]):
+            if row_south <= 0 <= row_north:
+                latitude = 0.0
+            else:
+                latitude = min(abs(row_south), abs(row_north))
+            width = math.radians(east - west) * EARTH_RADIUS * \
+                math.cos(math.radians(latitude))
+            longitudes = split_line(west, east, width / self.max_area_size)
+            for col_west, col_east in zip(longitudes, longitudes[1:]):
+                tiles.append([row_south, col_west, row_north, col_east])
+        return tiles
+
+    def split_corridor(self, points, width, max_ratio=4):
+        """Covers the corridor of a route with a few mapArea boxes following
+        the route. The route is walked from start to end and the current box
+        is extended with the next point of the route unless the box would no
+        longer fit in ``max_area_size`` or would be more than ``max_ratio``
+        times larger than the part of the corridor inside it. A straight
+        north-south or east-west route fits in long thin boxes, while a
+        diagonal route gets a staircase of smaller boxes instead of one
+        large box.
+
+        Args:
+            points (list): (latitude, longitude) points of the route
+            width (float): Width of the corridor in metres (the route is in
+                the middle of the corridor)
+            max_ratio (float): Maximum ratio of the area of a box to the
+                area of the part of the corridor inside it
+
+        Returns:
+            boxes (list): (south, west, north, east) lists of the boxes
+
+        Example:
+
+            ::
+
+                >>> planner = RequestPlanner()
+                >>> len(planner.split_corridor([(47.6, -122.3), (47.6, -120)],
+                ...                            2000))
+                1
+                >>> len(planner.split_corridor([(45.5, -122.7), (47.6, -122.3),
+                ...                             (49.3, -123.1)], 2000))
+                15
+        """
+        points = densify([(float(lat), float(lon)) for lat, lon in points],
+                         width)
+        run, length = points[:1], 0.0
+        boxes = []
+        for previous, point in zip(points, points[1:]):
+            step = distance(previous, point)
+            box = corridor_box(run + [point], width / 2.0)
+            if len(run) > 1 and (
+                    len(self.split_area(box)) > 1 or box_area(box) >
+                    max_ratio * (length + step + width) * width):
+                boxes.append(corridor_box(run, width / 2.0))
+                run, length = [previous, point], step
+            else:
+                run.append(point)
+                length += step
+        boxes.append(corridor_box(run, width / 2.0))
+        return boxes
+
+
+def densify(points, spacing):
+    """Returns the points of a route with points added along the segments
+    longer than the spacing (in metres)"""
+    dense = points[:1]
+    for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+        count = max(int(math.ceil(distance((lat1, lon1), (lat2, lon2)) /
+                                  spacing)), 1)
+        dense.extend((lat1 + (lat2 - lat1) * index / count,
+                      lon1 + (lon2 - lon1) * index / count)
+                     for index in range(1, count + 1))
+    return dense
+
+
+def corridor_box(points, margin):
+    """Returns the (south, west, north, east) box containing the points with
+    a margin in metres"""
+    latitudes = [lat for lat, _ in points]
+    longitudes = [lon for _, lon in points]
+    delta = math.degrees(margin / EARTH_RADIUS)
+    south = max(min(latitudes) - delta, -90.0)
+    north = min(max(latitudes) + delta, 90.0)
+    parallel = math.cos(math.radians(max(abs(south), abs(north))))
+    delta_longitude = 180.0 if parallel <= 0 else min(delta / parallel, 180.0)
+    return [south, max(min(longitudes) - delta_longitude, -180.0),
+            north, min(max(longitudes) + delta_longitude, 180.0)]
+
+
+def box_area(box):
+    """Returns the approximate area in square metres of a (south, west,
+    north, east) box"""
+    south, west, north, east = box
+    scale = math.radians(1) * EARTH_RADIUS
+    return (north - south) * scale * (east - west) * scale * \
+        math.cos(math.radians((south + north) / 2.0))
+
+
+def split_line(start, end, parts):
+    """Returns the edges of the fewest equal parts (at least ``parts``)
+    between start and end"""
+    count = max(int(math.ceil(parts)), 1)
+    return [start + (end - start) * index / count
+            for index in range(count)] + [end]
+
+
+def points_length(point, previous, compress, fmt):
+    """Returns the number of characters the point adds to the points of a
+    URL, ``previous`` being the point before it in the same URL (or None)"""
+    if compress:
+        return len(compress_points(point, previous))
+    length = len(fmt(point[0])) + len(fmt(point[1])) + 1
+    return length if previous is None else length + 1
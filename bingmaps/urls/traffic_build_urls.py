@@ -1,4 +1,5 @@
 from marshmallow import Schema, fields, post_dump, validate, pre_dump
+from .coordinates import format_coordinate
 
 
 class TrafficIncidentsUrl(object):
@@ -199,7 +200,9 @@ class TrafficIncidentsSchema(MainParams, Schema):
     :ivar o[Optional]: A string specifying the output as JSON or xml.
     :ivar key[Required]: Bing maps key - REQUIRED field
 
-    This schema helps in serializing the data.
+    This schema helps in serializing the data. The coordinates of the mapArea
+    are rounded to a number of decimal places when the schema is created with
+    a ``precision`` in its context (``context={'precision': 5}``).
 
     Post-Dump:
         After dumping the data, build_query_string builds up the
@@ -269,7 +272,9 @@ class TrafficIncidentsSchema(MainParams, Schema):
         for key, value in data.items():
             if key not in ['version', 'restApi', 'resourcePath']:
                 if key == 'mapArea':
-                    query_part_one.append(','.join(str(val) for val in value))
+                    precision = self.context.get('precision')
+                    query_part_one.append(','.join(
+                        format_coordinate(val, precision) for val in value))
                     keys_to_be_removed.append(key)
                 elif key == 'includeLocationCodes':
                     query_part_one.append(value)
@@ -42,6 +42,8 @@ changelog = read('CHANGELOG.rst')
 install_requires = read(requirements).split()
 entry_points = {
     'console_scripts': [
+        'bingmaps-geocode-cache = bingmaps.cache.sqlite:main',
+        'bingmaps-cache-server = bingmaps.cache.shared:main'
     ]
 }
 
@@ -1 +1 @@
-from .fixtures import create_tmp_dir
+from .fixtures import create_tmp_dir, network, snapshots
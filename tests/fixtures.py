@@ -1,4 +1,6 @@
+import json
 import pytest
+import requests
 
 parametrize = pytest.mark.parametrize
 https_protocol = 'https'
@@ -11,3 +13,85 @@ BING_MAPS_KEY = 'Av6_H8GIYQyP-DLQwLOKDknW64Qfm' \
 def create_tmp_dir(tmpdir):
     tmp_dir = tmpdir.mkdir('test_folder')
     return str(tmp_dir)
+
+
+class FakeResponse(object):
+    """Response returned instead of the response from the bing maps REST
+    services in the tests which shouldn't hit the network"""
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code, response=self)
+
+
+class FakeTransport(object):
+    """Stands for ``requests.get`` in the tests which shouldn't hit the
+    network, recording the requested urls and headers
+
+    :ivar respond: body of every response, or function of the requested url
+        returning the response (or the exception to raise)
+    :ivar urls: requested urls, in order
+    :ivar headers: headers sent with each request, in order
+    """
+    def __init__(self, respond=''):
+        self.respond = respond
+        self.urls = []
+        self.headers = []
+
+    def __call__(self, url, headers=None):
+        self.urls.append(url)
+        self.headers.append(headers)
+        if not callable(self.respond):
+            return FakeResponse(self.respond)
+        response = self.respond(url)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def network(monkeypatch):
+    """Fake transport replacing ``requests.get`` for the test"""
+    fake = FakeTransport()
+    monkeypatch.setattr(requests, 'get', fake)
+    return fake
+
+
+def incident(id, modified=1, **fields):
+    """Traffic incident of the json responses, last modified at
+    ``modified``"""
+    return dict(fields, incidentId=id,
+                lastModified='/Date({0})/'.format(modified))
+
+
+def xml_incident(id, modified=1):
+    """Traffic incident of the xml responses, last modified at
+    ``modified``"""
+    return '<TrafficIncident><IncidentId>{0}</IncidentId>' \
+           '<LastModifiedUTC>{1}</LastModifiedUTC></TrafficIncident>'.format(
+               id, modified)
+
+
+@pytest.fixture
+def snapshots(network):
+    """Snapshots of incidents returned by the successive polls, each one a
+    list of ``incident`` arguments or the exception to raise"""
+    polls = []
+
+    def respond(url):
+        snapshot = polls.pop(0)
+        if isinstance(snapshot, Exception):
+            return snapshot
+        if 'o=xml' in url:
+            return FakeResponse(
+                '<Response><ResourceSets><ResourceSet><Resources>{0}'
+                '</Resources></ResourceSet></ResourceSets></Response>'.format(
+                    ''.join(xml_incident(*values) for values in snapshot)))
+        return FakeResponse(json.dumps({'resourceSets': [{'resources': [
+            incident(*values) for values in snapshot]}]}))
+    network.respond = respond
+    return polls
@@ -0,0 +1,95 @@
+from .fixtures import BING_MAPS_KEY, parametrize
+from bingmaps.apiservices import LocationByAddress
+from bingmaps.cache import (
+    GeocodeCache,
+    ResponseCache,
+    address_key,
+    dedupe_addresses,
+    normalize_text
+)
+import json
+import pytest
+
+RESPONSE = json.dumps({'resourceSets': [{'resources': [
+    {'name': '123 Main St, Seattle, WA',
+     'point': {'coordinates': [47.60357, -122.32945]},
+     'address': {'locality': 'Seattle'}}]}]})
+
+
+@pytest.fixture
+def urls(network):
+    network.respond = RESPONSE
+    return network.urls
+
+
+@parametrize('value,expected', [
+    ('123 Main St.', '123 main st'),
+    ('123  MAIN\tStreet', '123 main st'),
+    ('123 Main Street, Apartment #4', '123 main st apt #4'),
+    ('1 N.W. Market Avenue', '1 n w market ave'),
+    ('2nd Ave - North', '2nd ave n'),
+    ('Rue-de-la-Paix', 'rue-de-la-paix'),
+    ('Zürich', 'zurich'),
+    ('Ｍａｉｎ　Ｓｔ', 'main st'),
+    ('STRASSE', 'strasse'),
+    (98101, '98101'),
+])
+def test_normalize_text(value, expected):
+    assert normalize_text(value) == expected
+
+
+@parametrize('first,second', [
+    ({'addressLine': '123 Main St.', 'locality': 'Seattle'},
+     {'addressLine': '123 main street', 'locality': ' SEATTLE'}),
+    ({'addressLine': '1 Main St', 'key': 'abs'},
+     {'addressLine': '1 Main St', 'key': 'other'}),
+    ({'addressLine': '1 Main St', 'postalCode': ''},
+     {'addressLine': '1 Main St'}),
+])
+def test_address_key_equal(first, second):
+    assert address_key(first) == address_key(second)
+
+
+@parametrize('first,second', [
+    ({'addressLine': '1 Main St'}, {'addressLine': '2 Main St'}),
+    ({'addressLine': '1 Main St'}, {'locality': '1 Main St'}),
+    ({'addressLine': '1 Main St'}, {'addressLine': '1 Main St', 'o': 'xml'}),
+    ({'addressLine': '1 Main St', 'maxResults': 1},
+     {'addressLine': '1 Main St', 'maxResults': 5}),
+])
+def test_address_key_different(first, second):
+    assert not address_key(first) == address_key(second)
+
+
+def test_dedupe_addresses():
+    batch = [{'addressLine': '123 Main St.'},
+             {'addressLine': '1 Pike Place'},
+             {'addressLine': '123 MAIN STREET'},
+             {'addressLine': '1 pike pl'}]
+    unique, positions = dedupe_addresses(batch)
+    assert unique == batch[:2]
+    assert positions == [0, 1, 0, 1]
+    assert [unique[position] for position in positions] == \
+        [batch[0], batch[1], batch[0], batch[1]]
+
+
+def test_location_by_address_response_cache(urls):
+    cache = ResponseCache()
+    LocationByAddress({'addressLine': '123 Main St.', 'locality': 'Seattle',
+                       'key': BING_MAPS_KEY}, cache=cache)
+    second = LocationByAddress({'addressLine': '123 main street',
+                                'locality': 'seattle',
+                                'key': BING_MAPS_KEY}, cache=cache)
+    assert len(urls) == 1
+    assert second.get_address == [{'locality': 'Seattle'}]
+    assert cache.stats.hits == 1
+
+
+def test_location_by_address_geocode_cache(urls):
+    cache = GeocodeCache(':memory:')
+    LocationByAddress({'addressLine': 'Zürich Straße 1',
+                       'key': BING_MAPS_KEY}, geocode_cache=cache)
+    second = LocationByAddress({'addressLine': 'zurich strasse 1',
+                                'key': BING_MAPS_KEY}, geocode_cache=cache)
+    assert len(urls) == 1
+    assert second.get_coordinates[0].latitude == 47.60357
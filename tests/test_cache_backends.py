@@ -0,0 +1,226 @@
+from .fixtures import BING_MAPS_KEY, parametrize
+from bingmaps.apiservices import (
+    ElevationsApi,
+    LocationByAddress,
+    TrafficIncidentsApi
+)
+from bingmaps.cache import (
+    CacheBackend,
+    CachedResponse,
+    GeocodeCache,
+    ResponseCache,
+    SocketCache,
+    SocketCacheServer,
+    SQLiteResponseCache,
+    export_snapshot,
+    import_snapshot
+)
+from bingmaps.cache.shared import main
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from multiprocessing.connection import AuthenticationError
+import json
+import os
+import pytest
+import socket
+import time
+
+RESPONSE = json.dumps({'resourceSets': [{'resources': [
+    {'elevations': [10], 'point': {'coordinates': [47.6, -122.1]}}]}]})
+
+
+@pytest.fixture
+def urls(network):
+    network.respond = RESPONSE
+    return network.urls
+
+
+@pytest.fixture
+def socket_path(create_tmp_dir):
+    return os.path.join(create_tmp_dir, 'cache.sock')
+
+
+@pytest.fixture
+def server(socket_path):
+    server = SocketCacheServer(socket_path).start()
+    yield server
+    server.close()
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'socket'])
+def backend(request, create_tmp_dir, socket_path):
+    if request.param == 'memory':
+        yield ResponseCache()
+    elif request.param == 'sqlite':
+        yield SQLiteResponseCache(os.path.join(create_tmp_dir, 'c.sqlite'))
+    else:
+        server = SocketCacheServer(socket_path).start()
+        yield SocketCache(socket_path)
+        server.close()
+
+
+def set_in_process(args):
+    kind, address, key = args
+    if kind == 'sqlite':
+        cache = SQLiteResponseCache(address)
+    else:
+        cache = SocketCache(address)
+    cache.set(key, CachedResponse(key, 200, {}))
+    return cache.get(key).text
+
+
+def test_backend_interface(backend):
+    assert isinstance(backend, CacheBackend)
+    response = CachedResponse('{"a": 1}', 200, {'ETag': 'x'})
+    backend.set('a', response)
+    backend.set('b', response)
+    assert backend.get('a') == response
+    assert backend.get('missing') is None
+    backend.delete('a')
+    assert backend.get('a') is None
+    assert [key for key, value in backend.items()] == ['b']
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_backend_snapshot(backend, create_tmp_dir):
+    backend.set('a', CachedResponse('x', 200, {}))
+    path = os.path.join(create_tmp_dir, 'snapshot.jsonl.gz')
+    assert export_snapshot(backend, path) == 1
+    backend.clear()
+    assert import_snapshot(backend, path) == 1
+    assert backend.get('a').text == 'x'
+
+
+@parametrize('cls,data', [
+    (ElevationsApi, {'method': 'List', 'points': [15.5467, 34.5676],
+                     'key': BING_MAPS_KEY}),
+    (LocationByAddress, {'adminDistrict': 'WA', 'locality': 'Seattle',
+                         'key': BING_MAPS_KEY}),
+    (TrafficIncidentsApi, {'mapArea': [37, -99, 41, -94],
+                           'key': BING_MAPS_KEY}),
+])
+def test_services_use_backend(urls, backend, cls, data):
+    first = cls(data, cache=backend)
+    second = cls(data, cache=backend)
+    assert len(urls) == 1
+    assert second.response == first.response
+
+
+def test_socket_cache_shared_by_processes(server, socket_path):
+    keys = [str(index) for index in range(8)]
+    with Pool(4) as pool:
+        results = pool.map(set_in_process,
+                           [('socket', socket_path, key) for key in keys])
+    assert results == keys
+    assert len(server.cache) == 8
+
+
+def test_sqlite_cache_shared_by_processes(create_tmp_dir):
+    path = os.path.join(create_tmp_dir, 'c.sqlite')
+    SQLiteResponseCache(path)
+    keys = [str(index) for index in range(8)]
+    with Pool(4) as pool:
+        pool.map(set_in_process, [('sqlite', path, key) for key in keys])
+    assert len(SQLiteResponseCache(path)) == 8
+
+
+def test_sqlite_cache_keeps_geocodes(create_tmp_dir):
+    path = os.path.join(create_tmp_dir, 'c.sqlite')
+    geocodes = GeocodeCache(path)
+    geocodes.set('seattle', [{'name': 'Seattle, WA'}])
+    cache = SQLiteResponseCache(path)
+    cache.set('a', CachedResponse('x', 200, {}))
+    cache.clear()
+    assert len(cache) == 0
+    assert geocodes.get('seattle') == [{'name': 'Seattle, WA'}]
+
+
+def test_sqlite_cache_evicts_least_recently_used(create_tmp_dir):
+    cache = SQLiteResponseCache(os.path.join(create_tmp_dir, 'c.sqlite'),
+                                max_entries=2)
+    cache.set('a', CachedResponse('a', 200, {}))
+    cache.set('b', CachedResponse('b', 200, {}))
+    assert cache.get('a').text == 'a'
+    cache.set('c', CachedResponse('c', 200, {}))
+    assert cache.get('b') is None
+    assert [key for key, _ in cache.items()] == ['a', 'c']
+    assert len(cache) == 2
+
+
+def test_socket_cache_threads(server, socket_path):
+    cache = SocketCache(socket_path)
+
+    def roundtrip(index):
+        cache.set(str(index), CachedResponse(str(index), 200, {}))
+        return cache.get(str(index)).text
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(roundtrip, range(50)))
+    assert results == [str(index) for index in range(50)]
+
+
+def test_socket_cache_without_server(urls, socket_path):
+    cache = SocketCache(socket_path)
+    assert cache.get('a') is None
+    cache.set('a', CachedResponse('x', 200, {}))
+    assert len(cache) == 0
+    LocationByAddress({'locality': 'Seattle', 'key': BING_MAPS_KEY},
+                      cache=cache)
+    assert len(urls) == 1
+
+
+def test_socket_cache_authkey(socket_path):
+    server = SocketCacheServer(socket_path, authkey=b'secret').start()
+    try:
+        SocketCache(socket_path, authkey=b'secret').set(
+            'a', CachedResponse('x', 200, {}))
+        assert SocketCache(socket_path, authkey=b'secret').get('a').text == 'x'
+        with pytest.raises(AuthenticationError):
+            SocketCache(socket_path, authkey=b'wrong').get('a')
+    finally:
+        server.close()
+
+
+def test_socket_cache_good_client_after_bad_clients(socket_path):
+    server = SocketCacheServer(socket_path, authkey=b'secret').start()
+    try:
+        with pytest.raises(AuthenticationError):
+            SocketCache(socket_path, authkey=b'wrong').get('a')
+        client = socket.socket(socket.AF_UNIX)
+        client.connect(socket_path)
+        client.close()
+        cache = SocketCache(socket_path, authkey=b'secret', timeout=2)
+        cache.set('a', CachedResponse('x', 200, {}))
+        assert cache.get('a').text == 'x'
+    finally:
+        server.close()
+
+
+def test_socket_cache_timeout(socket_path):
+    silent = socket.socket(socket.AF_UNIX)
+    silent.bind(socket_path)
+    silent.listen(1)
+    try:
+        cache = SocketCache(socket_path, authkey=b'secret', timeout=0.2)
+        started = time.time()
+        assert cache.get('a') is None
+        assert time.time() - started < 2
+    finally:
+        silent.close()
+
+
+def test_tcp_server_requires_authkey():
+    with pytest.raises(ValueError):
+        SocketCacheServer(('127.0.0.1', 0))
+
+
+def test_server_command_requires_authkey(socket_path, monkeypatch):
+    monkeypatch.delenv('BINGMAPS_CACHE_AUTHKEY', raising=False)
+    with pytest.raises(SystemExit):
+        main([socket_path])
+    assert not os.path.exists(socket_path)
+
+
+def test_socket_cache_unknown_command(server, socket_path):
+    with pytest.raises(ValueError):
+        SocketCache(socket_path).request('__class__')
@@ -0,0 +1,131 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse
+from bingmaps.apiservices import (
+    ElevationsApi,
+    LocationByAddress,
+    warm_cache
+)
+from bingmaps.cache import (
+    CachedResponse,
+    GeocodeCache,
+    ResponseCache,
+    export_snapshot,
+    import_snapshot,
+    read_snapshot
+)
+from bingmaps.cache.sqlite import main
+import gzip
+import json
+import os
+import pytest
+
+RESPONSE = json.dumps({'resourceSets': [{'resources': [
+    {'name': 'Seattle, WA', 'elevations': [10],
+     'point': {'coordinates': [47.6, -122.3]}}]}]})
+
+
+@pytest.fixture
+def urls(network):
+    def respond(url):
+        if 'fail' in url:
+            return FakeResponse('', 400)
+        return FakeResponse(RESPONSE)
+    network.respond = respond
+    return network.urls
+
+
+@pytest.fixture
+def snapshot(create_tmp_dir):
+    return os.path.join(create_tmp_dir, 'snapshot.jsonl.gz')
+
+
+def test_response_cache_round_trip(snapshot):
+    cache = ResponseCache()
+    for index in range(5):
+        cache.set(str(index), CachedResponse(str(index), 200,
+                                             {'ETag': str(index)}))
+    cache.get('0')
+    assert export_snapshot(cache, snapshot, limit=3) == 3
+    restored = ResponseCache()
+    assert import_snapshot(restored, snapshot) == 3
+    assert [key for key, response in restored.items()] == ['3', '4', '0']
+    assert restored.get('4') == CachedResponse('4', 200, {'ETag': '4'})
+
+
+def test_geocode_cache_round_trip(snapshot, create_tmp_dir):
+    cache = GeocodeCache(os.path.join(create_tmp_dir, 'a.sqlite'))
+    cache.set_many({str(index): [{'index': index}] for index in range(1200)})
+    cache.set('latest', [])
+    assert export_snapshot(cache, snapshot, limit=1000) == 1000
+    restored = GeocodeCache(os.path.join(create_tmp_dir, 'b.sqlite'))
+    assert import_snapshot(restored, snapshot, batch_size=64) == 1000
+    assert len(restored) == 1000
+    assert restored.get('latest') == []
+    assert restored.get('1199') == [{'index': 1199}]
+    assert restored.get('0') is None
+
+
+def test_snapshot_is_compressed_json_lines(snapshot):
+    cache = ResponseCache()
+    cache.set('a', CachedResponse('x' * 10000, 200, {}))
+    export_snapshot(cache, snapshot)
+    assert os.path.getsize(snapshot) < 1000
+    with gzip.open(snapshot, 'rt') as fp:
+        lines = fp.read().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])['key'] == 'a'
+
+
+def test_read_snapshot_streams(snapshot):
+    cache = ResponseCache()
+    for index in range(3):
+        cache.set(str(index), CachedResponse('', 200, {}))
+    export_snapshot(cache, snapshot)
+    entries = read_snapshot(snapshot)
+    assert next(entries)[0] == '0'
+
+
+def test_not_a_snapshot(snapshot):
+    with gzip.open(snapshot, 'wt') as fp:
+        fp.write('{}\n')
+    with pytest.raises(ValueError):
+        list(read_snapshot(snapshot))
+
+
+def test_snapshot_command(snapshot, create_tmp_dir, capsys):
+    path = os.path.join(create_tmp_dir, 'geocodes.sqlite')
+    GeocodeCache(path).set_many({'a': [1], 'b': [2]})
+    main(['export', path, snapshot, '--limit', '1'])
+    other = os.path.join(create_tmp_dir, 'other.sqlite')
+    main(['import', other, snapshot])
+    output = capsys.readouterr()[0]
+    assert 'Exported 1 entries' in output
+    assert 'Imported 1 entries' in output
+    assert GeocodeCache(other).get('b') == [2]
+
+
+def test_warm_cache(urls):
+    cache = ResponseCache()
+    queries = [{'locality': 'Seattle', 'key': BING_MAPS_KEY},
+               {'locality': 'Tacoma', 'key': BING_MAPS_KEY},
+               {'locality': 'fail', 'key': BING_MAPS_KEY},
+               {'adminDistrict': 'WA'}]
+    result = warm_cache(LocationByAddress, queries, max_workers=4,
+                        cache=cache)
+    assert result.warmed == 2
+    assert [data for data, exc in result.failed] == queries[2:]
+    assert len(urls) == 3
+    LocationByAddress(dict(queries[0]), cache=cache)
+    assert len(urls) == 3
+
+
+def test_warm_then_export(urls, snapshot):
+    cache = ResponseCache()
+    queries = [{'method': 'List', 'points': [47.6, -122.3 + index],
+                'key': BING_MAPS_KEY} for index in range(4)]
+    warm_cache(ElevationsApi, queries, cache=cache)
+    export_snapshot(cache, snapshot)
+    restored = ResponseCache()
+    import_snapshot(restored, snapshot)
+    for data in queries:
+        ElevationsApi(data, cache=restored)
+    assert len(urls) == 4
@@ -0,0 +1,158 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse
+from bingmaps.apiservices import ElevationsApi, TrafficIncidentsApi, transport
+from bingmaps.cache import CachedResponse, ConditionalCache, ResponseCache
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import pytest
+import threading
+
+BODY = json.dumps({'resourceSets': [{'resources': [{'incidentId': 1}]}]})
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves a body with validators and answers 304 to the conditional
+    requests matching the current version"""
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = '"v{0}"'.format(server.version)
+        if server.etag and self.headers.get('If-None-Match') == etag or \
+                not server.etag and self.headers.get(
+                    'If-Modified-Since') == server.modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = server.body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if server.etag:
+            self.send_header('ETag', etag)
+        else:
+            self.send_header('Last-Modified', server.modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    server.requests = []
+    server.version = 1
+    server.etag = True
+    server.modified = 'Mon, 19 Oct 2026 10:00:00 GMT'
+    server.body = BODY
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stub_url(server, path='/REST/v1/Traffic/Incidents/1,2,3,4'):
+    return 'http://127.0.0.1:{0}{1}?key={2}'.format(
+        server.server_address[1], path, BING_MAPS_KEY)
+
+
+def test_not_modified_reuses_response(stub):
+    cache = ConditionalCache()
+    first = transport.get(stub_url(stub), conditional_cache=cache)
+    second = transport.get(stub_url(stub), conditional_cache=cache)
+    assert 'If-None-Match' not in stub.requests[0]
+    assert stub.requests[1]['If-None-Match'] == '"v1"'
+    assert second.status_code == 200
+    assert second.text == first.text == BODY
+    assert cache.stats == (1, 1, len(BODY))
+
+
+def test_last_modified_validator(stub):
+    stub.etag = False
+    cache = ConditionalCache()
+    transport.get(stub_url(stub), conditional_cache=cache)
+    response = transport.get(stub_url(stub), conditional_cache=cache)
+    assert stub.requests[1]['If-Modified-Since'] == stub.modified
+    assert response.text == BODY
+    assert cache.not_modified == 1
+
+
+def test_changed_response_downloaded(stub):
+    cache = ConditionalCache()
+    transport.get(stub_url(stub), conditional_cache=cache)
+    stub.version = 2
+    stub.body = '{"resourceSets": []}'
+    response = transport.get(stub_url(stub), conditional_cache=cache)
+    assert response.text == stub.body
+    assert cache.not_modified == 0
+    transport.get(stub_url(stub), conditional_cache=cache)
+    assert stub.requests[2]['If-None-Match'] == '"v2"'
+    assert cache.not_modified == 1
+
+
+def test_validators_shared_across_keys(stub):
+    cache = ConditionalCache()
+    transport.get(stub_url(stub), conditional_cache=cache)
+    other_key = stub_url(stub).replace(BING_MAPS_KEY, 'other')
+    transport.get(other_key, conditional_cache=cache)
+    assert cache.not_modified == 1
+
+
+def test_responses_without_validators_not_kept():
+    cache = ConditionalCache()
+    cache.set('a', CachedResponse('{}', 200, {}))
+    assert cache.headers('a') == {}
+    assert cache.stats.requests == 0
+
+
+def test_evicted_response_downloaded_again(network):
+    cache = ConditionalCache()
+
+    def respond(url):
+        if network.headers[-1]:
+            cache.store.clear()
+            return FakeResponse('', 304)
+        return FakeResponse(BODY, 200, {'ETag': '"v1"'})
+    network.respond = respond
+    cache.set('localhost/a?', CachedResponse(BODY, 200, {'ETag': '"v1"'}))
+    response = transport.get('http://localhost/a', conditional_cache=cache)
+    assert network.headers == [{'If-None-Match': '"v1"'}, None]
+    assert response.text == BODY
+
+
+def test_traffic_incidents_use_conditional_cache(network):
+    def respond(url):
+        headers = network.headers[-1]
+        if headers and headers.get('If-None-Match') == '"v1"':
+            return FakeResponse('', 304)
+        return FakeResponse(BODY, 200, {'ETag': '"v1"'})
+    network.respond = respond
+    cache = ConditionalCache()
+    data = {'mapArea': [37, -99, 41, -94], 'key': BING_MAPS_KEY}
+    TrafficIncidentsApi(data, conditional_cache=cache)
+    incidents = TrafficIncidentsApi(data, conditional_cache=cache)
+    assert network.headers == [None, {'If-None-Match': '"v1"'}]
+    assert incidents.get_resource() == [{'incidentId': 1}]
+    assert cache.stats.bytes_saved == len(BODY)
+
+
+def test_elevations_use_conditional_cache(network):
+    body = json.dumps({'resourceSets': [{'resources': [
+        {'elevations': [1776], 'zoomLevel': 14}]}]})
+
+    def respond(url):
+        if network.headers[-1]:
+            return FakeResponse('', 304)
+        return FakeResponse(body, 200,
+                            {'Last-Modified': 'Mon, 19 Oct 2026 10:00:00 GMT'})
+    network.respond = respond
+    cache = ConditionalCache(ResponseCache(max_entries=10))
+    data = {'method': 'List', 'points': [15.5467, 34.5676],
+            'key': BING_MAPS_KEY}
+    ElevationsApi(data, conditional_cache=cache)
+    elevations = ElevationsApi(data, conditional_cache=cache)
+    assert network.headers[1] == {
+        'If-Modified-Since': 'Mon, 19 Oct 2026 10:00:00 GMT'}
+    assert elevations.elevations[0].elevations == [1776]
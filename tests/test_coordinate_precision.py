@@ -0,0 +1,95 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import (
+    ElevationsApi,
+    LocationByPoint,
+    TrafficIncidentsApi
+)
+from bingmaps.urls import (
+    BoundingBox,
+    Coordinates,
+    LocationByPointSchema,
+    Offset,
+    Polyline,
+    TrafficIncidentsSchema,
+    format_coordinate
+)
+import json
+import pytest
+
+
+@pytest.fixture
+def urls(network):
+    def respond(url):
+        return FakeResponse(json.dumps(
+            {'resourceSets': [{'resources': [{'elevations': [1]}]}]}))
+    network.respond = respond
+    return network.urls
+
+
+@parametrize('value,precision,expected', [
+    (35.894310000000004, None, '35.894310000000004'),
+    (35.894310000000004, 5, '35.89431'),
+    (35.894316, 5, '35.89432'),
+    (-110.725224, 6, '-110.725224'),
+    (-110.7252249, 6, '-110.725225'),
+    (37, 5, '37.0'),
+    (0.00001, 5, '0.00001'),
+    (-0.00004, 5, '-0.00004'),
+    (0.00001, None, '0.00001'),
+])
+def test_format_coordinate(value, precision, expected):
+    assert format_coordinate(value, precision) == expected
+
+
+@parametrize('schema,data,expected', [
+    (Coordinates,
+     {'method': 'List', 'points': [35.894310000000004, -110.7252249],
+      'key': 'abs'},
+     'List?points=35.89431,-110.72522&heights=sealevel&key=abs'),
+    (Offset,
+     {'method': 'SeaLevel', 'points': [35.894310000000004, -110.7252249],
+      'key': 'abs'},
+     'SeaLevel?points=35.89431,-110.72522&key=abs'),
+    (Polyline,
+     {'method': 'Polyline',
+      'points': [35.894310000000004, -110.7252249, 35.893933, -110.725781],
+      'samples': 10, 'key': 'abs'},
+     'Polyline?points=35.89431,-110.72522,35.89393,-110.72578&'
+     'heights=sealevel&samples=10&key=abs'),
+    (BoundingBox,
+     {'method': 'Bounds', 'bounds': [15.546312, 34.657711, 16.43654, 35.3245],
+      'rows': 4, 'cols': 5, 'key': 'abs'},
+     'Bounds?bounds=15.54631,34.65771,16.43654,35.3245&rows=4&cols=5&'
+     'heights=sealevel&key=abs'),
+    (TrafficIncidentsSchema,
+     {'mapArea': [37.0000001, -105.123456, 45, -94], 'key': 'abs'},
+     '37.0,-105.12346,45.0,-94.0/false?key=abs'),
+    (LocationByPointSchema,
+     {'point': '47.640541234,-122.129341234', 'key': 'abs'},
+     '47.64054,-122.12934?includeNeighborhood=0&include=ciso2&'
+     'maxResults=20&key=abs'),
+])
+def test_schema_precision(schema, data, expected):
+    query = schema(context={'precision': 5}).dump(data).data['query']
+    assert query == expected
+
+
+def test_nearly_identical_points_share_url(urls):
+    for lat in [35.8943101, 35.8943104]:
+        ElevationsApi({'method': 'List', 'points': [lat, -110.72522],
+                       'key': BING_MAPS_KEY}, precision=6)
+    assert urls[0] == urls[1]
+    assert 'points=35.89431,-110.72522&' in urls[0]
+
+
+def test_location_by_point_precision(urls):
+    location = LocationByPoint({'point': '47.6405412,-122.1293412',
+                                'key': BING_MAPS_KEY}, precision=4)
+    assert location.build_url().startswith(
+        'http://dev.virtualearth.net/REST/v1/Locations/47.6405,-122.1293?')
+
+
+def test_traffic_precision(urls):
+    incidents = TrafficIncidentsApi({'mapArea': [37.123456, -99, 41, -94],
+                                     'key': BING_MAPS_KEY}, precision=2)
+    assert '/Incidents/37.12,-99.0,41.0,-94.0/' in incidents.build_url()
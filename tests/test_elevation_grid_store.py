@@ -0,0 +1,124 @@
+from .fixtures import BING_MAPS_KEY
+from .test_elevation_tile_cache import bounds, fake_bounds, height, points
+from bingmaps.apiservices import ElevationsApi
+from bingmaps.cache import ElevationGridStore
+from multiprocessing import Pool
+import os
+import pytest
+
+
+@pytest.fixture
+def urls(network):
+    network.respond = fake_bounds
+    return network.urls
+
+
+@pytest.fixture
+def store(create_tmp_dir):
+    store = ElevationGridStore(create_tmp_dir)
+    yield store
+    store.close()
+
+
+def read_elevations(args):
+    directory, queries = args
+    store = ElevationGridStore(directory)
+    try:
+        return store.interpolate(queries)
+    finally:
+        store.close()
+
+
+def test_store_persistent(create_tmp_dir):
+    store = ElevationGridStore(create_tmp_dir)
+    store.add([0, 0, 1, 1], 2, 2, [0, 10, 20, 30], zoom_level=12)
+    store.close()
+    reopened = ElevationGridStore(create_tmp_dir)
+    grid = reopened.find(0.5, 0.5)
+    assert grid.zoom_level == 12
+    assert grid.interpolate(0.5, 0.5) == 15.0
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_store_memory_mapped(store):
+    store.add([0, 0, 1, 1], 2, 2, [0, 10, 20, 30])
+    grid = store.find(0.5, 0.5)
+    assert isinstance(grid.values, memoryview)
+    assert grid.values.readonly
+    assert store.find(0.2, 0.2) is grid
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'),
+                    reason='lists the open files through /proc')
+def test_store_bounds_open_maps(create_tmp_dir):
+    store = ElevationGridStore(create_tmp_dir, max_open=4)
+    for index in range(20):
+        store.add([index, 0, index + 1, 1], 2, 2, [index] * 4)
+    open_files = len(os.listdir('/proc/self/fd'))
+    assert store.interpolate([(index + 0.5, 0.5) for index in range(20)]) == \
+        [float(index) for index in range(20)]
+    assert len(store._maps) == 4
+    assert len(os.listdir('/proc/self/fd')) <= open_files + 4
+    store.close()
+
+
+def test_store_most_recent_grid(store):
+    store.add([0, 0, 1, 1], 2, 2, [0, 0, 0, 0])
+    store.add([0.5, 0.5, 2, 2], 2, 2, [1, 1, 1, 1])
+    assert store.interpolate([(0.25, 0.25), (0.75, 0.75)]) == [0.0, 1.0]
+    assert store.interpolate([(0.25, 0.25)], 'sealevel') is None
+
+
+def test_store_clear(store, create_tmp_dir):
+    store.add([0, 0, 1, 1], 2, 2, [0, 10, 20, 30])
+    store.find(0.5, 0.5)
+    store.clear()
+    assert len(store) == 0
+    assert store.find(0.5, 0.5) is None
+
+
+def test_store_shared_by_processes(store, create_tmp_dir):
+    store.add([0, 0, 1, 1], 2, 2, [0, 10, 20, 30])
+    queries = [[(0.5, 0.5)], [(0.25, 1)], [(1, 1)], [(2, 2)]]
+    with Pool(2) as pool:
+        results = pool.map(read_elevations,
+                           [(create_tmp_dir, query) for query in queries])
+    assert results == [[15.0], [15.0], [30.0], None]
+
+
+def test_list_polyline_bounds_from_store(urls, store):
+    ElevationsApi(bounds(47, -122, 47.5, -121.5), tile_cache=store)
+    assert len(urls) == 1
+    elevations = ElevationsApi(points(47.1, -121.9, 47.2, -121.8),
+                               tile_cache=store)
+    assert elevations.elevations[0].elevations == \
+        pytest.approx([height(47.1, -121.9), height(47.2, -121.8)],
+                      rel=1e-6)
+    profile = ElevationsApi({'method': 'Polyline',
+                             'points': [47.1, -121.9, 47.3, -121.7],
+                             'samples': 5, 'key': BING_MAPS_KEY},
+                            tile_cache=store)
+    assert profile.elevations[0].elevations[0] == \
+        pytest.approx(height(47.1, -121.9), rel=1e-6)
+    assert profile.elevations[0].elevations[-1] == \
+        pytest.approx(height(47.3, -121.7), rel=1e-6)
+    assert len(profile.elevations[0].elevations) == 5
+    grid = ElevationsApi(bounds(47.1, -121.9, 47.2, -121.8, rows=3, cols=3),
+                         tile_cache=store)
+    assert grid.grid[2][2] == pytest.approx(height(47.2, -121.8), rel=1e-6)
+    assert len(urls) == 1
+    assert len(store) == 1
+
+
+def test_polyline_spacing_fetches_tiles(urls, store):
+    store.fetch = True
+    store.tile_size = 0.25
+    store.samples = 8
+    profile = ElevationsApi({'method': 'Polyline',
+                             'points': [47.1, -121.9, 47.3, -121.9],
+                             'spacing': 1000, 'key': BING_MAPS_KEY},
+                            tile_cache=store)
+    assert len(urls) == 2
+    assert all('/Bounds' in url for url in urls)
+    assert len(profile.elevations[0].elevations) == 24
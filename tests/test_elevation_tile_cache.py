@@ -0,0 +1,143 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import ElevationsApi
+from bingmaps.cache import ElevationGrid, ElevationTileCache
+from urllib.parse import urlparse, parse_qs
+import json
+import pytest
+
+
+def height(latitude, longitude):
+    return latitude * 1000 + longitude * 100
+
+
+def fake_bounds(url):
+    """Returns a plane (see height) as the elevations of the grid, starting
+    from the southwest corner"""
+    query = parse_qs(urlparse(url).query)
+    south, west, north, east = [float(val) for val in
+                                query['bounds'][0].split(',')]
+    rows, cols = int(query['rows'][0]), int(query['cols'][0])
+    elevations = []
+    for row in range(rows):
+        lat = south + (north - south) * row / (rows - 1)
+        for col in range(cols):
+            lon = west + (east - west) * col / (cols - 1)
+            elevations.append(height(lat, lon))
+    resource = {'elevations': elevations, 'zoomLevel': 14}
+    return FakeResponse(json.dumps(
+        {'resourceSets': [{'resources': [resource]}]}))
+
+
+@pytest.fixture
+def urls(network):
+    def respond(url):
+        if '/Bounds' in url:
+            return fake_bounds(url)
+        return FakeResponse(json.dumps({'resourceSets': [{'resources': [
+            {'elevations': [-1], 'zoomLevel': 10}]}]}))
+    network.respond = respond
+    return network.urls
+
+
+def bounds(south, west, north, east, rows=8, cols=8, **data):
+    return dict({'method': 'Bounds', 'bounds': [south, west, north, east],
+                 'rows': rows, 'cols': cols, 'key': BING_MAPS_KEY}, **data)
+
+
+def points(*values, **data):
+    return dict({'method': 'List', 'points': list(values),
+                 'key': BING_MAPS_KEY}, **data)
+
+
+@parametrize('latitude,longitude,expected', [
+    (0, 0, 0),
+    (2, 3, 23),
+    (1, 1.5, 11.5),
+    (0.5, 3, 8),
+    (2, 0, 20),
+    (1.25, 0.75, 13.25),
+])
+def test_grid_interpolate(latitude, longitude, expected):
+    grid = ElevationGrid([0, 0, 2, 3], 3, 4,
+                         [0, 1, 2, 3, 10, 11, 12, 13, 20, 21, 22, 23])
+    assert grid.interpolate(latitude, longitude) == pytest.approx(expected)
+
+
+def test_grid_size_mismatch():
+    with pytest.raises(ValueError):
+        ElevationGrid([0, 0, 1, 1], 2, 2, [1, 2, 3])
+
+
+def test_cache_heights_models():
+    cache = ElevationTileCache()
+    cache.add([0, 0, 1, 1], 2, 2, [1, 1, 1, 1], 'sealevel')
+    assert cache.interpolate([(0.5, 0.5)]) is None
+    assert cache.interpolate([(0.5, 0.5)], 'SeaLevel') == [1.0]
+
+
+def test_cache_grid_across_cells():
+    cache = ElevationTileCache()
+    cache.add([-0.5, -0.5, 0.5, 0.5], 2, 2, [1, 1, 1, 1])
+    assert cache.interpolate([(-0.2, 0.2), (0.2, -0.2)]) == [1.0, 1.0]
+    assert len(cache) == 1
+
+
+def test_cache_missing_tiles():
+    cache = ElevationTileCache(tile_size=0.5)
+    cache.add([0, 0, 0.5, 0.5], 2, 2, [1, 1, 1, 1])
+    assert cache.missing_tiles([(0.1, 0.1), (0.7, 0.2), (0.8, 0.4),
+                                (-0.1, 0.1)]) == [[0.5, 0, 1.0, 0.5],
+                                                  [-0.5, 0, 0, 0.5]]
+
+
+def test_list_answered_from_cached_bounds(urls):
+    cache = ElevationTileCache()
+    ElevationsApi(bounds(47, -122, 47.5, -121.5), tile_cache=cache)
+    assert len(urls) == 1
+    queries = [(47.1, -121.9), (47.123, -121.6789), (47.5, -121.5)]
+    elevations = ElevationsApi(points(*[value for point in queries
+                                        for value in point]),
+                               tile_cache=cache)
+    assert len(urls) == 1
+    assert elevations.status_code == 200
+    assert elevations.elevations[0].elevations == \
+        pytest.approx([height(*point) for point in queries])
+    assert elevations.zoomlevel[0].zoomLevel == 14
+
+
+@parametrize('data', [
+    points(47.1, -121.9, 48.5, -121.9),
+    points(47.1, -121.9, heights='sealevel'),
+    points(47.1, -121.9, o='xml'),
+])
+def test_list_not_covered(urls, data):
+    cache = ElevationTileCache()
+    ElevationsApi(bounds(47, -122, 47.5, -121.5), tile_cache=cache)
+    ElevationsApi(data, tile_cache=cache)
+    assert len(urls) == 2
+    assert '/List' in urls[1]
+
+
+def test_list_fetches_missing_tiles(urls):
+    cache = ElevationTileCache(tile_size=0.25, samples=16, fetch=True)
+    queries = [(47.1, -121.9), (47.11, -121.91), (47.3, -121.9),
+               (47.3, -121.6)]
+    data = points(*[value for point in queries for value in point])
+    elevations = ElevationsApi(data, tile_cache=cache)
+    assert len(urls) == 3
+    assert all('/Bounds' in url and 'rows=16&cols=16' in url for url in urls)
+    assert len(cache) == 3
+    assert elevations.elevations[0].elevations == \
+        pytest.approx([height(*point) for point in queries])
+    ElevationsApi(data, tile_cache=cache)
+    assert len(urls) == 3
+
+
+def test_tiled_bounds_cached(urls):
+    cache = ElevationTileCache()
+    ElevationsApi(bounds(47, -122, 47.5, -121.5, rows=40, cols=40),
+                  tile_cache=cache)
+    assert len(cache) == 1
+    elevations = ElevationsApi(points(47.49, -121.51), tile_cache=cache)
+    assert elevations.elevations[0].elevations == \
+        pytest.approx([height(47.49, -121.51)])
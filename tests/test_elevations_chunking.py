@@ -0,0 +1,63 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import ElevationsApi
+from bingmaps.urls import Coordinates, RequestPlanner, decompress_points
+from urllib.parse import urlparse, parse_qs
+import json
+import pytest
+
+
+def fake_elevations(url):
+    """Returns the latitude of every point as its elevation"""
+    parsed = urlparse(url)
+    points = parse_qs(parsed.query)['points'][0]
+    if ',' in points:
+        points = [float(val) for val in points.split(',')]
+    else:
+        points = decompress_points(points)
+    key = 'offsets' if parsed.path.endswith('SeaLevel') else 'elevations'
+    resource = {key: [int(lat) for lat in points[::2]], 'zoomLevel': 14}
+    return FakeResponse(json.dumps(
+        {'resourceSets': [{'resources': [resource]}]}))
+
+
+@pytest.fixture
+def urls(network):
+    network.respond = fake_elevations
+    return network.urls
+
+
+@parametrize('method,num_points,expected', [
+    ('List', 1, 1),
+    ('List', 1024, 1),
+    ('List', 1025, 2),
+    ('SeaLevel', 5000, 5),
+])
+def test_elevations_chunk_count(urls, method, num_points, expected):
+    data = {'method': method,
+            'points': [0.0, 1.0] * num_points,
+            'key': BING_MAPS_KEY}
+    ElevationsApi(data, planner=RequestPlanner(compress=True))
+    assert len(urls) == expected
+
+
+@parametrize('method,field', [
+    ('List', 'elevations'),
+    ('SeaLevel', 'offsets'),
+])
+def test_elevations_chunks_stitched_in_order(urls, method, field):
+    points = []
+    for lat in range(3000):
+        points.extend([lat, 10.0])
+    data = {'method': method, 'points': points, 'key': BING_MAPS_KEY}
+    elevations = ElevationsApi(data, planner=RequestPlanner(compress=True))
+    assert elevations.elevations[0][0] == list(range(3000))
+    response = json.loads(elevations.response)
+    assert response['resourceSets'][0]['resources'][0][field] == \
+        list(range(3000))
+
+
+def test_elevations_schema_point_limit():
+    data = {'method': 'List',
+            'points': [0.0, 1.0] * 1025,
+            'key': BING_MAPS_KEY}
+    assert 'points' in Coordinates().validate(data)
@@ -0,0 +1,71 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import ElevationsApi
+from bingmaps.apiservices.elevations import cumulative_distances
+from urllib.parse import urlparse, parse_qs
+import json
+import pytest
+
+
+def fake_polyline(url):
+    """Returns the longitude of every sample as its elevation, the samples
+    being equally spaced along a polyline on the equator"""
+    query = parse_qs(urlparse(url).query)
+    points = [float(val) for val in query['points'][0].split(',')]
+    samples = int(query['samples'][0])
+    west, east = points[1], points[-1]
+    elevations = [west + (east - west) * index / (samples - 1)
+                  for index in range(samples)]
+    resource = {'elevations': elevations, 'zoomLevel': 14}
+    return FakeResponse(json.dumps(
+        {'resourceSets': [{'resources': [resource]}]}))
+
+
+@pytest.fixture
+def urls(network):
+    network.respond = fake_polyline
+    return network.urls
+
+
+@parametrize('points,spacing,segments', [
+    ([0, 0, 0, 0.01], 100, 1),
+    ([0, 0, 0, 1], 100, 2),
+    ([0, 0, 0, 1, 0, 2, 0, 3], 50, 7),
+])
+def test_polyline_spacing_segments(urls, points, spacing, segments):
+    data = {'method': 'Polyline',
+            'points': points,
+            'spacing': spacing,
+            'key': BING_MAPS_KEY}
+    ElevationsApi(data)
+    assert len(urls) == segments
+    for url in urls:
+        assert int(parse_qs(urlparse(url).query)['samples'][0]) <= 1024
+
+
+@parametrize('points,spacing', [
+    ([0, 0, 0, 0.01], 100),
+    ([0, 0, 0, 1], 100),
+    ([0, 0, 0, 1, 0, 2, 0, 3], 50),
+])
+def test_polyline_spacing_profile_evenly_spaced(urls, points, spacing):
+    data = {'method': 'Polyline',
+            'points': points,
+            'spacing': spacing,
+            'key': BING_MAPS_KEY}
+    profile = ElevationsApi(data).elevations[0][0]
+    length = cumulative_distances(list(zip(points[::2], points[1::2])))[-1]
+    assert len(profile) == -(-length // spacing) + 1
+    assert profile[0] == points[1]
+    assert profile[-1] == pytest.approx(points[-1])
+    step = (points[-1] - points[1]) / (len(profile) - 1)
+    for previous, value in zip(profile, profile[1:]):
+        assert value - previous == pytest.approx(step)
+
+
+def test_polyline_spacing_should_be_positive():
+    data = {'method': 'Polyline',
+            'points': [0, 0, 0, 1],
+            'spacing': 0,
+            'key': BING_MAPS_KEY}
+    with pytest.raises(ValueError):
+        ElevationsApi(data)
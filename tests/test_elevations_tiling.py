@@ -0,0 +1,86 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import ElevationsApi
+from bingmaps.urls import BoundingBox
+from urllib.parse import urlparse, parse_qs
+import json
+import pytest
+
+
+def fake_bounds(url):
+    """Returns ``latitude * 10000 + longitude`` as the elevation of every
+    vertex of the grid, starting from the southwest corner"""
+    query = parse_qs(urlparse(url).query)
+    south, west, north, east = [float(val) for val in
+                                query['bounds'][0].split(',')]
+    rows, cols = int(query['rows'][0]), int(query['cols'][0])
+    elevations = []
+    for row in range(rows):
+        lat = south + (north - south) * row / (rows - 1)
+        for col in range(cols):
+            lon = west + (east - west) * col / (cols - 1)
+            elevations.append(int(round(lat)) * 10000 + int(round(lon)))
+    resource = {'elevations': elevations, 'zoomLevel': 14}
+    return FakeResponse(json.dumps(
+        {'resourceSets': [{'resources': [resource]}]}))
+
+
+@pytest.fixture
+def urls(network):
+    network.respond = fake_bounds
+    return network.urls
+
+
+@parametrize('rows,cols,expected', [
+    (4, 5, 1),
+    (32, 32, 1),
+    (33, 32, 2),
+    (100, 3, 1),
+    (2, 1000, 2),
+    (200, 150, 35),
+])
+def test_bounds_tile_count(urls, rows, cols, expected):
+    data = {'method': 'Bounds',
+            'bounds': [0, 0, rows - 1, cols - 1],
+            'rows': rows,
+            'cols': cols,
+            'key': BING_MAPS_KEY}
+    ElevationsApi(data)
+    assert len(urls) == expected
+    for url in urls:
+        query = parse_qs(urlparse(url).query)
+        assert int(query['rows'][0]) * int(query['cols'][0]) <= 1024
+
+
+@parametrize('rows,cols', [
+    (4, 5),
+    (33, 32),
+    (200, 150),
+    (7, 3000),
+])
+def test_bounds_tiles_reassembled_without_seams(urls, rows, cols):
+    data = {'method': 'Bounds',
+            'bounds': [0, 0, rows - 1, cols - 1],
+            'rows': rows,
+            'cols': cols,
+            'key': BING_MAPS_KEY}
+    elevations = ElevationsApi(data)
+    grid = elevations.grid
+    assert len(grid) == rows
+    assert grid == [[row * 10000 + col for col in range(cols)]
+                    for row in range(rows)]
+    assert elevations.elevations[0][0] == \
+        [value for row in grid for value in row]
+
+
+@parametrize('rows,cols,errors', [
+    (33, 32, ['cols', 'rows']),
+    (1, 5, ['rows']),
+    (32, 32, []),
+])
+def test_bounds_schema_grid_size(rows, cols, errors):
+    data = {'method': 'Bounds',
+            'bounds': [0, 0, 1, 1],
+            'rows': rows,
+            'cols': cols,
+            'key': BING_MAPS_KEY}
+    assert sorted(BoundingBox().validate(data)) == errors
@@ -0,0 +1,146 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import (
+    LocationByAddress,
+    LocationByPoint,
+    LocationByQuery
+)
+from bingmaps.cache import GeocodeCache
+from bingmaps.cache.sqlite import main
+from concurrent.futures import ThreadPoolExecutor
+import bingmaps.cache.sqlite
+import json
+import os
+import pytest
+
+JSON_RESPONSE = json.dumps({'resourceSets': [{'resources': [
+    {'name': 'Seattle, WA',
+     'point': {'coordinates': [47.60357, -122.32945]},
+     'bbox': [47.4, -122.5, 47.8, -122.2],
+     'address': {'locality': 'Seattle'}}]}]})
+
+XML_RESPONSE = '<Response><ResourceSets><ResourceSet><Resources><Location>' \
+               '<Name>Seattle, WA</Name><Point><Latitude>47.60357</Latitude>' \
+               '<Longitude>-122.32945</Longitude></Point>' \
+               '<Address><Locality>Seattle</Locality></Address>' \
+               '</Location></Resources></ResourceSet></ResourceSets>' \
+               '</Response>'
+
+
+@pytest.fixture
+def urls(network):
+    def respond(url):
+        if 'o=xml' in url:
+            return FakeResponse(XML_RESPONSE)
+        return FakeResponse(JSON_RESPONSE)
+    network.respond = respond
+    return network.urls
+
+
+@pytest.fixture
+def path(create_tmp_dir):
+    return os.path.join(create_tmp_dir, 'geocodes.sqlite')
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(bingmaps.cache.sqlite.time, 'time', lambda: clock[0])
+    return clock
+
+
+def test_geocode_cache_persistent(path):
+    cache = GeocodeCache(path)
+    cache.set('a', [{'name': 'A'}])
+    cache.close()
+    assert GeocodeCache(path).get('a') == [{'name': 'A'}]
+
+
+def test_geocode_cache_wal_mode(path):
+    cache = GeocodeCache(path)
+    mode = cache.connection.execute('PRAGMA journal_mode').fetchone()[0]
+    assert mode == 'wal'
+
+
+def test_geocode_cache_ttl(path, now):
+    cache = GeocodeCache(path, ttl=60)
+    cache.set('a', [1])
+    cache.set('b', [2], ttl=600)
+    cache.set('c', [3], ttl=None)
+    now[0] += 120
+    assert cache.get('a') is None
+    assert cache.get('b') == [2]
+    assert cache.get_many(['a', 'b', 'c']) == {'b': [2]}
+
+
+def test_geocode_cache_no_ttl(path, now):
+    cache = GeocodeCache(path)
+    cache.set('a', [1])
+    now[0] += 10 ** 9
+    assert cache.get('a') == [1]
+
+
+def test_geocode_cache_bulk(path):
+    cache = GeocodeCache(path)
+    items = {'key{0}'.format(index): [{'index': index}]
+             for index in range(1200)}
+    cache.set_many(items)
+    assert len(cache) == 1200
+    keys = list(items) + ['missing']
+    assert cache.get_many(keys) == items
+
+
+def test_geocode_cache_compact(path, now):
+    cache = GeocodeCache(path, ttl=60)
+    cache.set_many({'a': [1], 'b': [2]})
+    cache.set('c', [3], ttl=600)
+    now[0] += 120
+    assert cache.compact() == 2
+    assert len(cache) == 1
+
+
+def test_geocode_cache_compact_command(path, now, capsys):
+    cache = GeocodeCache(path, ttl=60)
+    cache.set('a', [1])
+    cache.close()
+    now[0] += 120
+    main(['compact', path])
+    assert 'Removed 1 expired entries' in capsys.readouterr()[0]
+    assert len(GeocodeCache(path)) == 0
+
+
+def test_geocode_cache_concurrent_readers(path):
+    cache = GeocodeCache(path)
+    cache.set_many({str(index): [index] for index in range(100)})
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(cache.get, [str(index)
+                                                for index in range(100)]))
+    assert results == [[index] for index in range(100)]
+
+
+def test_geocode_cache_in_memory_shared_by_threads():
+    cache = GeocodeCache(':memory:')
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda index: cache.set(str(index), [index]),
+                          range(100)))
+        results = list(executor.map(cache.get, [str(index)
+                                                for index in range(100)]))
+    assert results == [[index] for index in range(100)]
+    assert len(cache) == 100
+
+
+@parametrize('cls,data', [
+    (LocationByAddress, {'adminDistrict': 'WA', 'locality': 'Seattle',
+                         'key': BING_MAPS_KEY}),
+    (LocationByQuery, {'q': 'Seattle, WA', 'key': BING_MAPS_KEY}),
+    (LocationByPoint, {'point': '47.60357,-122.32945',
+                       'key': BING_MAPS_KEY}),
+    (LocationByAddress, {'adminDistrict': 'WA', 'locality': 'Seattle',
+                         'o': 'xml', 'key': BING_MAPS_KEY}),
+])
+def test_locations_use_geocode_cache(urls, path, cls, data):
+    first = cls(data, geocode_cache=GeocodeCache(path))
+    second = cls(data, geocode_cache=GeocodeCache(path))
+    assert len(urls) == 1
+    assert second.get_coordinates == first.get_coordinates
+    assert second.get_address == first.get_address
+    assert second.status_code == 200
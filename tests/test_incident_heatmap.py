@@ -0,0 +1,107 @@
+from .fixtures import BING_MAPS_KEY, parametrize
+from bingmaps.apiservices import (
+    IncidentHeatmap,
+    TrafficIncidentsApi,
+    TrafficPoller
+)
+import pytest
+import random
+
+BOUNDS = [37, -99, 41, -94]
+
+
+def random_polls(count=20, seed=1):
+    """Successive polls with incidents appearing, moving, changing severity
+    and clearing"""
+    generator = random.Random(seed)
+    incidents = {}
+    polls = []
+    for poll in range(count):
+        for id in generator.sample(range(200), 30):
+            if generator.random() < 0.3:
+                incidents.pop(id, None)
+            else:
+                incidents[id] = {
+                    'incidentId': id, 'severity': generator.randint(1, 4),
+                    'lastModified': '/Date({0})/'.format(poll),
+                    'point': {'coordinates': [generator.uniform(36, 42),
+                                              generator.uniform(-100, -93)]}}
+        polls.append(list(incidents.values()))
+    return polls
+
+
+@parametrize('weight', [None, 'severity',
+                        lambda incident: incident['severity'] ** 2])
+def test_incremental_updates_match_full_binning(weight):
+    heatmap = IncidentHeatmap(BOUNDS, 8, 10, weight)
+    for incidents in random_polls():
+        heatmap.update(incidents)
+        fresh = IncidentHeatmap(BOUNDS, 8, 10, weight)
+        fresh.update(incidents)
+        assert heatmap.raster() == fresh.raster()
+        assert len(heatmap) == len(fresh)
+
+
+def test_apply_poller_changes():
+    heatmap = IncidentHeatmap(BOUNDS, 4, 4, 'severity')
+    poller = TrafficPoller({'mapArea': BOUNDS, 'key': BING_MAPS_KEY})
+    for incidents in random_polls():
+        heatmap.apply(poller.update(incidents))
+        fresh = IncidentHeatmap(BOUNDS, 4, 4, 'severity')
+        fresh.update(incidents)
+        assert heatmap.raster() == fresh.raster()
+
+
+@parametrize('point,cell', [
+    ((37, -99), 0),
+    ((41, -94), 15),
+    ((38.5, -96.5), 6),
+    ((36.9, -96.5), None),
+    ((39, -93.9), None),
+])
+def test_cell(point, cell):
+    assert IncidentHeatmap(BOUNDS, 4, 4).cell(*point) == cell
+
+
+def test_emptied_cells_reset_to_zero():
+    heatmap = IncidentHeatmap([0, 0, 2, 2], 1, 1, lambda incident: 0.1)
+    incidents = [{'incidentId': id, 'point': {'coordinates': [1, 1]}}
+                 for id in range(3)]
+    heatmap.update(incidents)
+    heatmap.update([])
+    assert heatmap.values[0] == 0.0
+
+
+def test_counts():
+    heatmap = IncidentHeatmap([0, 0, 2, 2], 2, 2)
+    heatmap.update([
+        {'incidentId': 1, 'point': {'coordinates': [0.5, 0.5]}},
+        {'incidentId': 2, 'point': {'coordinates': [0.6, 0.6]}},
+        {'incidentId': 3, 'point': {'coordinates': [1.5, 0.5]}},
+        {'incidentId': 4, 'point': {'coordinates': [5, 5]}},
+        {'incidentId': 5}])
+    assert heatmap.raster() == [[2.0, 0.0], [1.0, 0.0]]
+    assert heatmap.total() == 3
+
+
+def test_update_from_xml_response(network):
+    network.respond = (
+        '<Response><ResourceSets><ResourceSet><Resources><TrafficIncident>'
+        '<IncidentId>1</IncidentId><Point><Latitude>38.5</Latitude>'
+        '<Longitude>-96.5</Longitude></Point><Severity>3</Severity>'
+        '</TrafficIncident></Resources></ResourceSet></ResourceSets>'
+        '</Response>')
+    heatmap = IncidentHeatmap(BOUNDS, 4, 4, 'severity')
+    heatmap.update(TrafficIncidentsApi({'mapArea': BOUNDS, 'o': 'xml',
+                                        'key': BING_MAPS_KEY}))
+    assert heatmap.values[6] == 3.0
+    assert heatmap.total() == 3.0
+
+
+@parametrize('bounds,rows,cols', [
+    ([41, -99, 37, -94], 4, 4),
+    (BOUNDS, 0, 4),
+])
+def test_invalid_raster(bounds, rows, cols):
+    with pytest.raises(ValueError):
+        IncidentHeatmap(bounds, rows, cols)
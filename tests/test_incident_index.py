@@ -0,0 +1,120 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import IncidentIndex, TrafficIncidentsApi
+from bingmaps.urls import distance
+import bingmaps.apiservices.trafficindex as trafficindex
+import json
+import random
+
+
+def incidents(count=500, seed=1):
+    generator = random.Random(seed)
+    return [{'incidentId': id,
+             'point': {'coordinates': [generator.uniform(37, 41),
+                                       generator.uniform(-99, -94)]}}
+            for id in range(count)]
+
+
+INCIDENTS = incidents()
+
+
+def brute_radius(point, radius):
+    return [position for position, incident in enumerate(INCIDENTS)
+            if distance(point, incident['point']['coordinates']) <= radius]
+
+
+@parametrize('cell_size', [0.01, 0.05, 1])
+@parametrize('point,radius', [
+    ((39, -96.5), 2000),
+    ((39, -96.5), 30000),
+    ((37.01, -98.99), 50000),
+    ((45, -90), 100000),
+])
+def test_within_radius(cell_size, point, radius):
+    index = IncidentIndex(INCIDENTS, cell_size)
+    assert index.within_radius(point, radius, indices=True) == \
+        brute_radius(point, radius)
+
+
+@parametrize('bounds', [
+    [38, -97, 38.5, -96],
+    [37, -99, 41, -94],
+    [0, 0, 1, 1],
+])
+def test_within_bounds(bounds):
+    index = IncidentIndex(INCIDENTS)
+    south, west, north, east = bounds
+    expected = [incident for incident in INCIDENTS
+                if south <= incident['point']['coordinates'][0] <= north and
+                west <= incident['point']['coordinates'][1] <= east]
+    assert index.within_bounds(bounds) == expected
+
+
+@parametrize('cell_size', [0.01, 0.05, 1])
+@parametrize('point,k', [
+    ((39, -96.5), 1),
+    ((39, -96.5), 10),
+    ((30, -80), 5),
+    ((39, -96.5), 1000),
+])
+def test_nearest(cell_size, point, k):
+    index = IncidentIndex(INCIDENTS, cell_size)
+    expected = sorted(range(len(INCIDENTS)), key=lambda position: distance(
+        point, INCIDENTS[position]['point']['coordinates']))[:k]
+    assert index.nearest(point, k, indices=True) == expected
+
+
+def test_nearest_far_point_searches_occupied_extent(monkeypatch):
+    searched = []
+    ring_cells = trafficindex.ring_cells
+
+    def counted_ring_cells(*args):
+        cells = ring_cells(*args)
+        searched.extend(cells)
+        return cells
+    monkeypatch.setattr(trafficindex, 'ring_cells', counted_ring_cells)
+    index = IncidentIndex(INCIDENTS, 0.1)
+    point = (-30, 100)
+    expected = min(range(len(INCIDENTS)), key=lambda position: distance(
+        point, INCIDENTS[position]['point']['coordinates']))
+    assert index.nearest(point, indices=True) == [expected]
+    assert len(searched) <= 40 * 50
+    assert len(set(searched)) == len(searched)
+
+
+def test_incidents_without_location_skipped():
+    index = IncidentIndex([{'incidentId': 1},
+                           {'incidentId': 2,
+                            'point': {'coordinates': [47.6, -122.3]}}])
+    assert len(index) == 2
+    assert index.within_bounds([47, -123, 48, -122], indices=True) == [1]
+    assert index.nearest((0, 0), k=5, indices=True) == [1]
+
+
+def test_empty_index():
+    index = IncidentIndex([])
+    assert index.within_bounds([0, 0, 1, 1]) == []
+    assert index.within_radius((0, 0), 1000) == []
+    assert index.nearest((0, 0)) == []
+
+
+@parametrize('output', ['json', 'xml'])
+def test_from_response(network, output):
+    def respond(url):
+        if output == 'xml':
+            return FakeResponse(
+                '<Response><ResourceSets><ResourceSet><Resources>'
+                '<TrafficIncident><IncidentId>1</IncidentId><Point>'
+                '<Latitude>38.5</Latitude><Longitude>-96.5</Longitude>'
+                '</Point></TrafficIncident><TrafficIncident>'
+                '<IncidentId>2</IncidentId><Point><Latitude>40.5</Latitude>'
+                '<Longitude>-95.5</Longitude></Point></TrafficIncident>'
+                '</Resources></ResourceSet></ResourceSets></Response>')
+        return FakeResponse(json.dumps({'resourceSets': [{'resources': [
+            {'incidentId': 1, 'point': {'coordinates': [38.5, -96.5]}},
+            {'incidentId': 2, 'point': {'coordinates': [40.5, -95.5]}}]}]}))
+    network.respond = respond
+    response = TrafficIncidentsApi({'mapArea': [37, -99, 41, -94], 'o': output,
+                                    'key': BING_MAPS_KEY})
+    index = IncidentIndex.from_response(response)
+    assert index.within_radius((40.5, -95.5), 1000, indices=True) == [1]
+    assert index.nearest((38, -97), indices=True) == [0]
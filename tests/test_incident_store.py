@@ -0,0 +1,134 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import IncidentStore, TrafficIncidentsApi
+from bingmaps.apiservices.trafficincidents import incident_id, parse_time
+import json
+
+NOW = 1458000000
+
+
+class Clock(object):
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def incident(id, latitude=47.6, longitude=-122.3, severity=2, start=-3600,
+             end=3600):
+    return {'incidentId': id, 'severity': severity,
+            'point': {'coordinates': [latitude, longitude]},
+            'start': '/Date({0})/'.format(int((NOW + start) * 1000)),
+            'end': '/Date({0})/'.format(int((NOW + end) * 1000))}
+
+
+def ids(incidents):
+    return sorted(int(incident_id(incident)) for incident in incidents)
+
+
+def test_incidents_expire_at_end_time():
+    clock = Clock()
+    store = IncidentStore(clock=clock)
+    store.ingest([incident(1, end=60), incident(2, end=120),
+                  incident(3, end=-1)])
+    assert len(store) == 2
+    clock.now += 60
+    assert ids(store.query()) == [2]
+    assert 1 not in store
+    clock.now += 60
+    assert len(store) == 0
+    assert store.expired == 2
+
+
+def test_newer_version_replaces_incident():
+    clock = Clock()
+    store = IncidentStore(clock=clock)
+    store.ingest([incident(1, severity=1, end=60)])
+    store.ingest([incident(1, severity=4, end=600)])
+    assert len(store) == 1
+    assert store.get(1)['severity'] == 4
+    assert store.query(severity=[1]) == []
+    clock.now += 120
+    assert store.get(1)['severity'] == 4
+
+
+def test_replace_drops_missing_incidents():
+    store = IncidentStore(clock=Clock())
+    store.ingest([incident(1), incident(2)])
+    assert store.ingest([incident(2), incident(3)]) == 3
+    assert store.ingest([incident(3)], replace=True) == 1
+
+
+@parametrize('criteria,expected', [
+    ({'bounds': [47, -123, 48, -122]}, [1, 2]),
+    ({'bounds': [40, -80, 41, -79]}, [4]),
+    ({'severity': [3, 4]}, [2, 4]),
+    ({'bounds': [47, -123, 48, -122], 'severity': [4]}, [2]),
+    ({'start': NOW + 7200}, [3]),
+    ({'end': NOW - 3600}, [1, 2, 4]),
+    ({'start': NOW, 'end': NOW + 60}, [1, 2, 4]),
+    ({'bounds': [0, 0, 1, 1]}, []),
+    ({'bounds': [-90, -180, 90, 180]}, [1, 2, 3, 4]),
+])
+def test_query(criteria, expected):
+    store = IncidentStore(clock=Clock())
+    store.ingest([incident(1), incident(2, 47.7, -122.2, severity=4),
+                  incident(3, 51.5, -0.1, start=3600, end=86400),
+                  incident(4, 40.5, -79.5, severity=3)])
+    assert ids(store.query(**criteria)) == expected
+
+
+def test_incidents_without_end_or_location_kept():
+    store = IncidentStore(clock=Clock())
+    store.ingest([{'incidentId': 1, 'severity': 1}])
+    assert ids(store.query()) == [1]
+    assert store.query([-90, -180, 90, 180]) == []
+
+
+def test_compaction_keeps_incidents():
+    clock = Clock()
+    store = IncidentStore(compact_interval=300, clock=clock)
+    for _ in range(10):
+        store.ingest([incident(id, end=30 + 10 * id) for id in range(100)])
+    assert len(store._ends) == 100
+    clock.now += 60
+    store.ingest([incident(1000, end=3600)])
+    clock.now += 300
+    assert len(store) == 67
+    assert len(store._ends) == 67
+    assert store._compacted == clock.now
+    assert len(store.query([47, -123, 48, -122])) == 67
+
+
+def test_ingest_response(network):
+    def respond(url):
+        if 'o=xml' in url:
+            return FakeResponse(
+                '<Response><ResourceSets><ResourceSet><Resources>'
+                '<TrafficIncident><IncidentId>7</IncidentId><Point>'
+                '<Latitude>38.5</Latitude><Longitude>-96.5</Longitude>'
+                '</Point><Severity>3</Severity>'
+                '<EndTimeUTC>2016-03-25T01:51:30</EndTimeUTC>'
+                '</TrafficIncident></Resources></ResourceSet></ResourceSets>'
+                '</Response>')
+        return FakeResponse(json.dumps({'resourceSets': [{'resources': [
+            incident(7, 38.5, -96.5, severity=3)]}]}))
+    network.respond = respond
+    for output in ['json', 'xml']:
+        store = IncidentStore(clock=Clock())
+        store.ingest(TrafficIncidentsApi(
+            {'mapArea': [37, -99, 41, -94], 'o': output,
+             'key': BING_MAPS_KEY}))
+        assert ids(store.query([38, -97, 39, -96], severity=[3])) == [7]
+
+
+@parametrize('value,expected', [
+    ('/Date(1458870690000)/', 1458870690.0),
+    ('/Date(1458870690000-0700)/', 1458870690.0),
+    ('2016-03-25T01:51:30', 1458870690.0),
+    ('2016-03-25T01:51:30.250Z', 1458870690.0),
+    (None, None),
+    ('soon', None),
+])
+def test_parse_time(value, expected):
+    assert parse_time(value) == expected
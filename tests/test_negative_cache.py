@@ -0,0 +1,134 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import (
+    LocationByAddress,
+    LocationByPoint,
+    LocationByQuery
+)
+from bingmaps.cache import GeocodeCache, NegativeCache, address_key
+import bingmaps.cache.negative
+import json
+import pytest
+import requests
+
+EMPTY_RESPONSE = json.dumps({'resourceSets': [{'estimatedTotal': 0,
+                                               'resources': []}]})
+
+EMPTY_XML_RESPONSE = '<Response><ResourceSets><ResourceSet>' \
+                     '<EstimatedTotal>0</EstimatedTotal><Resources />' \
+                     '</ResourceSet></ResourceSets></Response>'
+
+
+@pytest.fixture
+def responses(network):
+    """Responses of the fake server by status code, with the requested
+    urls"""
+    server = {'status_code': 200, 'urls': network.urls}
+
+    def respond(url):
+        if 'o=xml' in url:
+            return FakeResponse(EMPTY_XML_RESPONSE, server['status_code'])
+        return FakeResponse(EMPTY_RESPONSE, server['status_code'])
+    network.respond = respond
+    return server
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(bingmaps.cache.negative.time, 'time',
+                        lambda: clock[0])
+    return clock
+
+
+@parametrize('cls,data', [
+    (LocationByAddress, {'addressLine': 'nowhere', 'key': BING_MAPS_KEY}),
+    (LocationByAddress, {'addressLine': 'nowhere', 'o': 'xml',
+                         'key': BING_MAPS_KEY}),
+    (LocationByQuery, {'q': 'nowhere', 'key': BING_MAPS_KEY}),
+    (LocationByPoint, {'point': '0,0', 'key': BING_MAPS_KEY}),
+])
+def test_empty_results_skipped(responses, cls, data):
+    cache = NegativeCache()
+    first = cls(data, negative_cache=cache)
+    second = cls(data, negative_cache=cache)
+    assert len(responses['urls']) == 1
+    assert first.get_coordinates == []
+    assert second.get_coordinates == []
+    assert second.status_code == 200
+    assert cache.hits == 1
+
+
+@parametrize('status_code,recorded', [
+    (400, True),
+    (404, True),
+    (401, False),
+    (429, False),
+    (500, False),
+])
+def test_client_errors_skipped(responses, status_code, recorded):
+    responses['status_code'] = status_code
+    cache = NegativeCache()
+    data = {'q': 'bad', 'key': BING_MAPS_KEY}
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            LocationByQuery(data, negative_cache=cache)
+    assert len(responses['urls']) == (1 if recorded else 2)
+
+
+def test_invalid_address_recorded(responses):
+    cache = NegativeCache()
+    data = {'addressLine': '1 Main St', 'postalCode': 'SW1A 1AA',
+            'key': BING_MAPS_KEY}
+    with pytest.raises(KeyError):
+        LocationByAddress(data, negative_cache=cache)
+    entry = cache.get(address_key(dict(data, addressLine='1 main street')))
+    assert entry.reason == 'invalid'
+    assert 'postalCode' in entry.detail
+    assert responses['urls'] == []
+
+
+def test_missing_key_not_recorded(responses):
+    cache = NegativeCache()
+    with pytest.raises(KeyError):
+        LocationByAddress({'addressLine': '1 Main St'}, negative_cache=cache)
+    assert len(cache) == 0
+
+
+def test_negative_cache_ttl(responses, now):
+    cache = NegativeCache(ttl=60)
+    data = {'q': 'nowhere', 'key': BING_MAPS_KEY}
+    LocationByQuery(data, negative_cache=cache)
+    now[0] += 30
+    LocationByQuery(data, negative_cache=cache)
+    now[0] += 60
+    LocationByQuery(data, negative_cache=cache)
+    assert len(responses['urls']) == 2
+
+
+def test_negative_ttl_with_geocode_cache(responses, now):
+    cache = NegativeCache(ttl=60)
+    geocodes = GeocodeCache(':memory:')
+    data = {'q': 'nowhere', 'key': BING_MAPS_KEY}
+    LocationByQuery(data, negative_cache=cache, geocode_cache=geocodes)
+    assert len(geocodes) == 0
+    now[0] += 61
+    LocationByQuery(data, negative_cache=cache, geocode_cache=geocodes)
+    assert len(responses['urls']) == 2
+
+
+def test_negative_cache_persistent_store(responses, create_tmp_dir):
+    path = '{0}/geocodes.sqlite'.format(create_tmp_dir)
+    data = {'q': 'nowhere', 'key': BING_MAPS_KEY}
+    LocationByQuery(data, negative_cache=NegativeCache(
+        store=GeocodeCache(path)))
+    LocationByQuery(data, negative_cache=NegativeCache(
+        store=GeocodeCache(path)))
+    assert len(responses['urls']) == 1
+    assert len(GeocodeCache(path)) == 1
+
+
+def test_negative_cache_delete():
+    cache = NegativeCache()
+    cache.set('a', 'empty')
+    cache.delete('a')
+    assert cache.get('a') is None
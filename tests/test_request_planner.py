@@ -0,0 +1,112 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import (
+    ElevationsApi,
+    LocationByAddress,
+    LocationByQuery,
+    TrafficIncidentsApi
+)
+from bingmaps.urls import RequestPlanner, compress_points, decompress_points
+from urllib.parse import urlparse, parse_qs
+import json
+import pytest
+
+
+@pytest.fixture
+def urls(network):
+    def respond(url):
+        query = parse_qs(urlparse(url).query)
+        if 'points' in query:
+            points = query['points'][0]
+            count = len(points.split(',')) // 2 if ',' in points else \
+                len(decompress_points(points)) // 2
+            resources = [{'elevations': [0] * count}]
+        else:
+            resources = [{'incidentId': int(value)}
+                         for key in ['severity', 'type'] if key in query
+                         for value in query[key][0].split(',')]
+        return FakeResponse(json.dumps(
+            {'resourceSets': [{'resources': resources}]}))
+    network.respond = respond
+    return network.urls
+
+
+@parametrize('points,limit,expected', [
+    ([1.5, 2.5, 3.5, 4.5, 5.5, 6.5], 60, [[1.5, 2.5, 3.5, 4.5],
+                                          [5.5, 6.5]]),
+    ([1.5, 2.5, 3.5, 4.5, 5.5, 6.5], 100, [[1.5, 2.5, 3.5, 4.5, 5.5, 6.5]]),
+    ([1.5, 2.5, 3.5, 4.5, 5.5, 6.5], 47, [[1.5, 2.5], [3.5, 4.5],
+                                          [5.5, 6.5]]),
+])
+def test_split_points(points, limit, expected):
+    planner = RequestPlanner({'Elevation': limit})
+    chunks = planner.split_points(points, 40)
+    assert chunks == expected
+    for chunk in chunks:
+        assert 40 + len(','.join(str(val) for val in chunk)) <= limit
+
+
+def test_split_points_compressed_fit_in_limit():
+    points = [val / 1000.0 for val in range(4000)]
+    planner = RequestPlanner({'Elevation': 200})
+    chunks = planner.split_points(points, 100, compress=True)
+    assert [val for chunk in chunks for val in chunk] == points
+    for chunk in chunks:
+        assert 100 + len(compress_points(chunk)) <= 200
+
+
+def test_split_points_single_point_too_long():
+    planner = RequestPlanner({'Elevation': 45})
+    with pytest.raises(ValueError):
+        planner.split_points([1.5, 2.5], 40)
+
+
+def test_elevations_use_compressed_points_when_fewer_requests(urls):
+    points = [47.6 + val / 10000.0 for val in range(1000)]
+    data = {'method': 'List', 'points': points, 'key': BING_MAPS_KEY}
+    elevations = ElevationsApi(data, planner=RequestPlanner(compress=True))
+    assert len(urls) == 1
+    assert len(urls[0]) <= 2048
+    assert ',' not in parse_qs(urlparse(urls[0]).query)['points'][0]
+    assert len(elevations.elevations[0][0]) == 500
+
+
+def test_elevations_without_compression(urls):
+    points = [47.6 + val / 10000.0 for val in range(1000)]
+    data = {'method': 'List', 'points': points, 'key': BING_MAPS_KEY}
+    ElevationsApi(data)
+    assert len(urls) > 1
+    for url in urls:
+        assert len(url) <= 2048
+        assert ',' in parse_qs(urlparse(url).query)['points'][0]
+
+
+@parametrize('cls,data', [
+    (LocationByAddress, {'addressLine': 'a' * 3000, 'key': BING_MAPS_KEY}),
+    (LocationByQuery, {'q': 'a' * 3000, 'key': BING_MAPS_KEY}),
+])
+def test_locations_too_long_url(urls, cls, data):
+    with pytest.raises(ValueError):
+        cls(data)
+    assert urls == []
+
+
+def test_traffic_filters_split_and_merged(urls):
+    data = {'mapArea': [37, -99, 41, -94],
+            'severity': [1, 2, 3, 4],
+            'type': [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11],
+            'key': BING_MAPS_KEY}
+    planner = RequestPlanner({'Traffic': 170})
+    incidents = TrafficIncidentsApi(data, planner=planner)
+    assert len(urls) > 1
+    for url in urls:
+        assert len(url) <= 170
+    ids = [incident['incidentId'] for incident in incidents.get_resource()]
+    assert sorted(ids) == list(range(1, 12))
+
+
+def test_traffic_filters_not_split_when_fitting(urls):
+    data = {'mapArea': [37, -99, 41, -94],
+            'severity': [1, 2, 3, 4],
+            'key': BING_MAPS_KEY}
+    TrafficIncidentsApi(data)
+    assert len(urls) == 1
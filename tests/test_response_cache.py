@@ -0,0 +1,112 @@
+from .fixtures import BING_MAPS_KEY, parametrize
+from bingmaps.apiservices import (
+    ElevationsApi,
+    LocationByAddress,
+    LocationByPoint,
+    TrafficIncidentsApi
+)
+from bingmaps.cache import CachedResponse, ResponseCache, canonical_url
+import bingmaps.cache.memory
+import json
+import pytest
+
+RESPONSE = json.dumps({'resourceSets': [{'resources': [
+    {'elevations': [10], 'point': {'coordinates': [47.6, -122.1]}}]}]})
+
+
+@pytest.fixture
+def urls(network):
+    network.respond = RESPONSE
+    return network.urls
+
+
+def response(text='x'):
+    return CachedResponse(text, 200, {})
+
+
+@parametrize('url,expected', [
+    ('http://dev.virtualearth.net/REST/v1/Locations?locality=Seattle&'
+     'adminDistrict=WA&key=abs',
+     'dev.virtualearth.net/REST/v1/Locations?adminDistrict=WA&'
+     'locality=Seattle'),
+    ('https://dev.virtualearth.net/REST/v1/Locations?adminDistrict=WA&'
+     'key=other&locality=Seattle',
+     'dev.virtualearth.net/REST/v1/Locations?adminDistrict=WA&'
+     'locality=Seattle'),
+    ('http://dev.virtualearth.net/REST/v1/Elevation/List?'
+     'points=1.5,2.5&heights=sealevel&key=abs',
+     'dev.virtualearth.net/REST/v1/Elevation/List?heights=sealevel&'
+     'points=1.5,2.5'),
+    ('http://dev.virtualearth.net/REST/v1/Locations?q=1%20Main%20St.&key=a',
+     'dev.virtualearth.net/REST/v1/Locations?q=1%20Main%20St.'),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def test_cache_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', response())
+    cache.set('b', response())
+    cache.get('a')
+    cache.set('c', response())
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert cache.stats.evictions == 1
+
+
+def test_cache_bytes_bound():
+    cache = ResponseCache(max_bytes=10)
+    cache.set('a', response('x' * 6))
+    cache.set('b', response('x' * 6))
+    assert 'a' not in cache
+    assert cache.stats.bytes == 6
+    cache.set('c', response('x' * 11))
+    assert 'c' not in cache
+
+
+def test_cache_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(bingmaps.cache.memory.time, 'monotonic',
+                        lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.set('a', response())
+    cache.set('b', response(), ttl=30)
+    now[0] += 20
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 1
+
+
+@parametrize('cls,data', [
+    (ElevationsApi, {'method': 'List', 'points': [15.5467, 34.5676],
+                     'key': BING_MAPS_KEY}),
+    (LocationByAddress, {'adminDistrict': 'WA', 'locality': 'Seattle',
+                         'key': BING_MAPS_KEY}),
+    (LocationByPoint, {'point': '47.64054,-122.12934',
+                       'key': BING_MAPS_KEY}),
+    (TrafficIncidentsApi, {'mapArea': [37, -99, 41, -94],
+                           'key': BING_MAPS_KEY}),
+])
+def test_services_use_cache(urls, cls, data):
+    cache = ResponseCache()
+    first = cls(data, cache=cache)
+    other_key = dict(data, key='another key')
+    second = cls(other_key, cache=cache)
+    assert len(urls) == 1
+    assert second.response == first.response
+    assert second.status_code == 200
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_elevation_chunks_cached(urls):
+    cache = ResponseCache()
+    data = {'method': 'List', 'points': [15.5467, 34.5676],
+            'key': BING_MAPS_KEY}
+    ElevationsApi(data, cache=cache)
+    elevations = ElevationsApi(data, cache=cache)
+    assert len(urls) == 1
+    assert elevations.elevations[0][0] == [10]
@@ -0,0 +1,118 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import LocationByPoint
+from bingmaps.cache import GeocodeCache, ReverseGeocodeCache
+from bingmaps.urls import geohash
+import json
+import pytest
+
+JSON_RESPONSE = json.dumps({'resourceSets': [{'resources': [
+    {'name': '1 Microsoft Way, Redmond, WA',
+     'point': {'coordinates': [47.64054, -122.12934]},
+     'address': {'locality': 'Redmond'}}]}]})
+
+XML_RESPONSE = '<Response><ResourceSets><ResourceSet><Resources><Location>' \
+               '<Name>1 Microsoft Way, Redmond, WA</Name><Point>' \
+               '<Latitude>47.64054</Latitude>' \
+               '<Longitude>-122.12934</Longitude></Point>' \
+               '<Address><Locality>Redmond</Locality></Address>' \
+               '</Location></Resources></ResourceSet></ResourceSets>' \
+               '</Response>'
+
+RESOURCES = [{'point': {'coordinates': [47.64054, -122.12934]}}]
+
+
+@pytest.fixture
+def urls(network):
+    def respond(url):
+        if 'o=xml' in url:
+            return FakeResponse(XML_RESPONSE)
+        return FakeResponse(JSON_RESPONSE)
+    network.respond = respond
+    return network.urls
+
+
+@parametrize('latitude,longitude,precision,expected', [
+    (57.64911, 10.40744, 11, 'u4pruydqqvj'),
+    (42.6, -5.6, 5, 'ezs42'),
+    (-25.382708, -49.265506, 6, '6gkzwg'),
+])
+def test_geohash(latitude, longitude, precision, expected):
+    assert geohash(latitude, longitude, precision) == expected
+
+
+def test_cache_same_cell():
+    cache = ReverseGeocodeCache(precision=7)
+    cache.set('47.64054,-122.12934', RESOURCES)
+    assert cache.get('47.64057,-122.12937') == RESOURCES
+    assert cache.get((47.64051, -122.12930)) == RESOURCES
+    assert cache.get('47.7,-122.2') is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_cache_precision():
+    coarse = ReverseGeocodeCache(precision=5)
+    fine = ReverseGeocodeCache(precision=9)
+    for cache in (coarse, fine):
+        cache.set('47.64054,-122.12934', RESOURCES)
+    assert coarse.get('47.6415,-122.1301') == RESOURCES
+    assert fine.get('47.6415,-122.1301') is None
+
+
+def test_cache_max_distance():
+    cache = ReverseGeocodeCache(precision=5, max_distance=50)
+    cache.set('47.64054,-122.12934', RESOURCES)
+    assert cache.get('47.64060,-122.12940') == RESOURCES
+    assert cache.get('47.6415,-122.1301') is None
+
+
+def test_cache_max_distance_without_locations():
+    cache = ReverseGeocodeCache(max_distance=50)
+    cache.set('47.64054,-122.12934', [])
+    assert cache.get('47.64054,-122.12934') is None
+
+
+def test_cache_params():
+    cache = ReverseGeocodeCache()
+    cache.set('47.64054,-122.12934', RESOURCES, 'o=xml')
+    assert cache.get('47.64054,-122.12934') is None
+    assert cache.get('47.64054,-122.12934', 'o=xml') == RESOURCES
+
+
+def test_cache_max_entries():
+    cache = ReverseGeocodeCache(precision=9, max_entries=2)
+    for latitude in (10, 20, 30):
+        cache.set((latitude, 0), RESOURCES)
+    assert len(cache) == 2
+    assert cache.get((10, 0)) is None
+
+
+def test_cache_store():
+    store = GeocodeCache(':memory:')
+    cache = ReverseGeocodeCache(store=store)
+    cache.set('47.64054,-122.12934', RESOURCES)
+    assert len(store) == 1
+    assert cache.get('47.64055,-122.12935') == RESOURCES
+
+
+@parametrize('output', ['json', 'xml'])
+def test_location_by_point_reverse_cache(urls, output):
+    cache = ReverseGeocodeCache(precision=7, max_distance=25)
+    points = ['47.64054,-122.12934', '47.64056,-122.12931',
+              '47.64052,-122.12936']
+    locations = [LocationByPoint({'point': point, 'o': output,
+                                  'key': BING_MAPS_KEY},
+                                 reverse_cache=cache)
+                 for point in points]
+    assert len(urls) == 1
+    assert len(cache) == 1
+    for location in locations:
+        assert location.status_code == 200
+        assert float(location.get_coordinates[0].latitude) == 47.64054
+
+
+def test_location_by_point_reverse_cache_other_cell(urls):
+    cache = ReverseGeocodeCache(precision=7)
+    for point in ('47.64054,-122.12934', '47.66,-122.15'):
+        LocationByPoint({'point': point, 'key': BING_MAPS_KEY},
+                        reverse_cache=cache)
+    assert len(urls) == 2
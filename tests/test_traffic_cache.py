@@ -0,0 +1,137 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse
+from bingmaps.apiservices import TrafficIncidentsApi
+from bingmaps.cache import CachedResponse, TrafficCache
+from concurrent.futures import ThreadPoolExecutor
+import bingmaps.cache.traffic
+import json
+import pytest
+import threading
+import time
+
+DATA = {'mapArea': [37, -99, 41, -94], 'key': BING_MAPS_KEY}
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(bingmaps.cache.traffic.time, 'monotonic',
+                        lambda: clock[0])
+    return clock
+
+
+class Fetcher(object):
+    """Returns a new response (with the number of the call) at every call"""
+    def __init__(self, delay=0, error=None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return CachedResponse(str(calls), 200, {})
+
+
+def test_fresh_entries_served(now):
+    cache = TrafficCache(ttl=10, stale_ttl=60)
+    fetch = Fetcher()
+    assert cache.get('a', fetch).text == '1'
+    now[0] += 9
+    assert cache.get('a', fetch).text == '1'
+    assert fetch.calls == 1
+
+
+def test_stale_entry_served_while_refreshing(now):
+    cache = TrafficCache(ttl=10, stale_ttl=60)
+    fetch = Fetcher()
+    cache.get('a', fetch)
+    now[0] += 20
+    assert cache.get('a', fetch).text == '1'
+    cache.wait()
+    assert fetch.calls == 2
+    assert cache.get('a', fetch).text == '2'
+    assert cache.stats.stale_hits == 1
+    assert cache.stats.refreshes == 1
+    cache.close()
+
+
+def test_expired_entry_fetched(now):
+    cache = TrafficCache(ttl=10, stale_ttl=60)
+    fetch = Fetcher()
+    cache.get('a', fetch)
+    now[0] += 71
+    assert cache.get('a', fetch).text == '2'
+    assert cache.stats.refreshes == 0
+
+
+def test_background_refreshes_deduplicated(now):
+    cache = TrafficCache(ttl=10, stale_ttl=60, max_workers=4)
+    cache.get('a', Fetcher())
+    now[0] += 20
+    fetch = Fetcher(delay=0.05)
+    results = [cache.get('a', fetch).text for _ in range(20)]
+    cache.wait()
+    assert results == ['1'] * 20
+    assert fetch.calls == 1
+    cache.close()
+
+
+def test_concurrent_misses_deduplicated():
+    cache = TrafficCache()
+    fetch = Fetcher(delay=0.05)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: cache.get('a', fetch).text,
+                                    range(8)))
+    assert results == ['1'] * 8
+    assert fetch.calls == 1
+
+
+def test_failed_refresh_keeps_stale_entry(now):
+    cache = TrafficCache(ttl=10, stale_ttl=60)
+    cache.get('a', Fetcher())
+    now[0] += 20
+    assert cache.get('a', Fetcher(error=ValueError())).text == '1'
+    cache.wait()
+    assert cache.stats.refresh_errors == 1
+    assert cache.get('a', Fetcher()).text == '1'
+    cache.close()
+
+
+def test_failed_fetch_raised():
+    cache = TrafficCache()
+    with pytest.raises(ValueError):
+        cache.get('a', Fetcher(error=ValueError()))
+    assert 'a' not in cache
+
+
+def test_max_entries():
+    cache = TrafficCache(max_entries=2)
+    for key in 'abc':
+        cache.get(key, Fetcher())
+    assert 'a' not in cache
+    assert len(cache) == 2
+
+
+def test_traffic_incidents_use_traffic_cache(network, now):
+    requested = network.urls
+    network.respond = lambda url: FakeResponse(json.dumps(
+        {'resourceSets': [{'resources': [{'incidentId': len(requested)}]}]}))
+    cache = TrafficCache(ttl=10, stale_ttl=60)
+    first = TrafficIncidentsApi(DATA, traffic_cache=cache)
+    second = TrafficIncidentsApi(dict(DATA, key='other key'),
+                                 traffic_cache=cache)
+    assert len(requested) == 1
+    assert second.response == first.response
+    now[0] += 20
+    stale = TrafficIncidentsApi(DATA, traffic_cache=cache)
+    cache.wait()
+    assert stale.incident_id[0].incident_id == 1
+    assert len(requested) == 2
+    fresh = TrafficIncidentsApi(DATA, traffic_cache=cache)
+    assert fresh.incident_id[0].incident_id == 2
+    cache.close()
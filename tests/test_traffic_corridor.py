@@ -0,0 +1,140 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import TrafficCorridorApi
+from bingmaps.apiservices.trafficincidents import get_incidents, incident_id
+from bingmaps.urls import RequestPlanner, distance, polyline_distance
+from bingmaps.urls.planner import box_area, corridor_box
+from urllib.parse import urlparse
+import json
+import os
+import pytest
+
+ROUTE = [(45.5, -122.7), (47.6, -122.3), (49.3, -123.1)]
+
+INCIDENTS = [
+    (1, 45.5, -122.7),
+    (2, 47.6, -122.305),
+    (3, 47.6, -122.5),
+    (4, 48.45, -122.7),
+    (5, 48.45, -122.0),
+]
+
+
+@pytest.fixture
+def urls(network):
+    """Fake traffic service returning the incidents inside the mapArea"""
+    def respond(url):
+        area = [part for part in urlparse(url).path.split('/')
+                if part.count(',') == 3][0]
+        south, west, north, east = [float(value) for value in area.split(',')]
+        if 'o=xml' in url:
+            return FakeResponse(
+                '<Response><ResourceSets><ResourceSet><Resources>{0}'
+                '</Resources></ResourceSet></ResourceSets></Response>'.format(
+                    ''.join('<TrafficIncident><IncidentId>{0}</IncidentId>'
+                            '<Point><Latitude>{1}</Latitude><Longitude>{2}'
+                            '</Longitude></Point></TrafficIncident>'.format(
+                                *values)
+                            for values in INCIDENTS
+                            if south <= values[1] <= north and
+                            west <= values[2] <= east)))
+        return FakeResponse(json.dumps({'resourceSets': [{'resources': [
+            {'incidentId': id, 'point': {'coordinates': [lat, lon]}}
+            for id, lat, lon in INCIDENTS
+            if south <= lat <= north and west <= lon <= east]}]}))
+    network.respond = respond
+    return network.urls
+
+
+def ids(data):
+    return sorted(int(incident_id(incident))
+                  for incident in get_incidents(data))
+
+
+def flatten(points):
+    return [value for point in points for value in point]
+
+
+@parametrize('points,width', [
+    (ROUTE, 2000),
+    (ROUTE, 10000),
+    ([(47.6, -122.3), (47.6, -118)], 1000),
+    ([(40, -100), (44, -96)], 5000),
+    ([(47.6, -122.3)], 2000),
+])
+def test_boxes_cover_corridor(points, width):
+    boxes = RequestPlanner().split_corridor(points, width)
+    planner = RequestPlanner()
+    for box in boxes:
+        assert len(planner.split_area(box)) == 1
+    samples = []
+    for (lat1, lon1), (lat2, lon2) in zip(points, points[1:] or points):
+        samples.extend((lat1 + (lat2 - lat1) * step / 200.0,
+                        lon1 + (lon2 - lon1) * step / 200.0)
+                       for step in range(201))
+    for lat, lon in samples:
+        assert any(south <= lat <= north and west <= lon <= east
+                   for south, west, north, east in boxes)
+
+
+def test_diagonal_route_smaller_than_bounding_box():
+    boxes = RequestPlanner().split_corridor(ROUTE, 2000)
+    assert sum(box_area(box) for box in boxes) < \
+        box_area(corridor_box(ROUTE, 1000)) / 4
+
+
+def test_straight_route_single_box():
+    boxes = RequestPlanner().split_corridor([(47.6, -122.3), (47.6, -118)],
+                                            2000)
+    assert len(boxes) == 1
+
+
+def test_polyline_distance():
+    assert polyline_distance((47.6, -122.3), ROUTE) < 1
+    assert polyline_distance((45.5, -122.7), [(45.5, -122.7)]) == 0
+    assert abs(polyline_distance((47.6, -122.29), ROUTE) -
+               distance((47.6, -122.29), (47.6, -122.3))) < 1
+
+
+@parametrize('output', ['json', 'xml'])
+def test_incidents_inside_corridor(urls, output):
+    incidents = TrafficCorridorApi(
+        {'points': flatten(ROUTE), 'width': 2000, 'o': output,
+         'key': BING_MAPS_KEY})
+    assert len(urls) == len(incidents.boxes) > 1
+    found = [int(incident_id(incident))
+             for incident in get_incidents(incidents.response_to_dict())]
+    assert sorted(found) == [1, 2, 4]
+
+
+@parametrize('output', ['json', 'xml'])
+def test_single_box_response_filtered(urls, create_tmp_dir, output):
+    incidents = TrafficCorridorApi(
+        {'points': [47.6, -122.305, 47.62, -122.51], 'width': 2000,
+         'o': output, 'key': BING_MAPS_KEY})
+    assert len(urls) == len(incidents.boxes) == 1
+    assert ids(json.loads(incidents.response)) == [2]
+    incidents.to_json_file(create_tmp_dir)
+    with open(os.path.join(create_tmp_dir,
+                           'traffic_incidents.json'), 'r') as fp:
+        assert ids(json.loads(json.load(fp))) == [2]
+
+
+def test_wider_corridor(urls):
+    incidents = TrafficCorridorApi(
+        {'points': flatten(ROUTE), 'width': 40000, 'key': BING_MAPS_KEY})
+    assert sorted(incident['incidentId']
+                  for incident in incidents.get_resource()) == [1, 2, 3, 4]
+
+
+def test_filters_sent_to_every_box(urls):
+    TrafficCorridorApi({'points': flatten(ROUTE), 'width': 2000,
+                        'severity': [3, 4], 'key': BING_MAPS_KEY})
+    for url in urls:
+        assert 'severity=3,4' in url
+        assert 'width' not in url and 'points' not in url
+
+
+def test_empty_route():
+    with pytest.raises(ValueError):
+        TrafficCorridorApi({'points': [], 'width': 2000,
+                            'key': BING_MAPS_KEY})
@@ -0,0 +1,144 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse, parametrize
+from bingmaps.apiservices import TrafficIncidentsApi
+from bingmaps.apiservices.trafficincidents import get_incidents, incident_id
+from bingmaps.cache import TrafficCoverageCache
+from bingmaps.cache.coverage import covers
+import bingmaps.cache.coverage
+import json
+import pytest
+import requests
+
+AREA = [37, -99, 41, -94]
+
+INCIDENTS = [
+    (1, 38, -98, 1, 1),
+    (2, 38.5, -97, 3, 2),
+    (3, 40, -95, 4, 1),
+    (4, 40.5, -94.5, 2, 9),
+]
+
+
+def json_incident(id, latitude, longitude, severity, type):
+    return {'incidentId': id, 'point': {'coordinates': [latitude, longitude]},
+            'severity': severity, 'type': type}
+
+
+def xml_incident(id, latitude, longitude, severity, type):
+    return '<TrafficIncident><IncidentId>{0}</IncidentId><Point>' \
+           '<Latitude>{1}</Latitude><Longitude>{2}</Longitude></Point>' \
+           '<Severity>{3}</Severity><Type>{4}</Type></TrafficIncident>'.format(
+               id, latitude, longitude, severity, type)
+
+
+@pytest.fixture
+def urls(network):
+    def respond(url):
+        if 'o=xml' in url:
+            return FakeResponse(
+                '<Response><ResourceSets><ResourceSet><Resources>{0}'
+                '</Resources></ResourceSet></ResourceSets></Response>'.format(
+                    ''.join(xml_incident(*values) for values in INCIDENTS)))
+        return FakeResponse(json.dumps({'resourceSets': [{'resources': [
+            json_incident(*values) for values in INCIDENTS]}]}))
+    network.respond = respond
+    return network.urls
+
+
+def ids(response):
+    return sorted(int(incident_id(incident))
+                  for incident in get_incidents(response.response_to_dict()))
+
+
+@parametrize('output', ['json', 'xml'])
+@parametrize('filters,expected', [
+    ({'severity': [3, 4]}, [2, 3]),
+    ({'type': [1]}, [1, 3]),
+    ({'severity': [1, 2], 'type': [9]}, [4]),
+    ({'mapArea': [37.5, -98.5, 39, -96]}, [1, 2]),
+    ({'mapArea': [39.5, -96, 41, -94], 'severity': [4]}, [3]),
+    ({'mapArea': [37.5, -98.5, 39, -96], 'severity': [4]}, []),
+])
+def test_filtered_requests_answered_locally(urls, output, filters,
+                                            expected):
+    cache = TrafficCoverageCache()
+    data = {'mapArea': AREA, 'o': output, 'key': BING_MAPS_KEY}
+    broad = TrafficIncidentsApi(data, coverage_cache=cache)
+    assert ids(broad) == [1, 2, 3, 4]
+    narrow = TrafficIncidentsApi(dict(data, **filters), coverage_cache=cache)
+    assert len(urls) == 1
+    assert cache.hits == 1
+    assert narrow.status_code == 200
+    assert ids(narrow) == expected
+
+
+@parametrize('first,second', [
+    ({'mapArea': [38, -98, 40, -95]}, {'mapArea': AREA}),
+    ({'severity': [3]}, {'severity': [3, 4]}),
+    ({'severity': [3]}, {}),
+    ({'type': [1]}, {'type': [1], 'o': 'xml'}),
+    ({}, {'includeLocationCodes': 'true'}),
+])
+def test_uncovered_requests_fetched(urls, first, second):
+    cache = TrafficCoverageCache()
+    data = {'mapArea': AREA, 'key': BING_MAPS_KEY}
+    TrafficIncidentsApi(dict(data, **first), coverage_cache=cache)
+    TrafficIncidentsApi(dict(data, **second), coverage_cache=cache)
+    assert len(urls) == 2
+    assert cache.misses == 2
+
+
+def test_filtered_response_covers_narrower_filters(urls):
+    cache = TrafficCoverageCache()
+    data = {'mapArea': AREA, 'severity': [2, 3, 4], 'key': BING_MAPS_KEY}
+    TrafficIncidentsApi(data, coverage_cache=cache)
+    narrow = TrafficIncidentsApi(dict(data, severity=[4]),
+                                 coverage_cache=cache)
+    assert len(urls) == 1
+    assert ids(narrow) == [3]
+
+
+def test_merged_response_not_shared_with_cache(urls):
+    cache = TrafficCoverageCache()
+    data = {'mapArea': [37, -105, 45, -94], 'key': BING_MAPS_KEY}
+    first = TrafficIncidentsApi(data, coverage_cache=cache)
+    fetched = len(urls)
+    assert fetched > 1
+    first.response_to_dict()['resourceSets'][0]['resources'] = []
+    second = TrafficIncidentsApi(data, coverage_cache=cache)
+    assert len(urls) == fetched
+    assert ids(second) == [1, 2, 3, 4]
+
+
+def test_entries_expire(urls, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(bingmaps.cache.coverage.time, 'monotonic',
+                        lambda: clock[0])
+    cache = TrafficCoverageCache(ttl=30)
+    data = {'mapArea': AREA, 'key': BING_MAPS_KEY}
+    TrafficIncidentsApi(data, coverage_cache=cache)
+    clock[0] += 29
+    TrafficIncidentsApi(dict(data, type=[1]), coverage_cache=cache)
+    assert len(urls) == 1
+    clock[0] += 1
+    TrafficIncidentsApi(dict(data, type=[1]), coverage_cache=cache)
+    assert len(urls) == 2
+
+
+def test_failed_responses_not_cached(network):
+    network.respond = lambda url: FakeResponse('{}', 500)
+    cache = TrafficCoverageCache()
+    with pytest.raises(requests.HTTPError):
+        TrafficIncidentsApi({'mapArea': AREA, 'key': BING_MAPS_KEY},
+                            coverage_cache=cache)
+    assert len(cache) == 0
+
+
+@parametrize('broad,narrow,expected', [
+    ({'mapArea': AREA}, {'mapArea': AREA}, True),
+    ({'mapArea': AREA}, {'mapArea': [37, -99, 41.1, -94]}, False),
+    ({'mapArea': AREA, 'o': 'json'}, {'mapArea': AREA}, True),
+    ({'mapArea': AREA, 'type': [1, 2]}, {'mapArea': AREA, 'type': [2]}, True),
+    ({'mapArea': AREA, 'key': 'a'}, {'mapArea': AREA, 'key': 'b'}, False),
+])
+def test_covers(broad, narrow, expected):
+    assert covers(broad, narrow) is expected
@@ -0,0 +1,91 @@
+from .fixtures import BING_MAPS_KEY
+from bingmaps.apiservices import IncidentEvent, TrafficFeed
+import asyncio
+import json
+import pytest
+import requests
+
+DATA = {'mapArea': [37, -99, 41, -94], 'key': BING_MAPS_KEY}
+
+
+def summary(events):
+    return [(event.kind, event.incident['incidentId'], event.sequence)
+            for event in events]
+
+
+def test_events(snapshots):
+    snapshots.extend([
+        [(1,), (2,)],
+        [(1, 2), (3,)],
+        [(1, 2), (3,)],
+    ])
+    feed = TrafficFeed(DATA, interval=0)
+    assert summary(feed.events(max_polls=3)) == [
+        ('created', 1, 1), ('created', 2, 2),
+        ('created', 3, 3), ('updated', 1, 4), ('cleared', 2, 5)]
+    assert feed.polls == 3
+    assert sorted(feed.state) == [1, 3]
+
+
+def test_polls_pulled_by_consumer(snapshots):
+    snapshots.extend([[(1,), (2,)], [(3,)]])
+    feed = TrafficFeed(DATA, interval=0)
+    events = feed.events()
+    next(events)
+    next(events)
+    assert len(snapshots) == 1
+    assert next(events).kind == 'created'
+    assert snapshots == []
+
+
+def test_resume_from_checkpoint(snapshots):
+    snapshots.extend([[(1,), (2,), (3,)]])
+    feed = TrafficFeed(DATA, interval=0)
+    events = feed.events()
+    next(events)
+    checkpoint = json.loads(json.dumps(feed.checkpoint()))
+    assert checkpoint['sequence'] == 1
+    snapshots.extend([[(1,), (2,), (3,)]])
+    resumed = TrafficFeed(DATA, interval=0, checkpoint=checkpoint)
+    assert summary(resumed.events(max_polls=1)) == [
+        ('created', 2, 2), ('created', 3, 3)]
+
+
+def test_failed_polls_skipped(snapshots):
+    snapshots.extend([[(1,)], requests.ConnectionError('down'), [(2,)]])
+    feed = TrafficFeed(DATA, interval=0)
+    assert summary(feed.events(max_polls=3)) == [
+        ('created', 1, 1), ('created', 2, 2), ('cleared', 1, 3)]
+    assert feed.errors == 1
+    assert isinstance(feed.last_error, requests.ConnectionError)
+
+
+def test_stop(snapshots):
+    snapshots.extend([[(1,), (2,)], [(3,)]])
+    feed = TrafficFeed(DATA, interval=0)
+    kinds = []
+    for event in feed.events():
+        kinds.append(event.incident['incidentId'])
+        feed.stop()
+    assert kinds == [1, 2]
+
+
+def test_async_iterator(snapshots):
+    snapshots.extend([[(1,), (2,)], [(2, 2)]])
+    feed = TrafficFeed(DATA, interval=0)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        events = [loop.run_until_complete(feed.__anext__())
+                  for _ in range(4)]
+        feed.stop()
+        with pytest.raises(StopAsyncIteration):
+            loop.run_until_complete(feed.__anext__())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    assert feed.__aiter__() is feed
+    assert all(isinstance(event, IncidentEvent) for event in events)
+    assert summary(events) == [
+        ('created', 1, 1), ('created', 2, 2), ('updated', 2, 3),
+        ('cleared', 1, 4)]
@@ -0,0 +1,167 @@
+from .fixtures import BING_MAPS_KEY, incident
+from bingmaps.apiservices import (
+    TrafficIncidentsApi,
+    TrafficLog,
+    log_state,
+    replay_log
+)
+from bingmaps.apiservices.trafficlog import read_blocks
+import bingmaps.apiservices.trafficlog as trafficlog
+import json
+import os
+import pytest
+import random
+
+
+def random_polls(count=50, seed=1):
+    generator = random.Random(seed)
+    incidents = {}
+    polls = []
+    for poll in range(count):
+        for id in generator.sample(range(100), 10):
+            if generator.random() < 0.3:
+                incidents.pop(id, None)
+            else:
+                incidents[id] = incident(
+                    id, poll, description='Incident {0}'.format(id))
+        polls.append((1000 + 60 * poll, list(incidents.values())))
+    return polls
+
+
+@pytest.fixture
+def path(create_tmp_dir):
+    return os.path.join(create_tmp_dir, 'traffic.log')
+
+
+def test_state_replayed_at_any_time(path):
+    polls = random_polls()
+    with TrafficLog(path, chunk_seconds=600) as log:
+        for timestamp, incidents in polls:
+            log.append(incidents, timestamp)
+    assert len(list(read_blocks(path))) == 5
+    for timestamp, incidents in polls:
+        state = log_state(path, timestamp)
+        assert state == dict((incident['incidentId'], incident)
+                             for incident in incidents)
+
+
+def test_only_changes_stored(path):
+    with TrafficLog(path) as log:
+        log.append([incident(1), incident(2)], 100)
+        log.append([incident(1), incident(2)], 160)
+        log.append([incident(1, 2)], 220)
+    assert [(event.time, event.kind, event.key)
+            for event in replay_log(path)] == [
+        (100, 'created', 1), (100, 'created', 2), (220, 'updated', 1),
+        (220, 'cleared', 2)]
+    assert [event.incident for event in replay_log(path, 200, 300)] == [
+        incident(1, 2), None]
+
+
+def test_time_range_skips_blocks(path, monkeypatch):
+    polls = random_polls()
+    with TrafficLog(path, chunk_seconds=600) as log:
+        for timestamp, incidents in polls:
+            log.append(incidents, timestamp)
+    decompressed = []
+    decompress = trafficlog.zlib.decompress
+
+    class Zlib(object):
+        @staticmethod
+        def decompress(data):
+            decompressed.append(len(data))
+            return decompress(data)
+    monkeypatch.setattr(trafficlog, 'zlib', Zlib)
+    events = list(replay_log(path, 1600, 1900))
+    assert events and all(1600 <= event.time <= 1900 for event in events)
+    assert len(decompressed) == 4
+
+
+def test_every_poll_written(path):
+    polls = random_polls(5)
+    log = TrafficLog(path)
+    for timestamp, incidents in polls:
+        log.append(incidents, timestamp)
+    assert len(list(read_blocks(path))) == 5
+    assert log_state(path) == log.state
+    log.close()
+
+
+def test_state_replayed_from_keyframe(path, monkeypatch):
+    polls = random_polls()
+    with TrafficLog(path, keyframe_seconds=600) as log:
+        for timestamp, incidents in polls:
+            log.append(incidents, timestamp)
+    keyframes = [header[4] for _, header, _ in read_blocks(path)
+                 if header[2] == trafficlog.KEYFRAME_BLOCK]
+    assert keyframes == [1600, 2200, 2800, 3400]
+    for timestamp, incidents in polls:
+        assert log_state(path, timestamp) == dict(
+            (incident['incidentId'], incident) for incident in incidents)
+    decompressed = []
+    decompress = trafficlog.zlib.decompress
+
+    class Zlib(object):
+        @staticmethod
+        def decompress(data):
+            decompressed.append(len(data))
+            return decompress(data)
+    monkeypatch.setattr(trafficlog, 'zlib', Zlib)
+    assert log_state(path, 3500) == dict(
+        (incident['incidentId'], incident) for incident in polls[41][1])
+    assert len(decompressed) == 2 + 4
+
+
+def test_compressed_smaller_than_raw_polls(path):
+    polls = random_polls()
+    with TrafficLog(path) as log:
+        for timestamp, incidents in polls:
+            log.append(incidents, timestamp)
+    raw = sum(len(json.dumps(incidents)) for _, incidents in polls)
+    assert os.path.getsize(path) * 10 < raw
+
+
+def test_reopen_appends_changes_only(path):
+    with TrafficLog(path) as log:
+        log.append([incident(1), incident(2)], 100)
+    with TrafficLog(path) as log:
+        assert sorted(log.state) == [1, 2]
+        log.append([incident(2), incident(3)], 200)
+    assert [(event.kind, event.key) for event in replay_log(path, 150)] == [
+        ('created', 3), ('cleared', 1)]
+
+
+def test_truncated_block_dropped(path):
+    with TrafficLog(path) as log:
+        log.append([incident(1)], 100)
+        log.flush()
+        log.append([incident(2)], 200)
+    with open(path, 'r+b') as fp:
+        fp.truncate(os.path.getsize(path) - 3)
+    assert sorted(log_state(path)) == [1]
+    with TrafficLog(path) as log:
+        log.append([incident(1), incident(3)], 300)
+    assert sorted(log_state(path)) == [1, 3]
+    assert len(list(read_blocks(path))) == 2
+
+
+def test_out_of_order_polls_rejected(path):
+    with TrafficLog(path) as log:
+        log.append([incident(1)], 100)
+        with pytest.raises(ValueError):
+            log.append([incident(1)], 50)
+
+
+def test_empty_log(path):
+    assert list(replay_log(path)) == []
+    assert log_state(path) == {}
+
+
+def test_append_response(path, network):
+    network.respond = json.dumps(
+        {'resourceSets': [{'resources': [incident(1)]}]})
+    with TrafficLog(path, clock=lambda: 100.0) as log:
+        log.append(TrafficIncidentsApi({'mapArea': [37, -99, 41, -94],
+                                        'key': BING_MAPS_KEY}))
+    assert [(event.time, event.key) for event in replay_log(path)] == [
+        (100.0, 1)]
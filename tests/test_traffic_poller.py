@@ -0,0 +1,76 @@
+from .fixtures import BING_MAPS_KEY, parametrize
+from bingmaps.apiservices import TrafficPoller
+import requests
+
+DATA = {'mapArea': [37, -99, 41, -94], 'key': BING_MAPS_KEY}
+
+
+def ids(incidents):
+    return sorted(int(incident.get('incidentId', incident.get('IncidentId')))
+                  for incident in incidents)
+
+
+@parametrize('output', ['json', 'xml'])
+def test_poll_changes(snapshots, output):
+    snapshots.extend([
+        [(1,), (2,), (3,), (4,)],
+        [(1,), (2, 2), (4,), (5,)],
+        [(1,), (2, 2), (4,), (5,)],
+        [],
+    ])
+    poller = TrafficPoller(dict(DATA, o=output))
+    first = poller.poll()
+    assert ids(first.added) == [1, 2, 3, 4]
+    assert first.changed == first.cleared == []
+    second = poller.poll()
+    assert ids(second.added) == [5]
+    assert ids(second.changed) == [2]
+    assert ids(second.cleared) == [3]
+    assert not any(poller.poll())
+    last = poller.poll()
+    assert ids(last.cleared) == [1, 2, 4, 5]
+    assert poller.state == {}
+
+
+def test_update_without_incident_ids():
+    poller = TrafficPoller(DATA)
+    poller.update([{'description': 'a'}])
+    changes = poller.update([{'description': 'a'}, {'description': 'b'}])
+    assert changes.added == [{'description': 'b'}]
+
+
+def test_run_calls_back_on_changes(snapshots):
+    snapshots.extend([[(1,)], [(1,)], [(1, 2)]])
+    received = []
+    poller = TrafficPoller(DATA, interval=0, jitter=0)
+    poller.run(received.append, max_polls=3)
+    assert len(received) == 2
+    assert ids(received[1].changed) == [1]
+    assert poller.polls == 3
+
+
+def test_run_survives_failed_polls(snapshots):
+    error = requests.ConnectionError()
+    snapshots.extend([[(1,)], error, [(1,), (2,)]])
+    received = []
+    poller = TrafficPoller(DATA, interval=0, jitter=0)
+    poller.run(received.append, max_polls=3)
+    assert poller.errors == 1
+    assert poller.last_error is error
+    assert ids(received[1].added) == [2]
+
+
+def test_stop(snapshots):
+    snapshots.extend([[(1,)]] * 10)
+    poller = TrafficPoller(DATA, interval=0, jitter=0)
+    poller.run(lambda changes: poller.stop())
+    assert poller.polls == 1
+
+
+@parametrize('jitter', [0, 0.1, 0.5])
+def test_next_delay_jitter(jitter):
+    poller = TrafficPoller(DATA, interval=60, jitter=jitter)
+    delays = [poller.next_delay() for _ in range(200)]
+    assert all(60 * (1 - jitter) <= delay <= 60 * (1 + jitter)
+               for delay in delays)
+    assert (len(set(delays)) > 1) == (jitter > 0)
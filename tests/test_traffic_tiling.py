@@ -0,0 +1,113 @@
+from .fixtures import BING_MAPS_KEY, FakeResponse
+from bingmaps.apiservices import TrafficIncidentsApi
+from bingmaps.urls import RequestPlanner, distance
+from urllib.parse import urlparse, parse_qs
+import json
+import math
+import pytest
+
+INCIDENTS = [
+    {'incidentId': 1, 'point': {'coordinates': [38, -104]}},
+    {'incidentId': 2, 'point': {'coordinates': [44, -95]}},
+    {'incidentId': 3, 'point': {'coordinates': [41, -99.5]}},
+]
+
+
+@pytest.fixture
+def urls(network):
+    """Fake traffic service returning the incidents inside the mapArea of
+    the request, with incident 3 returned by all the tiles around it"""
+    def respond(url):
+        query = parse_qs(urlparse(url).query)
+        area = [part for part in urlparse(url).path.split('/')
+                if part.count(',') == 3][0]
+        south, west, north, east = [float(value) for value in area.split(',')]
+        resources = [incident for incident in INCIDENTS
+                     if south - 1 <= incident['point']['coordinates'][0] <=
+                     north + 1 and west - 1 <=
+                     incident['point']['coordinates'][1] <= east + 1]
+        assert 'key' in query
+        return FakeResponse(json.dumps(
+            {'resourceSets': [{'resources': resources}]}))
+    network.respond = respond
+    return network.urls
+
+
+def tile_sizes(tile):
+    south, west, north, east = tile
+    height = distance((south, west), (north, west))
+    latitude = 0 if south <= 0 <= north else min(abs(south), abs(north))
+    width = math.radians(east - west) * 6371008.8 * \
+        math.cos(math.radians(latitude))
+    return height, width
+
+
+@pytest.mark.parametrize('bounds', [
+    [37, -105, 45, -94],
+    [24, -125, 49, -66],
+    [-10, 100, 10, 120],
+    [60, 10, 70, 40],
+])
+def test_split_area_tiles_fit(bounds):
+    tiles = RequestPlanner().split_area(bounds)
+    for tile in tiles:
+        height, width = tile_sizes(tile)
+        assert height <= 500000
+        assert width <= 500000
+    assert tiles[0][:2] == [float(bounds[0]), float(bounds[1])]
+    assert tiles[-1][2:] == [float(bounds[2]), float(bounds[3])]
+
+
+def test_split_area_covers_bounds():
+    tiles = RequestPlanner().split_area([24, -125, 49, -66])
+    rows = sorted(set((tile[0], tile[2]) for tile in tiles))
+    for (_, north), (south, _) in zip(rows, rows[1:]):
+        assert north == south
+    for row in rows:
+        columns = sorted((tile[1], tile[3]) for tile in tiles
+                         if (tile[0], tile[2]) == row)
+        assert columns[0][0] == -125 and columns[-1][1] == -66
+        for (_, east), (west, _) in zip(columns, columns[1:]):
+            assert east == west
+
+
+def test_split_area_rows_narrower_near_poles():
+    tiles = RequestPlanner().split_area([0, 0, 70, 10])
+    first_row = [tile for tile in tiles if tile[0] == 0.0]
+    last_row = [tile for tile in tiles if tile[2] == 70.0]
+    assert len(first_row) > len(last_row)
+
+
+def test_small_area_not_split():
+    planner = RequestPlanner()
+    assert planner.split_area([37, -105, 38, -104]) == [
+        [37.0, -105.0, 38.0, -104.0]]
+    assert planner.split_area([37, -105, 45, -94]) != [
+        [37.0, -105.0, 45.0, -94.0]]
+
+
+def test_large_area_fetched_by_tiles(urls):
+    incidents = TrafficIncidentsApi(
+        {'mapArea': [37, -105, 45, -94], 'key': BING_MAPS_KEY})
+    assert len(urls) == 4
+    assert sorted(incident['incidentId']
+                  for incident in incidents.get_resource()) == [1, 2, 3]
+
+
+def test_tiles_combined_with_list_splitting(urls):
+    planner = RequestPlanner({'Traffic': 165})
+    incidents = TrafficIncidentsApi(
+        {'mapArea': [37, -105, 45, -94], 'severity': [1, 2, 3, 4],
+         'key': BING_MAPS_KEY}, planner=planner)
+    assert len(urls) > 4
+    for url in urls:
+        assert len(url) <= 165
+    assert sorted(incident['incidentId']
+                  for incident in incidents.get_resource()) == [1, 2, 3]
+
+
+def test_small_area_single_request(urls):
+    TrafficIncidentsApi({'mapArea': [37, -105, 38, -104],
+                         'key': BING_MAPS_KEY})
+    assert len(urls) == 1
+    assert '/37.0,-105.0,38.0,-104.0/' in urls[0]